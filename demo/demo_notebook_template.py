@@ -112,6 +112,31 @@ try:
 except:
     print("   (Audio file not found)")
 
+# %% [markdown]
+# ## More Examples by Accent Group
+# Worst failures and sampled successes per group, precomputed by calculate_metrics.py
+
+# %%
+import json
+
+try:
+    with open("../results/examples.json") as f:
+        examples = json.load(f)
+except FileNotFoundError:
+    examples = None
+    print("   (examples.json not found - run calculate_metrics.py first)")
+
+if examples:
+    for group, rows in examples["failures"].items():
+        print(f"\n❌ {group} - worst failures:")
+        for row in rows[:3]:
+            print(f"   [{row['cer']:.0%} CER] '{row['true_transcript']}' → '{row['transcribed_text']}'")
+            print(f"      {row['true_intent']} → {row['predicted_intent']}")
+    for group, rows in examples["successes"].items():
+        print(f"\n✅ {group} - sampled successes:")
+        for row in rows[:2]:
+            print(f"   [{row['cer']:.0%} CER] '{row['transcribed_text']}'")
+
 # %% [markdown]
 # ## Benchmark Results: Quantifying Inequity
 
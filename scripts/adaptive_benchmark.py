@@ -0,0 +1,643 @@
+"""
+Adaptive Benchmark Driver
+Transcribes Common Voice clips in rounds, sampling more from the accent
+groups whose estimates are least certain, until every group meets a target
+precision
+
+Combines organize_mozilla_cv.py (accent matching, safe path resolution),
+run_whisper.py (transcription) and the metrics code (normalized CER,
+running per-group moments). After each round it recomputes each group's CER
+confidence interval and its CER disparity against the baseline group,
+estimates how many more clips each group needs to reach the targets, and
+spends the next round's budget on those groups. Groups whose estimates have
+converged stop receiving clips.
+
+Candidates are drawn in a seeded random order (not metadata order), so the
+intervals are valid for each group's clip population. Outputs the same
+files as the fixed-size pipeline (audio, ground truth template,
+transcripts.csv), plus a per-round log and a summary.
+
+Usage:
+    python scripts/adaptive_benchmark.py \\
+      --cv_dir ~/Downloads/cv-valid-test \\
+      --model tiny \\
+      --target_half_width 0.02
+"""
+
+import argparse
+import json
+import math
+import shutil
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+import whisper
+from pathlib import Path
+try:
+    from _python_version_check import ensure_python_3_12_12
+    from calculate_metrics import batch_cer
+    from metric_accumulators import MetricsAccumulator
+    from organize_mozilla_cv import (
+        ALLOWED_AUDIO_EXTENSIONS, _build_directory_index, _build_group_tokens, _choose_column,
+        _find_metadata_file, _match_groups, _resolve_audio_path, _speaker_type,
+    )
+    from run_whisper import transcribe_file
+    from table_loading import ENGINES, read_header, read_table, table_separator
+    from text_normalization import normalize_series
+except ModuleNotFoundError:
+    from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.calculate_metrics import batch_cer
+    from scripts.metric_accumulators import MetricsAccumulator
+    from scripts.organize_mozilla_cv import (
+        ALLOWED_AUDIO_EXTENSIONS, _build_directory_index, _build_group_tokens, _choose_column,
+        _find_metadata_file, _match_groups, _resolve_audio_path, _speaker_type,
+    )
+    from scripts.run_whisper import transcribe_file
+    from scripts.table_loading import ENGINES, read_header, read_table, table_separator
+    from scripts.text_normalization import normalize_series
+
+
+def build_candidate_pool(
+    metadata_file,
+    accent_tokens,
+    accent_column="accent",
+    fallback_accent_column="locale",
+    text_column="sentence",
+    path_column="path",
+    seed=42,
+    engine="c",
+):
+    """
+    Shuffled per-group candidate clips from Common Voice metadata
+
+    Args:
+        metadata_file (Path): validated.tsv / test.tsv / metadata CSV
+        accent_tokens (list): Accent tokens to match (as in organize_mozilla_cv.py)
+        accent_column (str): Column name for accent labels
+        fallback_accent_column (str): Fallback column if accent is missing
+        text_column (str): Column name for transcripts
+        path_column (str): Column name for audio filename
+        seed (int): Seed for the candidate order
+        engine (str): CSV parser engine (c, pyarrow or auto)
+
+    Returns:
+        dict: Group name -> DataFrame with ``path`` and ``sentence`` columns
+    """
+    sep = table_separator(metadata_file)
+    columns = read_header(metadata_file, sep)
+
+    accent_col = _choose_column(columns, accent_column, fallback=fallback_accent_column)
+    text_col = _choose_column(columns, text_column, fallback="text")
+    path_col = _choose_column(columns, path_column, fallback="filename")
+    if not accent_col or not path_col:
+        raise SystemExit(f"❌ Metadata needs accent and path columns; found {columns}")
+
+    df = read_table(
+        metadata_file,
+        columns=[col for col in (accent_col, text_col, path_col) if col],
+        categorical=[accent_col],
+        engine=engine,
+        sep=sep,
+    )
+
+    group_tokens = _build_group_tokens(accent_tokens)
+    matched = _match_groups(df[accent_col], group_tokens)
+
+    candidates = pd.DataFrame({
+        "group": matched,
+        "path": df[path_col],
+        "sentence": df[text_col] if text_col else '',
+        "original_accent": df[accent_col],
+    }).dropna(subset=["group", "path"])
+    candidates = candidates.sample(frac=1, random_state=seed)
+
+    pool = {group: candidates[candidates["group"] == group].reset_index(drop=True) for group in group_tokens}
+    for group, rows in pool.items():
+        print(f"  {group:15s}: {len(rows):6d} candidate clips")
+    return pool
+
+
+def _relative_variance(n, mean, std):
+    """
+    Variance of the mean over the mean squared, with two pseudo-clips
+
+    Two pseudo-clips at CER 0 and 1 (an Agresti-Coull style pseudo-count)
+    keep the variance of a constant-CER group, and the mean of an all-zero
+    group, above zero.
+
+    Returns:
+        tuple: (variance of the regularized mean, that variance / mean^2)
+    """
+    m2 = std ** 2 * (n - 1) if n > 1 else 0.0
+    m2 += 0.5 + (0.5 - mean) ** 2 * n * 2 / (n + 2)
+    var = m2 / (n + 1) / (n + 2)
+    return var, var / ((n * mean + 1) / (n + 2)) ** 2
+
+
+def group_precision(accumulator, baseline_group=None, confidence=0.95):
+    """
+    Per-group CER mean, CI half-width and CER disparity vs baseline
+
+    Uses a normal-approximation interval on the running mean; the disparity
+    (group CER / baseline CER) interval comes from the delta method. Both
+    intervals are computed with two pseudo-clips (CER 0 and 1) added to each
+    group, so constant-CER groups don't get a zero width. A disparity
+    against a baseline CER of 0 is undefined (NaN).
+
+    Args:
+        accumulator (MetricsAccumulator): Running per-group CER moments
+        baseline_group (str): Reference group for disparity (optional)
+        confidence (float): Confidence level
+
+    Returns:
+        pd.DataFrame: n, cer_mean, cer_std, half_width, disparity,
+        disparity_half_width, disparity_rel_half_width (indexed by accent_group)
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rows = {}
+    rel_vars = {}
+    for name, acc in accumulator.groups.items():
+        var, rel_vars[name] = _relative_variance(acc.cer_count, acc.cer_mean, acc.cer_std)
+        rows[name] = {
+            "n": acc.cer_count,
+            "cer_mean": acc.cer_mean,
+            "cer_std": acc.cer_std,
+            "half_width": z * math.sqrt(var),
+        }
+    stats = pd.DataFrame.from_dict(rows, orient="index").sort_index()
+    stats.index.name = "accent_group"
+    stats["disparity"] = np.nan
+    stats["disparity_half_width"] = np.nan
+    stats["disparity_rel_half_width"] = np.nan
+
+    if baseline_group in stats.index:
+        base_mean = stats.loc[baseline_group, "cer_mean"]
+        for name in stats.index:
+            if name == baseline_group:
+                continue
+            rel_half_width = z * math.sqrt(rel_vars[name] + rel_vars[baseline_group])
+            stats.loc[name, "disparity_rel_half_width"] = rel_half_width
+            if base_mean > 0:
+                ratio = stats.loc[name, "cer_mean"] / base_mean
+                stats.loc[name, "disparity"] = ratio
+                stats.loc[name, "disparity_half_width"] = rel_half_width * ratio
+    return stats
+
+
+def samples_needed(stats, target_half_width, target_disparity_rel=0.0,
+                   baseline_group=None, min_samples=10):
+    """
+    Estimate extra clips each group needs to reach the precision targets
+
+    Half-widths shrink with 1/sqrt(n), so a group at half-width ``h`` needs
+    about ``n * ((h / target)^2 - 1)`` more clips. A disparity interval that
+    is too wide relative to the disparity itself is split between the group
+    and the baseline in proportion to each side's share of the variance.
+    No group counts as converged below ``min_samples`` clips, and an
+    undefined disparity (baseline CER 0) is never treated as converged.
+
+    Returns:
+        dict: Group name -> extra clips needed (0 when converged)
+    """
+    need = {}
+    for name, row in stats.iterrows():
+        n = int(row["n"])
+        if n < min_samples:
+            need[name] = min_samples - n
+        elif row["half_width"] > target_half_width:
+            need[name] = math.ceil(n * ((row["half_width"] / target_half_width) ** 2 - 1))
+        else:
+            need[name] = 0
+
+    if target_disparity_rel and baseline_group in stats.index:
+        base = stats.loc[baseline_group]
+        for name, row in stats.iterrows():
+            width = row["disparity_rel_half_width"]
+            if name == baseline_group:
+                continue
+            if np.isnan(row["disparity"]):
+                # Undefined ratio: keep sampling the baseline until its CER is nonzero
+                need[baseline_group] = max(need[baseline_group], int(base["n"]))
+                continue
+            if width <= target_disparity_rel:
+                continue
+            excess = (width / target_disparity_rel) ** 2 - 1
+            group_var = _relative_variance(row["n"], row["cer_mean"], row["cer_std"])[1]
+            base_var = _relative_variance(base["n"], base["cer_mean"], base["cer_std"])[1]
+            share = group_var / (group_var + base_var) if group_var + base_var > 0 else 0.5
+            need[name] = max(need[name], math.ceil(row["n"] * excess * share))
+            need[baseline_group] = max(need[baseline_group], math.ceil(base["n"] * excess * (1 - share)))
+    return need
+
+
+def allocate_round(need, available, batch_size):
+    """
+    Split one round's budget across groups in proportion to their need
+
+    Args:
+        need (dict): Group -> extra clips needed
+        available (dict): Group -> clips that can still be drawn
+        batch_size (int): Clips to transcribe this round
+
+    Returns:
+        dict: Group -> clips to draw this round
+    """
+    need = {g: min(n, available.get(g, 0)) for g, n in need.items() if n > 0 and available.get(g, 0) > 0}
+    total = sum(need.values())
+    if total <= batch_size:
+        return need
+    shares = {g: batch_size * n / total for g, n in need.items()}
+    alloc = {g: int(s) for g, s in shares.items()}
+    # Largest remainders get the leftover clips.
+    for g in sorted(shares, key=lambda g: shares[g] - alloc[g], reverse=True)[:batch_size - sum(alloc.values())]:
+        alloc[g] += 1
+    return {g: k for g, k in alloc.items() if k > 0}
+
+
+def run_adaptive_benchmark(
+    cv_dir,
+    output_dir="data/audio",
+    accent_tokens=None,
+    model_size="tiny",
+    baseline_group="US",
+    target_half_width=0.02,
+    target_disparity_rel=0.15,
+    confidence=0.95,
+    initial_samples=10,
+    min_samples=30,
+    batch_size=20,
+    max_per_group=200,
+    max_rounds=50,
+    seed=42,
+    accent_column="accent",
+    fallback_accent_column="locale",
+    text_column="sentence",
+    path_column="path",
+    metadata_csv=None,
+    engine="c",
+    ground_truth_csv="data/ground_truth_template.csv",
+    transcripts_csv="results/transcripts.csv",
+    report_dir="results",
+):
+    """
+    Transcribe in rounds until every group meets the precision targets
+
+    Args:
+        cv_dir (str): Path to cv-valid-test directory
+        output_dir (str): Output directory for selected audio files
+        accent_tokens (list): Accent tokens to match
+        model_size (str): Whisper model size
+        baseline_group (str): Reference group for CER disparity
+        target_half_width (float): Target CER CI half-width (absolute)
+        target_disparity_rel (float): Target disparity CI half-width as a
+            fraction of the disparity (0 disables)
+        confidence (float): Confidence level for the intervals
+        initial_samples (int): Clips per group in the first round
+        min_samples (int): Clips a group needs before it can count as converged
+        batch_size (int): Clips per later round, across all groups
+        max_per_group (int): Upper bound on clips per group
+        max_rounds (int): Upper bound on rounds
+        seed (int): Seed for the candidate order
+        engine (str): CSV parser engine for the metadata (c, pyarrow or auto)
+        ground_truth_csv (str): Output ground truth template
+        transcripts_csv (str): Output transcripts CSV
+        report_dir (str): Directory for adaptive_rounds.csv and adaptive_summary.json
+
+    Returns:
+        pd.DataFrame: Final per-group precision table
+    """
+    cv_path = Path(cv_dir).expanduser()
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    if accent_tokens is None:
+        accent_tokens = ["us", "india", "african", "england"]
+
+    print(f"\n{'='*60}")
+    print(f"Adaptive ASR Equity Benchmark")
+    print(f"{'='*60}")
+    print(f"Target CER half-width: ±{target_half_width:.3f} at {confidence:.0%} confidence")
+    if target_disparity_rel:
+        print(f"Target disparity half-width: ±{target_disparity_rel:.0%} of the disparity (baseline: {baseline_group})")
+
+    metadata_file = _find_metadata_file(cv_path, metadata_csv)
+    if not metadata_file:
+        raise SystemExit(f"❌ No metadata file found in {cv_path}")
+    print(f"\nBuilding candidate pools...")
+    pool = build_candidate_pool(
+        metadata_file, accent_tokens, accent_column, fallback_accent_column,
+        text_column, path_column, seed, engine,
+    )
+    cursor = {group: 0 for group in pool}
+    index = _build_directory_index(cv_path, metadata_file)
+    unresolved = 0
+
+    print(f"\nLoading Whisper model '{model_size}'...")
+    model = whisper.load_model(model_size)
+
+    accumulator = MetricsAccumulator()
+    ground_truth_rows = []
+    transcript_rows = []
+    round_logs = []
+    counts = {group: 0 for group in pool}
+    need = {group: initial_samples for group in pool}
+    stats = None
+
+    for round_num in range(1, max_rounds + 1):
+        available = {g: min(len(pool[g]) - cursor[g], max_per_group - counts[g]) for g in pool}
+        alloc = need if round_num == 1 else allocate_round(need, available, batch_size)
+        alloc = {g: min(k, available[g]) for g, k in alloc.items() if min(k, available[g]) > 0}
+        if not alloc:
+            break
+        print(f"\n--- Round {round_num}: " + ", ".join(f"{g} +{k}" for g, k in sorted(alloc.items())) + " ---")
+
+        new_rows = []
+        for group, k in alloc.items():
+            taken = 0
+            while taken < k and cursor[group] < len(pool[group]):
+                candidate = pool[group].iloc[cursor[group]]
+                cursor[group] += 1
+                src_audio = _resolve_audio_path(candidate["path"], cv_path, metadata_file, index)
+                if not src_audio:
+                    unresolved += 1
+                    continue
+                if src_audio.suffix.lower() not in ALLOWED_AUDIO_EXTENSIONS:
+                    continue
+
+                safe_group = group.lower().replace(" ", "_")
+                dst_audio = output_path / f"{safe_group}_{counts[group]:03d}{src_audio.suffix.lower()}"
+                shutil.copy(src_audio, dst_audio)
+                transcript = transcribe_file(model, dst_audio, model_size)
+
+                transcript_rows.append(transcript)
+                ground_truth_rows.append({
+                    'filename': dst_audio.name,
+                    'accent_group': group,
+                    'speaker_type': _speaker_type(group),
+                    'true_transcript': candidate["sentence"],
+                    'true_intent': 'unknown',
+                    'duration': 0
+                })
+                new_rows.append({
+                    "accent_group": group,
+                    "true_transcript": candidate["sentence"],
+                    "transcribed_text": transcript["transcribed_text"],
+                })
+                counts[group] += 1
+                taken += 1
+
+        if not new_rows:
+            break
+        batch = pd.DataFrame(new_rows)
+        batch["cer"] = batch_cer(
+            normalize_series(batch["true_transcript"]), normalize_series(batch["transcribed_text"])
+        )
+        accumulator.update(batch)
+
+        stats = group_precision(accumulator, baseline_group, confidence)
+        need = samples_needed(stats, target_half_width, target_disparity_rel,
+                              baseline_group, max(min_samples, initial_samples))
+        # A group none of whose clips resolved yet is still short of its first round
+        for group in pool:
+            need.setdefault(group, initial_samples)
+        stats["needed"] = pd.Series(need)
+        round_logs.append(stats.reset_index().assign(round=round_num))
+        print(stats.round(4).to_string())
+
+        available = {g: min(len(pool[g]) - cursor[g], max_per_group - counts[g]) for g in pool}
+        if not any(n > 0 and available[g] > 0 for g, n in need.items()):
+            break
+
+    if stats is None:
+        print(f"\n❌ No clips could be transcribed. Check {cv_path}/clips/ and the metadata path column.")
+        return None
+
+    converged = [g for g, n in need.items() if n == 0]
+    capped = [g for g, n in need.items() if n > 0 and counts[g] > 0]
+    empty = [g for g in pool if counts[g] == 0]
+
+    Path(ground_truth_csv).parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(ground_truth_rows).to_csv(ground_truth_csv, index=False)
+    Path(transcripts_csv).parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(transcript_rows).to_csv(transcripts_csv, index=False)
+
+    report_path = Path(report_dir)
+    report_path.mkdir(parents=True, exist_ok=True)
+    pd.concat(round_logs, ignore_index=True).to_csv(report_path / "adaptive_rounds.csv", index=False)
+
+    total = sum(counts.values())
+    fixed_total = max_per_group * len(pool)
+    transcription_time = sum(row["transcription_time"] for row in transcript_rows)
+    summary = {
+        "rounds": len(round_logs),
+        "clips_transcribed": total,
+        "unresolved_paths": unresolved,
+        "fixed_design_clips": fixed_total,
+        "transcription_time_s": round(transcription_time, 2),
+        "confidence": confidence,
+        "target_half_width": target_half_width,
+        "target_disparity_rel": target_disparity_rel,
+        "baseline_group": baseline_group,
+        "converged_groups": converged,
+        "capped_groups": capped,
+        "empty_groups": empty,
+        "groups": json.loads(stats.to_json(orient="index")),
+    }
+    with open(report_path / "adaptive_summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n{'='*60}")
+    print(f"Adaptive benchmark complete!")
+    print(f"{'='*60}")
+    print(f"Rounds: {len(round_logs)}")
+    print(f"Clips transcribed: {total} (fixed design at {max_per_group}/group: {fixed_total})")
+    print(f"Transcription time: {transcription_time:.1f}s")
+    print(f"Unresolved audio paths: {unresolved}")
+    print(f"✅ Converged: {', '.join(converged) or 'none'}")
+    if capped:
+        print(f"⚠️  Stopped before target (pool, --max_per_group or --max_rounds): {', '.join(capped)}")
+    if empty:
+        print(f"⚠️  No clips transcribed (empty pool or unresolved paths): {', '.join(empty)}")
+    print(f"\nGround truth template: {ground_truth_csv}")
+    print(f"Transcripts: {transcripts_csv}")
+    print(f"Round log: {report_path / 'adaptive_rounds.csv'}")
+    print(f"\nNEXT STEP: assign true_intent in {ground_truth_csv}, then run classify_intent.py")
+    return stats
+
+
+def main():
+    ensure_python_3_12_12()
+    parser = argparse.ArgumentParser(
+        description="Adaptive ASR equity benchmark: transcribe until per-group CER estimates converge"
+    )
+    parser.add_argument(
+        '--cv_dir',
+        type=str,
+        required=True,
+        help='Path to cv-valid-test directory (e.g., ~/Downloads/cv-valid-test)'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='data/audio',
+        help='Output directory for audio files (default: data/audio)'
+    )
+    parser.add_argument(
+        '--accents',
+        nargs='+',
+        default=["us", "india", "african", "england"],
+        help='Accent tokens to match (default: us india african england)'
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="tiny",
+        choices=["tiny", "base", "small", "medium", "large"],
+        help="Whisper model size (default: tiny for speed)"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default="US",
+        help="Baseline group for CER disparity (default: US)"
+    )
+    parser.add_argument(
+        "--target_half_width",
+        type=float,
+        default=0.02,
+        help="Target CER confidence-interval half-width per group (default: 0.02)"
+    )
+    parser.add_argument(
+        "--target_disparity_rel",
+        type=float,
+        default=0.15,
+        help="Target CER disparity half-width vs baseline, as a fraction of the disparity; 0 disables (default: 0.15)"
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for the intervals (default: 0.95)"
+    )
+    parser.add_argument(
+        "--initial",
+        type=int,
+        default=10,
+        help="Clips per group in the first round (default: 10)"
+    )
+    parser.add_argument(
+        "--min_samples",
+        type=int,
+        default=30,
+        help="Clips a group needs before it can count as converged (default: 30)"
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=20,
+        help="Clips per later round across all groups (default: 20)"
+    )
+    parser.add_argument(
+        "--max_per_group",
+        type=int,
+        default=200,
+        help="Maximum clips per group (default: 200)"
+    )
+    parser.add_argument(
+        "--max_rounds",
+        type=int,
+        default=50,
+        help="Maximum rounds (default: 50)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Seed for the candidate order (default: 42)"
+    )
+    parser.add_argument(
+        '--accent_column',
+        type=str,
+        default='accent',
+        help='Column name for accent labels (default: accent)'
+    )
+    parser.add_argument(
+        '--fallback_accent_column',
+        type=str,
+        default='locale',
+        help='Fallback column if accent is missing (default: locale)'
+    )
+    parser.add_argument(
+        '--text_column',
+        type=str,
+        default='sentence',
+        help='Column name for transcripts (default: sentence)'
+    )
+    parser.add_argument(
+        '--path_column',
+        type=str,
+        default='path',
+        help='Column name for audio filename (default: path)'
+    )
+    parser.add_argument(
+        '--metadata_csv',
+        type=str,
+        default='',
+        help='Optional metadata CSV path (e.g., ~/Downloads/cv-valid-test.csv)'
+    )
+    parser.add_argument(
+        '--engine',
+        type=str,
+        default='c',
+        choices=ENGINES,
+        help='CSV parser for the metadata; pyarrow/auto use pyarrow if installed (default: c)'
+    )
+    parser.add_argument(
+        "--ground_truth",
+        type=str,
+        default="data/ground_truth_template.csv",
+        help="Output ground truth template (default: data/ground_truth_template.csv)"
+    )
+    parser.add_argument(
+        "--transcripts",
+        type=str,
+        default="results/transcripts.csv",
+        help="Output transcripts CSV (default: results/transcripts.csv)"
+    )
+    parser.add_argument(
+        "--report_dir",
+        type=str,
+        default="results",
+        help="Directory for adaptive_rounds.csv and adaptive_summary.json (default: results)"
+    )
+
+    args = parser.parse_args()
+
+    run_adaptive_benchmark(
+        cv_dir=args.cv_dir,
+        output_dir=args.output,
+        accent_tokens=args.accents,
+        model_size=args.model,
+        baseline_group=args.baseline,
+        target_half_width=args.target_half_width,
+        target_disparity_rel=args.target_disparity_rel,
+        confidence=args.confidence,
+        initial_samples=args.initial,
+        min_samples=args.min_samples,
+        batch_size=args.batch,
+        max_per_group=args.max_per_group,
+        max_rounds=args.max_rounds,
+        seed=args.seed,
+        accent_column=args.accent_column,
+        fallback_accent_column=args.fallback_accent_column,
+        text_column=args.text_column,
+        path_column=args.path_column,
+        metadata_csv=args.metadata_csv or None,
+        engine=args.engine,
+        ground_truth_csv=args.ground_truth,
+        transcripts_csv=args.transcripts,
+        report_dir=args.report_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Canonical 16 kHz mono PCM WAV for organized clips
+
+Whisper decodes and resamples every input to 16 kHz mono through an ffmpeg
+subprocess, on every run. Transcoding once when the dataset is organized
+moves that cost out of the benchmark loop: run_whisper.py reads canonical
+WAVs directly (load_wav) without spawning ffmpeg. Durations and checksums
+are taken from the written file.
+"""
+
+import hashlib
+import shutil
+import subprocess
+import wave
+from pathlib import Path
+import numpy as np
+
+
+SAMPLE_RATE = 16000  # whisper.audio.SAMPLE_RATE
+
+
+def ffmpeg_available():
+    """True if an ffmpeg binary is on PATH."""
+    return shutil.which("ffmpeg") is not None
+
+
+def transcode(src, dst, sample_rate=SAMPLE_RATE):
+    """
+    Decode any audio file to 16-bit mono PCM WAV at ``sample_rate``
+
+    Uses the same ffmpeg resampling Whisper applies when loading audio.
+
+    Args:
+        src (Path): Input audio (mp3, ogg, m4a, flac, wav, ...)
+        dst (Path): Output WAV path
+        sample_rate (int): Output sample rate
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y", "-i", str(src),
+        "-ac", "1", "-ar", str(sample_rate), "-c:a", "pcm_s16le", "-f", "wav", str(dst),
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()[-200:]}")
+
+
+def wav_info(path, hash_name="sha256"):
+    """
+    Duration and checksum of a WAV file
+
+    Args:
+        path (Path): WAV file
+        hash_name (str): hashlib algorithm, or None to skip hashing
+
+    Returns:
+        tuple: (duration in seconds, hex digest or "")
+    """
+    with wave.open(str(path), "rb") as w:
+        duration = w.getnframes() / w.getframerate()
+    digest = ""
+    if hash_name:
+        with open(path, "rb") as f:
+            digest = hashlib.file_digest(f, hash_name).hexdigest()
+    return round(duration, 3), digest
+
+
+def load_wav(path):
+    """
+    Samples of a canonical WAV, as Whisper's load_audio would return them
+
+    Args:
+        path (Path or file object): Audio file, or its bytes (e.g. a shard member)
+
+    Returns:
+        np.ndarray: float32 samples in [-1, 1], or None if the file is not a
+            16 kHz mono 16-bit WAV (callers then fall back to ffmpeg)
+    """
+    if isinstance(path, Path):
+        if path.suffix.lower() != ".wav":
+            return None
+        path = str(path)
+    try:
+        with wave.open(path, "rb") as w:
+            if (w.getframerate(), w.getnchannels(), w.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                return None
+            frames = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    return np.frombuffer(frames, "<i2").astype(np.float32) / 32768.0
@@ -1,20 +1,34 @@
 """
 Metrics Calculation Script
-Calculates CER, intent accuracy, and disparity index for ASR equity evaluation
+Calculates CER, WER, intent accuracy, and disparity index for ASR equity evaluation
 
 Usage:
     python scripts/calculate_metrics.py --input results/intents.csv --output results/metrics.json
 """
 
 import argparse
+import itertools
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import Levenshtein
 from pathlib import Path
 try:
     from _python_version_check import ensure_python_3_12_12
+    from metric_accumulators import (
+        CORRECTNESS_COLUMNS, EDIT_OP_COLUMNS, EXAMPLE_FIELDS, ExampleMiner, MetricsAccumulator,
+    )
+    from table_loading import ENGINES, read_table
+    from text_normalization import NORMALIZED_COLUMNS, NORMALIZER_COLUMN, ensure_normalized, recorded_normalizer
 except ModuleNotFoundError:
     from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.metric_accumulators import (
+        CORRECTNESS_COLUMNS, EDIT_OP_COLUMNS, EXAMPLE_FIELDS, ExampleMiner, MetricsAccumulator,
+    )
+    from scripts.table_loading import ENGINES, read_table
+    from scripts.text_normalization import NORMALIZED_COLUMNS, NORMALIZER_COLUMN, ensure_normalized, recorded_normalizer
 
 
 def calculate_cer(reference, hypothesis):
@@ -39,23 +53,168 @@ def calculate_cer(reference, hypothesis):
     return distance / len(reference)
 
 
-def compute_cer_by_group(intents_df):
+def _distance_chunk(pairs):
+    references, hypotheses = pairs
+    return list(map(Levenshtein.distance, references, hypotheses))
+
+
+# Per-row counts returned by _alignment_chunk are in EDIT_OP_COLUMNS order.
+_OP_OFFSET = {"replace": 0, "insert": 1, "delete": 2}
+
+
+def _alignment_chunk(pairs):
+    references, hypotheses = pairs
+    counts = np.zeros((len(references), 6), dtype=np.int64)
+    for i, (ref, hyp) in enumerate(zip(references, hypotheses)):
+        # One alignment per level; distance and S/I/D all come from its edit ops.
+        for base, (a, b) in ((0, (ref, hyp)), (3, (ref.split(), hyp.split()))):
+            row = counts[i]
+            for op, _, _ in Levenshtein.editops(a, b):
+                row[base + _OP_OFFSET[op]] += 1
+    return counts
+
+
+def _map_pairs(func, references, hypotheses, workers, chunk_size):
+    """Run ``func`` over aligned lists, optionally in a process pool."""
+    if workers and workers > 1 and len(references) > chunk_size:
+        chunks = [
+            (references[i:i + chunk_size], hypotheses[i:i + chunk_size])
+            for i in range(0, len(references), chunk_size)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, chunks))
+    return [func((references, hypotheses))]
+
+
+def _prepare_pairs(references, hypotheses):
+    references = pd.Series(references).reset_index(drop=True)
+    hypotheses = pd.Series(hypotheses).reset_index(drop=True)
+    missing = (references.isna() | hypotheses.isna()).to_numpy()
+    ref_text = references.fillna("").astype(str)
+    hyp_text = hypotheses.fillna("").astype(str)
+    return missing, ref_text, hyp_text
+
+
+def batch_cer(references, hypotheses, workers=1, chunk_size=50_000):
+    """
+    Vectorized CER over aligned reference/hypothesis columns.
+
+    Lowercases each column once, resolves NaN and empty references with
+    masks, and only runs edit distance on the remaining pairs (optionally
+    spread across a process pool). Matches ``calculate_cer`` row for row.
+
+    Args:
+        references (array-like): True transcripts
+        hypotheses (array-like): ASR predicted transcripts
+        workers (int): Processes for edit distance (1 = in-process)
+        chunk_size (int): Pairs per pool task
+
+    Returns:
+        np.ndarray: CER per row
+    """
+    missing, ref_text, hyp_text = _prepare_pairs(references, hypotheses)
+    # Denominator is the original reference length, as in calculate_cer.
+    ref_len = ref_text.str.len().to_numpy()
+    hyp_len = hyp_text.str.len().to_numpy()
+
+    cer = np.ones(len(missing), dtype=float)
+    empty_ref = ~missing & (ref_len == 0)
+    cer[empty_ref] = np.where(hyp_len[empty_ref] > 0, 1.0, 0.0)
+
+    todo = np.flatnonzero(~missing & (ref_len > 0))
+    if len(todo) == 0:
+        return cer
+
+    refs = ref_text.str.lower().to_numpy()[todo].tolist()
+    hyps = hyp_text.str.lower().to_numpy()[todo].tolist()
+    parts = _map_pairs(_distance_chunk, refs, hyps, workers, chunk_size)
+    distances = [d for part in parts for d in part]
+
+    cer[todo] = np.asarray(distances, dtype=float) / ref_len[todo]
+    return cer
+
+
+def batch_alignment(references, hypotheses, workers=1, chunk_size=20_000):
+    """
+    CER, WER and edit-operation counts from one alignment pass per level.
+
+    Each reference/hypothesis pair is aligned once at character level and
+    once at word level (lowercased, whitespace-tokenized); distances and
+    substitution/insertion/deletion counts are read off the same edit ops.
+    ``cer`` matches ``calculate_cer``; ``wer`` follows the same conventions
+    (missing → 1.0, empty reference → 0.0 or 1.0).
+
+    A missing hypothesis (a failed transcription) is aligned as "", so its
+    reference counts as deletions and the pooled rates keep matching
+    numerators and denominators.
+
+    Args:
+        references (array-like): True transcripts
+        hypotheses (array-like): ASR predicted transcripts
+        workers (int): Processes for alignment (1 = in-process)
+        chunk_size (int): Pairs per pool task
+
+    Returns:
+        pd.DataFrame: cer, wer, ref_chars, ref_words and EDIT_OP_COLUMNS per row
+            (counts are NaN where the reference is missing)
+    """
+    index = references.index if isinstance(references, pd.Series) else None
+    missing, ref_text, hyp_text = _prepare_pairs(references, hypotheses)
+    no_ref = pd.Series(references).isna().to_numpy()
+    ref_chars = ref_text.str.len().to_numpy()
+    ref_lower = ref_text.str.lower()
+    hyp_lower = hyp_text.str.lower()
+    ref_words = ref_lower.str.split().str.len().to_numpy()
+
+    counts = np.full((len(missing), 6), np.nan)
+    todo = np.flatnonzero(~no_ref)
+    if len(todo) > 0:
+        parts = _map_pairs(
+            _alignment_chunk,
+            ref_lower.to_numpy()[todo].tolist(),
+            hyp_lower.to_numpy()[todo].tolist(),
+            workers,
+            chunk_size,
+        )
+        counts[todo] = np.concatenate(parts)
+
+    result = pd.DataFrame(counts, columns=EDIT_OP_COLUMNS, index=index)
+    char_edits = counts[:, 0:3].sum(axis=1)
+    word_edits = counts[:, 3:6].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cer = np.where(ref_chars > 0, char_edits / ref_chars, np.where(char_edits > 0, 1.0, 0.0))
+        wer = np.where(ref_words > 0, word_edits / ref_words, np.where(word_edits > 0, 1.0, 0.0))
+    cer[missing] = 1.0
+    wer[missing] = 1.0
+
+    result.insert(0, "cer", cer)
+    result.insert(1, "wer", wer)
+    result.insert(2, "ref_chars", ref_chars)
+    result.insert(3, "ref_words", ref_words)
+    return result
+
+
+def compute_cer_by_group(intents_df, workers=1):
     """
     Calculate CER for each accent group
 
     Args:
         intents_df (pd.DataFrame): DataFrame with transcripts and labels
+        workers (int): Processes for batched edit distance
 
     Returns:
         pd.DataFrame: CER statistics by group
     """
     print(f"\nCalculating Character Error Rate (CER)...")
 
-    # Calculate CER for each row
-    intents_df["cer"] = intents_df.apply(
-        lambda row: calculate_cer(row["true_transcript"], row["transcribed_text"]),
-        axis=1
+    # CER, WER and edit-op counts for all rows from one alignment pass,
+    # on the normalized text cached by classify_intent.py
+    ensure_normalized(intents_df)
+    alignment = batch_alignment(
+        intents_df["true_transcript_norm"], intents_df["transcribed_text_norm"], workers=workers
     )
+    for column in alignment.columns:
+        intents_df[column] = alignment[column]
 
     # Aggregate by accent group
     cer_by_group = intents_df.groupby("accent_group").agg({
@@ -71,24 +230,102 @@ def compute_cer_by_group(intents_df):
     return cer_by_group
 
 
-def compute_intent_accuracy(intents_df, correctness_col="intent_correct"):
+def compute_error_breakdown_by_group(intents_df):
+    """
+    Aggregate WER and character/word edit operations by accent group
+
+    Args:
+        intents_df (pd.DataFrame): DataFrame with ``batch_alignment`` columns
+
+    Returns:
+        pd.DataFrame: Mean WER, pooled CER/WER and S/I/D totals by group
+    """
+    print(f"\nCalculating WER and edit-operation breakdown...")
+
+    sums = intents_df.groupby("accent_group")[["ref_chars", "ref_words"] + EDIT_OP_COLUMNS].sum()
+    breakdown = intents_df.groupby("accent_group")["wer"].agg(["mean", "std"])
+    breakdown.columns = ["wer_mean", "wer_std"]
+    for column in EDIT_OP_COLUMNS:
+        breakdown[column] = sums[column].astype(int)
+
+    # Pooled rates weight each sample by its reference length.
+    char_edits = sums[EDIT_OP_COLUMNS[0:3]].sum(axis=1)
+    word_edits = sums[EDIT_OP_COLUMNS[3:6]].sum(axis=1)
+    breakdown["cer_pooled"] = char_edits / sums["ref_chars"].where(sums["ref_chars"] > 0)
+    breakdown["wer_pooled"] = word_edits / sums["ref_words"].where(sums["ref_words"] > 0)
+    breakdown = breakdown.round(4)
+
+    print(f"\nWER and Edit Operations by Accent Group:")
+    print(breakdown)
+
+    return breakdown
+
+
+# Row subsets tracked by the metric cube.
+CUBE_SUBSETS = ("all", "known")
+
+
+def compute_metric_cube(intents_df, correctness_cols=("intent_correct", "intent_correct_after")):
+    """
+    Correct counts and totals for every (subset × correctness column × accent_group)
+
+    One grouped aggregation over (known_intent, accent_group) produces all
+    counts; the "all" subset is rolled up from it, so no filtered copies are
+    made and adding correctness variants adds columns, not passes.
+
+    Args:
+        intents_df (pd.DataFrame): DataFrame with correctness columns
+        correctness_cols (tuple): Correctness columns (missing ones are skipped)
+
+    Returns:
+        dict: subset → DataFrame indexed by accent_group with (column, sum/count/mean) columns
+            ("known" is None when every true_intent is 'unknown')
+    """
+    cols = [col for col in correctness_cols if col in intents_df.columns]
+    if "true_intent" in intents_df.columns:
+        known = intents_df["true_intent"].astype(str).str.lower() != "unknown"
+    else:
+        known = pd.Series(True, index=intents_df.index)
+
+    cells = intents_df.groupby([known.rename("known_intent"), intents_df["accent_group"]])[cols].agg(["sum", "count"])
+
+    cube = {"all": cells.groupby(level="accent_group").sum()}
+    known_levels = cells.index.get_level_values("known_intent")
+    cube["known"] = cells[known_levels].droplevel("known_intent") if known_levels.any() else None
+
+    for subset in CUBE_SUBSETS:
+        table = cube[subset]
+        if table is None:
+            continue
+        for col in cols:
+            table[(col, "mean")] = table[(col, "sum")] / table[(col, "count")]
+        cube[subset] = table.sort_index(axis=1)
+    return cube
+
+
+def compute_intent_accuracy(intents_df, correctness_col="intent_correct", counts=None):
     """
     Calculate intent classification accuracy by group
 
     Args:
         intents_df (pd.DataFrame): DataFrame with intent predictions
         correctness_col (str): Column indicating correctness (True/False)
+        counts (pd.DataFrame): Precomputed per-group sum/count for the column
+            (e.g. ``compute_metric_cube(...)[subset][correctness_col]``); skips the groupby
 
     Returns:
         pd.DataFrame: Accuracy statistics by group
     """
     print(f"\nCalculating Intent Accuracy ({correctness_col})...")
 
-    accuracy_by_group = intents_df.groupby("accent_group").agg({
-        correctness_col: ["mean", "sum", "count"]
-    })
+    if counts is None:
+        counts = intents_df.groupby("accent_group")[correctness_col].agg(["sum", "count"])
 
-    accuracy_by_group.columns = ["accuracy", "correct_count", "total"]
+    accuracy_by_group = pd.DataFrame({
+        "accuracy": counts["sum"] / counts["count"],
+        "correct_count": counts["sum"],
+        "total": counts["count"],
+    })
     accuracy_by_group["accuracy"] = (accuracy_by_group["accuracy"] * 100).round(2)
     accuracy_by_group["error_rate"] = (100 - accuracy_by_group["accuracy"]).round(2)
 
@@ -98,7 +335,7 @@ def compute_intent_accuracy(intents_df, correctness_col="intent_correct"):
     return accuracy_by_group
 
 
-def compute_disparity_index(intents_df, baseline_group="US", correctness_col="intent_correct"):
+def compute_disparity_index(intents_df, baseline_group="US", correctness_col="intent_correct", counts=None):
     """
     Calculate Disparity Index = error_rate(group) / error_rate(baseline)
     Values > 1 indicate worse performance than baseline
@@ -107,6 +344,7 @@ def compute_disparity_index(intents_df, baseline_group="US", correctness_col="in
         intents_df (pd.DataFrame): DataFrame with intent correctness
         baseline_group (str): Baseline accent group (default: US)
         correctness_col (str): Column indicating correctness (True/False)
+        counts (pd.DataFrame): Precomputed per-group sum/count for the column; skips the groupby
 
     Returns:
         pd.DataFrame: Disparity index by group
@@ -114,7 +352,9 @@ def compute_disparity_index(intents_df, baseline_group="US", correctness_col="in
     print(f"\nCalculating Disparity Index (baseline: {baseline_group}, col: {correctness_col})...")
 
     # Calculate smoothed error rates to avoid unstable divide-by-zero behavior
-    grouped = intents_df.groupby("accent_group")[correctness_col].agg(["sum", "count"])
+    if counts is None:
+        counts = intents_df.groupby("accent_group")[correctness_col].agg(["sum", "count"])
+    grouped = counts[["sum", "count"]].copy()
     grouped["errors"] = grouped["count"] - grouped["sum"]
     # Jeffreys-style smoothing: (errors + 0.5) / (n + 1)
     grouped["error_rate"] = ((grouped["errors"] + 0.5) / (grouped["count"] + 1.0)) * 100
@@ -136,35 +376,484 @@ def compute_disparity_index(intents_df, baseline_group="US", correctness_col="in
     return error_rates
 
 
-def find_failure_examples(intents_df, num_examples=5):
+# Drawing a multinomial costs roughly one binomial draw per distinct value,
+# ~50-100x a single index gather, so only use it when values repeat a lot.
+_MULTINOMIAL_MAX_UNIQUE_RATIO = 1 / 80
+# Bound on (permutations × pooled rows) per dense subset draw: float64 keys
+# plus int64 argpartition output, so ~64 MB per block at 2**22.
+_PERMUTATION_MAX_BLOCK_ELEMS = 2**22
+
+
+def _bootstrap_means(values, n_resamples, seed_seq, workers=1, max_block_elems=2**25):
     """
-    Find clear examples of transcription/intent failures for demo
+    Bootstrap distribution of the mean of ``values``.
+
+    Resampling n rows with replacement is the same as drawing multinomial
+    counts over the distinct values, which is far cheaper when values
+    repeat (CER is often 0.0). Otherwise draw (resamples × n) index
+    matrices in blocks bounded by ``max_block_elems``; each block has its
+    own spawned seed, so blocks can run on a thread pool (NumPy releases
+    the GIL) and results do not depend on ``workers``.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return np.full(n_resamples, np.nan)
+
+    uniques, counts = np.unique(values, return_counts=True)
+    if len(uniques) <= n * _MULTINOMIAL_MAX_UNIQUE_RATIO:
+        draws = np.random.default_rng(seed_seq).multinomial(n, counts / n, size=n_resamples)
+        return draws @ uniques / n
+
+    block = max(1, max_block_elems // n)
+    starts = list(range(0, n_resamples, block))
+    index_dtype = np.int64 if n >= 2**31 else np.int32
+
+    def run_block(args):
+        start, child_seed = args
+        size = min(block, n_resamples - start)
+        idx = np.random.default_rng(child_seed).integers(0, n, size=(size, n), dtype=index_dtype)
+        return values[idx].mean(axis=1)
+
+    tasks = list(zip(starts, seed_seq.spawn(len(starts))))
+    if workers and workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run_block, tasks))
+    else:
+        parts = [run_block(task) for task in tasks]
+    return np.concatenate(parts)
+
+
+def _percentile_ci(samples, confidence):
+    """Percentile interval per column of a (resamples × groups) matrix."""
+    alpha = (1 - confidence) / 2
+    return np.nanpercentile(samples, [alpha * 100, (1 - alpha) * 100], axis=0)
+
+
+def bootstrap_confidence_intervals(
+    intents_df,
+    baseline_group="US",
+    correctness_cols=("intent_correct", "intent_correct_after"),
+    n_resamples=2000,
+    confidence=0.95,
+    seed=42,
+    workers=1,
+):
+    """
+    Stratified bootstrap CIs for CER, intent accuracy and disparity index
+
+    Rows are resampled with replacement within each accent group. For a
+    binary correctness column the resampled correct count is exactly
+    Binomial(n_group, accuracy_group), so all resamples for all groups are
+    drawn as one (resamples × groups) matrix; disparity follows the same
+    Jeffreys smoothing as ``compute_disparity_index``.
 
     Args:
-        intents_df (pd.DataFrame): DataFrame with all results
-        num_examples (int): Number of examples to find
+        intents_df (pd.DataFrame): DataFrame with cer and correctness columns
+        baseline_group (str): Baseline accent group for disparity
+        correctness_cols (tuple): Correctness columns to evaluate (missing ones are skipped)
+        n_resamples (int): Number of bootstrap resamples
+        confidence (float): Confidence level for percentile intervals
+        seed (int): Random seed
+        workers (int): Threads for the CER resampling blocks
 
     Returns:
-        tuple: (failures, successes) DataFrames
+        dict: Percentile CIs per metric and group
     """
-    print(f"\nFinding illustrative examples...")
+    print(f"\nBootstrapping {confidence:.0%} CIs ({n_resamples} stratified resamples)...")
+    grouped = intents_df.groupby("accent_group")
+    groups = list(grouped.groups.keys())
+    if not groups:
+        print("⚠️  Warning: No accent groups to bootstrap.")
+        return {
+            "n_resamples": n_resamples, "confidence": confidence, "seed": seed,
+            "baseline": baseline_group, "accuracy": {}, "disparity_index": {},
+        }
+    # Independent child streams per group (CER) and for the binomial draws.
+    group_seeds = np.random.SeedSequence(seed).spawn(len(groups) + 1)
+    rng = np.random.default_rng(group_seeds[-1])
+    if baseline_group not in groups:
+        baseline_group = groups[0]
+    baseline_idx = groups.index(baseline_group)
+
+    def as_dict(ci):
+        return {
+            group: {"low": round(float(ci[0, g]), 4), "high": round(float(ci[1, g]), 4)}
+            for g, group in enumerate(groups)
+        }
+
+    result = {
+        "n_resamples": n_resamples,
+        "confidence": confidence,
+        "seed": seed,
+        "baseline": baseline_group,
+        "accuracy": {},
+        "disparity_index": {},
+    }
+
+    if "cer" in intents_df.columns:
+        cer_samples = np.column_stack([
+            _bootstrap_means(
+                grouped.get_group(group)["cer"].dropna().to_numpy(), n_resamples, group_seeds[g], workers
+            )
+            for g, group in enumerate(groups)
+        ])
+        result["cer_mean"] = as_dict(_percentile_ci(cer_samples, confidence))
+
+    for col in correctness_cols:
+        if col not in intents_df.columns:
+            continue
+        counts = grouped[col].agg(["sum", "count"]).loc[groups]
+        n = counts["count"].to_numpy()
+        p = counts["sum"].to_numpy() / np.maximum(n, 1)
+        correct = rng.binomial(n, p, size=(n_resamples, len(groups)))
+
+        accuracy = correct / np.maximum(n, 1) * 100
+        error_rate = ((n - correct) + 0.5) / (n + 1.0)
+        disparity = error_rate / error_rate[:, [baseline_idx]]
+
+        result["accuracy"][col] = as_dict(_percentile_ci(accuracy, confidence))
+        result["disparity_index"][col] = as_dict(_percentile_ci(disparity, confidence))
+
+    print(f"\n{confidence:.0%} Bootstrap CIs (baseline: {baseline_group}):")
+    for group in groups:
+        parts = []
+        if "cer_mean" in result:
+            ci = result["cer_mean"][group]
+            parts.append(f"CER [{ci['low']:.3f}, {ci['high']:.3f}]")
+        for col, cis in result["accuracy"].items():
+            acc = cis[group]
+            disp = result["disparity_index"][col][group]
+            parts.append(
+                f"{col}: acc [{acc['low']:.1f}, {acc['high']:.1f}] DI [{disp['low']:.2f}, {disp['high']:.2f}]"
+            )
+        print(f"  {group:15s}: " + "  ".join(parts))
+
+    return result
+
+
+def _smoothed_disparity(correct_x, n_x, correct_b, n_b):
+    """Jeffreys-smoothed error-rate ratio, as in compute_disparity_index."""
+    error_x = ((n_x - correct_x) + 0.5) / (n_x + 1.0)
+    error_b = ((n_b - correct_b) + 0.5) / (n_b + 1.0)
+    return error_x / error_b
+
+
+def _permutation_block(task):
+    """
+    Count permuted statistics at least as extreme as observed for one block.
+
+    Shuffling accent labels between group X and the baseline makes X's
+    correct count Hypergeometric(total correct, total wrong, n_x) and X's
+    CER values a uniform random subset of the pooled CER values, so each
+    block is drawn in one vectorized call per statistic. Dense CER subsets
+    are drawn in sub-blocks of at most ``_PERMUTATION_MAX_BLOCK_ELEMS`` keys,
+    which consume the same random stream as one large draw.
+    """
+    (seed_seq, size, n_x, n_b, correctness, cer_pool, cer_n_x, observed_cer_gap) = task
+    rng = np.random.default_rng(seed_seq)
+
+    disparity_exceed = {}
+    for col, (total_correct, observed) in correctness.items():
+        correct_x = rng.hypergeometric(total_correct, n_x + n_b - total_correct, n_x, size=size)
+        disparity = _smoothed_disparity(correct_x, n_x, total_correct - correct_x, n_b)
+        disparity_exceed[col] = int(np.count_nonzero(disparity >= observed - 1e-12))
+
+    cer_exceed = None
+    if cer_pool is not None:
+        uniques, counts = cer_pool
+        total = counts.sum()
+        cer_total = counts @ uniques
+        if len(uniques) <= total * _MULTINOMIAL_MAX_UNIQUE_RATIO:
+            picked = rng.multivariate_hypergeometric(counts, cer_n_x, size=size) @ uniques
+        else:
+            pooled = np.repeat(uniques, counts)
+            rows = max(1, _PERMUTATION_MAX_BLOCK_ELEMS // total)
+            parts = []
+            for start in range(0, size, rows):
+                keys = rng.random((min(rows, size - start), total))
+                subset = np.argpartition(keys, cer_n_x - 1, axis=1)[:, :cer_n_x]
+                parts.append(pooled[subset].sum(axis=1))
+            picked = np.concatenate(parts)
+        gap = picked / cer_n_x - (cer_total - picked) / (total - cer_n_x)
+        cer_exceed = int(np.count_nonzero(gap >= observed_cer_gap - 1e-12))
+
+    return disparity_exceed, cer_exceed
+
+
+def _decided(exceed, done, alpha, z=3.29):
+    """True once a Wilson interval (99.9% by default) on p excludes alpha."""
+    p = (exceed + 1) / (done + 1)
+    n = done + 1
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return center + half < alpha or center - half > alpha
+
+
+def permutation_test_disparity(
+    intents_df,
+    baseline_group="US",
+    correctness_cols=("intent_correct", "intent_correct_after"),
+    n_permutations=10000,
+    alpha=0.05,
+    seed=42,
+    workers=1,
+    block_size=1000,
+    early_stopping=True,
+):
+    """
+    One-sided permutation tests: is each group served worse than baseline?
+
+    For every non-baseline group, accent labels are shuffled between that
+    group and the baseline, and the Jeffreys-smoothed disparity (per
+    correctness column) and the CER gap (group mean - baseline mean) are
+    recomputed. p = (exceedances + 1) / (permutations + 1).
+
+    Permutations run in vectorized blocks with spawned seeds, optionally on
+    a process pool. Blocks are consumed in fixed rounds, so results depend
+    only on ``seed`` (not ``workers``). With ``early_stopping`` a group
+    stops once every p-value is confidently above or below ``alpha``.
+
+    Args:
+        intents_df (pd.DataFrame): DataFrame with accent_group, correctness and cer
+        baseline_group (str): Baseline accent group
+        correctness_cols (tuple): Correctness columns to test (missing ones are skipped)
+        n_permutations (int): Maximum permutations per group
+        alpha (float): Significance threshold used for early stopping
+        seed (int): Random seed
+        workers (int): Processes for permutation blocks
+        block_size (int): Permutations per block
+        early_stopping (bool): Stop groups whose p-values are already decided
+
+    Returns:
+        dict: Observed statistics and p-values per group
+    """
+    print(f"\nRunning permutation tests (up to {n_permutations} permutations per group)...")
+    groups = sorted(intents_df["accent_group"].dropna().unique())
+    if not groups:
+        print("⚠️  Warning: No accent groups to test.")
+        return {"baseline": baseline_group, "alpha": alpha, "max_permutations": 0, "seed": seed, "groups": {}}
+    if baseline_group not in groups:
+        print(f"⚠️  Warning: Baseline group '{baseline_group}' not found. Using first group.")
+        baseline_group = groups[0]
+    correctness_cols = [col for col in correctness_cols if col in intents_df.columns]
+    has_cer = "cer" in intents_df.columns
+
+    base = intents_df[intents_df["accent_group"] == baseline_group]
+    n_blocks = -(-n_permutations // block_size)
+    round_blocks = 4
+    group_seeds = dict(zip(groups, np.random.SeedSequence(seed).spawn(len(groups))))
+
+    result = {
+        "baseline": baseline_group,
+        "alpha": alpha,
+        "max_permutations": n_permutations,
+        "seed": seed,
+        "groups": {},
+    }
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        for group in groups:
+            if group == baseline_group:
+                continue
+            other = intents_df[intents_df["accent_group"] == group]
+            n_x, n_b = len(other), len(base)
+
+            correctness = {}
+            observed = {}
+            for col in correctness_cols:
+                correct_x, correct_b = int(other[col].sum()), int(base[col].sum())
+                observed[col] = float(_smoothed_disparity(correct_x, n_x, correct_b, n_b))
+                correctness[col] = (correct_x + correct_b, observed[col])
+
+            cer_pool, cer_n_x, observed_gap = None, 0, None
+            if has_cer:
+                cer_x, cer_b = other["cer"].dropna().to_numpy(), base["cer"].dropna().to_numpy()
+                if len(cer_x) and len(cer_b):
+                    observed_gap = float(cer_x.mean() - cer_b.mean())
+                    cer_pool = np.unique(np.concatenate([cer_x, cer_b]), return_counts=True)
+                    cer_n_x = len(cer_x)
+
+            block_seeds = group_seeds[group].spawn(n_blocks)
+            disparity_exceed = {col: 0 for col in correctness}
+            cer_exceed = 0
+            done = 0
+            for start in range(0, n_blocks, round_blocks):
+                tasks = [
+                    (block_seeds[b], min(block_size, n_permutations - b * block_size), n_x, n_b,
+                     correctness, cer_pool, cer_n_x, observed_gap)
+                    for b in range(start, min(start + round_blocks, n_blocks))
+                ]
+                outputs = pool.map(_permutation_block, tasks) if pool else map(_permutation_block, tasks)
+                for task, (d_exceed, c_exceed) in zip(tasks, outputs):
+                    done += task[1]
+                    for col, count in d_exceed.items():
+                        disparity_exceed[col] += count
+                    if c_exceed is not None:
+                        cer_exceed += c_exceed
+
+                exceeds = list(disparity_exceed.values()) + ([cer_exceed] if cer_pool is not None else [])
+                if early_stopping and all(_decided(e, done, alpha) for e in exceeds):
+                    break
+
+            entry = {"permutations": done, "stopped_early": done < n_permutations, "disparity_index": {}}
+            for col in correctness:
+                entry["disparity_index"][col] = {
+                    "observed": round(observed[col], 4),
+                    "p_value": round((disparity_exceed[col] + 1) / (done + 1), 4),
+                }
+            if cer_pool is not None:
+                entry["cer_gap"] = {
+                    "observed": round(observed_gap, 4),
+                    "p_value": round((cer_exceed + 1) / (done + 1), 4),
+                }
+            result["groups"][group] = entry
+    finally:
+        if pool:
+            pool.shutdown()
 
-    # Find failures with high CER
-    failures = intents_df[
-        (intents_df["intent_correct"] == False) &
-        (intents_df["cer"] > 0.2)
-    ].sort_values("cer", ascending=False).head(num_examples)
+    print(f"\nPermutation p-values vs {baseline_group} (one-sided, H1: group worse):")
+    for group, entry in result["groups"].items():
+        parts = [
+            f"{col} DI={v['observed']:.2f} p={v['p_value']:.4f}"
+            for col, v in entry["disparity_index"].items()
+        ]
+        if "cer_gap" in entry:
+            parts.append(f"CER gap={entry['cer_gap']['observed']:+.3f} p={entry['cer_gap']['p_value']:.4f}")
+        stop_note = " (early stop)" if entry["stopped_early"] else ""
+        print(f"  {group:15s}: " + "  ".join(parts) + f"  [{entry['permutations']} perms{stop_note}]")
 
-    # Find successes for comparison
-    successes = intents_df[
-        (intents_df["intent_correct"] == True) &
-        (intents_df["cer"] < 0.1)
-    ].head(num_examples)
+    return result
 
+
+# Dimensions for intersectional slices, and the marker for a rolled-up dimension.
+SLICE_DIMENSIONS = ("accent_group", "speaker_type", "true_intent", "model")
+SLICE_ALL = "*"
+_SLICE_MEASURES = ("intent_correct", "intent_correct_after", "cer", "wer")
+
+
+def build_slice_cube(intents_df, dims=SLICE_DIMENSIONS):
+    """
+    Sparse aggregate over every occupied combination of slice dimensions
+
+    Stores additive sums only (row count, correct counts, CER/WER sums and
+    CER sum of squares), so any roll-up or drill-down is an exact sum over
+    cells and never rescans the raw rows. Dimensions missing from the data
+    (e.g. ``model`` for older transcripts) are skipped.
+
+    Args:
+        intents_df (pd.DataFrame): DataFrame with results
+        dims (tuple): Candidate slice dimensions
+
+    Returns:
+        pd.DataFrame: Sums indexed by the available dimensions
+    """
+    dims = [dim for dim in dims if dim in intents_df.columns]
+    frame = pd.DataFrame({dim: intents_df[dim].fillna("N/A").astype(str) for dim in dims})
+    frame["n"] = 1
+    for measure in _SLICE_MEASURES:
+        if measure in intents_df.columns:
+            values = intents_df[measure].astype(float)
+            frame[f"{measure}_sum"] = values
+            if measure == "cer":
+                frame["cer_sq_sum"] = values ** 2
+    return frame.groupby(dims, sort=True).sum()
+
+
+def rollup_slices(cells, keep_dims=()):
+    """Sum cells over every dimension not in ``keep_dims``."""
+    keep_dims = list(keep_dims)
+    if not keep_dims:
+        return cells.sum().to_frame().T
+    return cells.groupby(level=keep_dims, sort=True).sum()
+
+
+def drilldown_slices(cells, **filters):
+    """Cells matching every ``dimension=value`` filter (values may be lists)."""
+    mask = np.ones(len(cells), dtype=bool)
+    for dim, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        mask &= cells.index.get_level_values(dim).isin([str(v) for v in values])
+    return cells[mask]
+
+
+def slice_metrics(sums):
+    """Derive n, accuracy and CER/WER statistics from summed cells."""
+    n = sums["n"]
+    metrics = pd.DataFrame({"n": n.astype(int)}, index=sums.index)
+    for col in ("intent_correct", "intent_correct_after"):
+        if f"{col}_sum" in sums.columns:
+            name = "accuracy" if col == "intent_correct" else "accuracy_after"
+            metrics[name] = (sums[f"{col}_sum"] / n * 100).round(2)
+    if "cer_sum" in sums.columns:
+        metrics["cer_mean"] = (sums["cer_sum"] / n).round(4)
+        variance = (sums["cer_sq_sum"] - sums["cer_sum"] ** 2 / n) / (n - 1).where(n > 1)
+        metrics["cer_std"] = np.sqrt(variance.clip(lower=0)).round(4)
+    if "wer_sum" in sums.columns:
+        metrics["wer_mean"] = (sums["wer_sum"] / n).round(4)
+    return metrics
+
+
+def export_slices(cells, output_csv, min_support=5):
+    """
+    Export every roll-up of the slice cube as one tidy CSV
+
+    Each row is one slice; rolled-up dimensions hold ``*``. Slices with
+    fewer than ``min_support`` samples are suppressed (roll-ups are still
+    computed from all cells, so suppression never changes other rows).
+
+    Args:
+        cells (pd.DataFrame): Output of ``build_slice_cube``
+        output_csv (str): Output CSV path
+        min_support (int): Minimum samples for a slice to be reported
+
+    Returns:
+        pd.DataFrame: Exported slices
+    """
+    dims = list(cells.index.names)
+    frames = []
+    for depth in range(len(dims) + 1):
+        for keep in itertools.combinations(dims, depth):
+            metrics = slice_metrics(rollup_slices(cells, keep))
+            metrics = metrics.reset_index(drop=not keep)
+            for dim in dims:
+                if dim not in keep:
+                    metrics[dim] = SLICE_ALL
+            metrics.insert(0, "depth", depth)
+            frames.append(metrics)
+
+    slices = pd.concat(frames, ignore_index=True)
+    slices = slices[["depth"] + dims + [c for c in slices.columns if c not in dims and c != "depth"]]
+    supported = slices["n"] >= min_support
+    exported = slices[supported].reset_index(drop=True)
+
+    Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+    exported.to_csv(output_csv, index=False)
+    print(f"\nIntersectional slices over {dims}: {len(cells)} occupied cells, "
+          f"{len(exported)} slices exported, {int((~supported).sum())} suppressed (n < {min_support})")
+    print(f"✅ Slices saved to: {output_csv}")
+    return exported
+
+
+def worst_slices(slices, metric="accuracy", top_n=10):
+    """Lowest-``metric`` two-way slices involving accent_group, for metrics.json."""
+    if metric not in slices.columns or "accent_group" not in slices.columns:
+        return []
+    pairs = slices[(slices["depth"] == 2) & (slices["accent_group"] != SLICE_ALL)]
+    worst = pairs.sort_values([metric, "n"], ascending=[True, False]).head(top_n)
+    dims = [c for c in SLICE_DIMENSIONS if c in slices.columns]
+    return [
+        {**{dim: row[dim] for dim in dims if row[dim] != SLICE_ALL}, "n": int(row["n"]), metric: float(row[metric])}
+        for _, row in worst.iterrows()
+    ]
+
+
+def _print_examples(failures, successes):
     print(f"\n{'='*70}")
     print(f"FAILURE EXAMPLES (High CER, Wrong Intent)")
     print(f"{'='*70}")
-    for _, row in failures.iterrows():
+    for row in failures:
         print(f"\nFile: {row['filename']} ({row['accent_group']})")
         print(f"  True:     '{row['true_transcript']}'")
         print(f"  Whisper:  '{row['transcribed_text']}'")
@@ -174,14 +863,73 @@ def find_failure_examples(intents_df, num_examples=5):
     print(f"\n{'='*70}")
     print(f"SUCCESS EXAMPLES (Low CER, Correct Intent)")
     print(f"{'='*70}")
-    for _, row in successes.iterrows():
+    for row in successes:
         print(f"\nFile: {row['filename']} ({row['accent_group']})")
         print(f"  True:     '{row['true_transcript']}'")
         print(f"  Whisper:  '{row['transcribed_text']}'")
         print(f"  Intent:   {row['true_intent']} → {row['predicted_intent']} ✅")
         print(f"  CER:      {row['cer']:.1%}")
 
-    return failures, successes
+
+def report_examples(miner, num_examples=5, output_json=None):
+    """
+    Print and save examples collected by an ExampleMiner
+
+    The printed failures are the global worst ``num_examples`` (always
+    contained in the per-group heaps); printed successes are drawn
+    round-robin across groups so every accent is represented.
+
+    Args:
+        miner (ExampleMiner): Miner fed with all chunks
+        num_examples (int): Number of examples to print per section
+        output_json (str): Path for the per-group examples artifact (optional)
+
+    Returns:
+        tuple: (failures, successes) DataFrames of the printed examples
+    """
+    by_group = miner.failures_by_group()
+    failures = sorted(
+        (r for rows in by_group.values() for r in rows),
+        key=lambda r: (r["cer"], r["filename"]),
+        reverse=True,
+    )[:num_examples]
+
+    success_lists = list(miner.successes_by_group().values())
+    successes = []
+    for rank in range(miner.k):
+        for rows in success_lists:
+            if rank < len(rows) and len(successes) < num_examples:
+                successes.append(rows[rank])
+
+    _print_examples(failures, successes)
+
+    if output_json:
+        Path(output_json).parent.mkdir(parents=True, exist_ok=True)
+        miner.save(output_json)
+        print(f"\n✅ Per-group examples saved to: {output_json}")
+
+    return pd.DataFrame(failures), pd.DataFrame(successes)
+
+
+def find_failure_examples(intents_df, num_examples=5, output_json=None, seed=42):
+    """
+    Find clear examples of transcription/intent failures for demo
+
+    Uses the same streaming per-group miner as chunked runs, so no full
+    sort of the failure subset is needed.
+
+    Args:
+        intents_df (pd.DataFrame): DataFrame with all results
+        num_examples (int): Number of examples to find (per group in the artifact)
+        output_json (str): Path for the per-group examples artifact (optional)
+        seed (int): Seed for success reservoir sampling
+
+    Returns:
+        tuple: (failures, successes) DataFrames
+    """
+    print(f"\nFinding illustrative examples...")
+    miner = ExampleMiner(k=num_examples, seed=seed).update(intents_df)
+    return report_examples(miner, num_examples, output_json)
 
 
 def save_metrics_json(
@@ -195,6 +943,13 @@ def save_metrics_json(
     known_disparity_df=None,
     known_accuracy_after=None,
     known_disparity_after=None,
+    error_breakdown=None,
+    bootstrap_ci=None,
+    known_bootstrap_ci=None,
+    permutation_tests=None,
+    intersectional_slices=None,
+    omitted=None,
+    normalizer=None,
 ):
     """
     Save all metrics to JSON file for easy loading
@@ -205,9 +960,17 @@ def save_metrics_json(
         disparity_df (pd.DataFrame): Disparity index
         accuracy_after (pd.DataFrame): Accuracy after benchmark (optional)
         disparity_after (pd.DataFrame): Disparity after benchmark (optional)
+        error_breakdown (pd.DataFrame): WER and edit operations by group (optional)
+        bootstrap_ci (dict): Bootstrap CIs for all samples (optional)
+        known_bootstrap_ci (dict): Bootstrap CIs for the known-intent subset (optional)
+        permutation_tests (dict): Permutation test p-values (optional)
+        intersectional_slices (dict): Slice export summary and worst slices (optional)
+        omitted (list): Sections this run could not compute, recorded as "omitted" (optional)
+        normalizer (str): Text normalizer behind CER/WER and intents (optional)
         output_path (str): Output JSON file path
     """
     metrics = {
+        "normalizer": normalizer or "unknown",
         "cer_by_group": cer_by_group.to_dict(),
         "accuracy_by_group": accuracy_by_group.to_dict(),
         "disparity_index": disparity_df.to_dict()
@@ -225,6 +988,18 @@ def save_metrics_json(
         metrics["known_accuracy_by_group_after"] = known_accuracy_after.to_dict()
     if known_disparity_after is not None:
         metrics["known_disparity_index_after"] = known_disparity_after.to_dict()
+    if error_breakdown is not None:
+        metrics["error_breakdown_by_group"] = error_breakdown.to_dict()
+    if bootstrap_ci is not None:
+        metrics["bootstrap_ci"] = bootstrap_ci
+    if known_bootstrap_ci is not None:
+        metrics["known_bootstrap_ci"] = known_bootstrap_ci
+    if permutation_tests is not None:
+        metrics["permutation_tests"] = permutation_tests
+    if intersectional_slices is not None:
+        metrics["intersectional_slices"] = intersectional_slices
+    if omitted:
+        metrics["omitted"] = omitted
 
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w") as f:
@@ -233,6 +1008,105 @@ def save_metrics_json(
     print(f"\n✅ Metrics saved to: {output_path}")
 
 
+# Columns the accumulator and example miner read; the rest are not parsed.
+ACCUMULATOR_COLUMNS = (
+    *EXAMPLE_FIELDS, *CORRECTNESS_COLUMNS, *NORMALIZED_COLUMNS, *NORMALIZED_COLUMNS.values(), NORMALIZER_COLUMN,
+)
+
+
+def accumulate_metrics(input_csv, chunksize, workers=1, miner=None):
+    """
+    Fold intents.csv into a MetricsAccumulator one chunk at a time
+
+    Args:
+        input_csv (str): Intent classification results CSV
+        chunksize (int): Rows per chunk
+        workers (int): Processes for batched CER
+        miner (ExampleMiner): Optional example miner fed with the same chunks
+
+    Returns:
+        MetricsAccumulator: Accumulated per-group statistics
+    """
+    print(f"\nStreaming {input_csv} in chunks of {chunksize} rows...")
+    accumulator = MetricsAccumulator()
+    rows = 0
+    for chunk in read_table(input_csv, columns=ACCUMULATOR_COLUMNS, chunksize=chunksize):
+        if "true_transcript" in chunk.columns and "transcribed_text" in chunk.columns:
+            # Same alignment pass as compute_cer_by_group: CER, WER and edit ops
+            ensure_normalized(chunk)
+            alignment = batch_alignment(chunk["true_transcript_norm"], chunk["transcribed_text_norm"], workers=workers)
+            for column in alignment.columns:
+                chunk[column] = alignment[column]
+        accumulator.update(chunk)
+        if miner is not None:
+            miner.update(chunk)
+        rows += len(chunk)
+        print(f"  Accumulated {rows} rows")
+    return accumulator
+
+
+# metrics.json sections that need every row at once, so accumulator runs skip them
+ACCUMULATOR_OMITTED = ["bootstrap_ci", "known_bootstrap_ci", "permutation_tests", "intersectional_slices"]
+
+
+def metrics_from_accumulator(accumulator, output_path, baseline_group="US"):
+    """
+    Write metrics.json from (merged) accumulators instead of raw rows
+
+    CER, accuracy, disparity and the WER/edit-operation breakdown match a
+    full load (CER quantiles are sketched). Bootstrap CIs, permutation
+    tests and intersectional slices resample or regroup individual rows;
+    they are left out and listed under "omitted".
+
+    Args:
+        accumulator (MetricsAccumulator): Accumulated statistics
+        output_path (str): Output JSON file path
+        baseline_group (str): Baseline accent group for disparity
+    """
+    cer_by_group = accumulator.cer_table()
+    print(f"\nCER by Accent Group:")
+    print(cer_by_group)
+
+    error_breakdown = accumulator.error_breakdown()
+    if error_breakdown is not None:
+        print(f"\nWER and Edit Operations by Accent Group:")
+        print(error_breakdown)
+
+    tables = {}
+    for subset in ("all", "known"):
+        for col in ("intent_correct", "intent_correct_after"):
+            counts = accumulator.counts(subset, col)
+            if counts is None:
+                tables[subset, col] = (None, None)
+                continue
+            tables[subset, col] = (
+                compute_intent_accuracy(None, correctness_col=col, counts=counts),
+                compute_disparity_index(None, baseline_group=baseline_group, correctness_col=col, counts=counts),
+            )
+
+    save_metrics_json(
+        cer_by_group,
+        *tables["all", "intent_correct"],
+        output_path,
+        *tables["all", "intent_correct_after"],
+        *tables["known", "intent_correct"],
+        *tables["known", "intent_correct_after"],
+        error_breakdown=error_breakdown,
+        omitted=ACCUMULATOR_OMITTED,
+        normalizer=",".join(sorted(accumulator.normalizers)) or "unknown",
+    )
+
+    total = sum(acc.rows for acc in accumulator.groups.values())
+    print(f"\n{'='*70}")
+    print(f"SUMMARY")
+    print(f"{'='*70}")
+    print(f"Total samples: {total}")
+    print(f"Accent groups: {len(accumulator.groups)}")
+    disparity_df = tables["all", "intent_correct"][1]
+    if disparity_df is not None:
+        print(f"Max disparity (before): {disparity_df['disparity_index'].max():.2f}×")
+
+
 def main():
     ensure_python_3_12_12()
     parser = argparse.ArgumentParser(
@@ -256,8 +1130,93 @@ def main():
         default="US",
         help="Baseline accent group for disparity calculation"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for batched CER computation and threads for bootstrap (default: 1; 0 = all CPUs)"
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=2000,
+        help="Bootstrap resamples for confidence intervals (default: 2000; 0 = skip)"
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for bootstrap intervals (default: 0.95)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed for resampling (default: 42)"
+    )
+    parser.add_argument(
+        "--permutations",
+        type=int,
+        default=10000,
+        help="Max permutations per group for significance tests (default: 10000; 0 = skip)"
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance threshold for permutation early stopping (default: 0.05)"
+    )
+    parser.add_argument(
+        "--no_early_stopping",
+        action="store_true",
+        help="Always run the full number of permutations"
+    )
+    parser.add_argument(
+        "--slices_output",
+        type=str,
+        default="",
+        help="Output CSV for intersectional slices (default: slices.csv next to --output)"
+    )
+    parser.add_argument(
+        "--min_support",
+        type=int,
+        default=5,
+        help="Minimum samples for an intersectional slice to be reported (default: 5)"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=0,
+        help="Stream --input in chunks into mergeable accumulators (default: 0 = load all rows)"
+    )
+    parser.add_argument(
+        "--save_accumulator",
+        type=str,
+        default="",
+        help="With --chunksize, also save the shard accumulator to this JSON path"
+    )
+    parser.add_argument(
+        "--merge_accumulators",
+        nargs="+",
+        default=None,
+        help="Merge shard accumulator JSONs into --output instead of reading --input"
+    )
+    parser.add_argument(
+        "--examples_output",
+        type=str,
+        default="",
+        help="Output JSON for per-group failure/success examples (default: examples.json next to --output)"
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        default="c",
+        choices=ENGINES,
+        help="CSV parser when loading all rows; pyarrow/auto use pyarrow if installed (default: c)"
+    )
 
     args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
 
     print(f"\n{'='*70}")
     print(f"ASR Equity Metrics Calculation")
@@ -265,20 +1224,66 @@ def main():
     print(f"Input: {args.input}")
     print(f"Output: {args.output}")
 
+    # Accumulator modes: rows are never all in memory at once.
+    if args.merge_accumulators or args.chunksize:
+        print(
+            "\n⚠️  --chunksize/--merge_accumulators: bootstrap CIs, permutation tests and intersectional "
+            "slices need all rows and are not computed (--bootstrap, --permutations and the slice "
+            "options are ignored)"
+        )
+    examples_json = args.examples_output or str(Path(args.output).parent / "examples.json")
+    if args.merge_accumulators:
+        accumulator = MetricsAccumulator()
+        miner = None
+        for path in args.merge_accumulators:
+            accumulator.merge(MetricsAccumulator.load(path))
+            shard_miner = ExampleMiner.load(path)
+            if shard_miner is not None:
+                miner = shard_miner if miner is None else miner.merge(shard_miner)
+        print(f"\nMerged {len(args.merge_accumulators)} accumulators")
+        if miner is not None:
+            report_examples(miner, output_json=examples_json)
+        else:
+            print("\n⚠️  Accumulators have no saved examples; skipping examples.json")
+        metrics_from_accumulator(accumulator, args.output, args.baseline)
+        return
+    if args.chunksize:
+        miner = ExampleMiner(seed=args.seed)
+        accumulator = accumulate_metrics(args.input, args.chunksize, workers, miner)
+        if args.save_accumulator:
+            accumulator.save(args.save_accumulator, miner)
+            print(f"✅ Accumulator saved to: {args.save_accumulator}")
+        report_examples(miner, output_json=examples_json)
+        metrics_from_accumulator(accumulator, args.output, args.baseline)
+        return
+
     # Load data
-    intents_df = pd.read_csv(args.input)
+    intents_df = read_table(args.input, engine=args.engine)
     print(f"\nLoaded {len(intents_df)} samples")
 
     # Calculate metrics
-    cer_by_group = compute_cer_by_group(intents_df)
-    accuracy_by_group = compute_intent_accuracy(intents_df, correctness_col="intent_correct")
-    disparity_df = compute_disparity_index(intents_df, baseline_group=args.baseline, correctness_col="intent_correct")
+    cer_by_group = compute_cer_by_group(intents_df, workers=workers)
+    error_breakdown = compute_error_breakdown_by_group(intents_df)
+    # Every accuracy/disparity table below is derived from one aggregation.
+    cube = compute_metric_cube(intents_df)
+    accuracy_by_group = compute_intent_accuracy(
+        intents_df, correctness_col="intent_correct", counts=cube["all"]["intent_correct"]
+    )
+    disparity_df = compute_disparity_index(
+        intents_df, baseline_group=args.baseline, correctness_col="intent_correct",
+        counts=cube["all"]["intent_correct"],
+    )
 
     accuracy_after = None
     disparity_after = None
     if "intent_correct_after" in intents_df.columns:
-        accuracy_after = compute_intent_accuracy(intents_df, correctness_col="intent_correct_after")
-        disparity_after = compute_disparity_index(intents_df, baseline_group=args.baseline, correctness_col="intent_correct_after")
+        accuracy_after = compute_intent_accuracy(
+            intents_df, correctness_col="intent_correct_after", counts=cube["all"]["intent_correct_after"]
+        )
+        disparity_after = compute_disparity_index(
+            intents_df, baseline_group=args.baseline, correctness_col="intent_correct_after",
+            counts=cube["all"]["intent_correct_after"],
+        )
 
     # Known-intent-only metrics (exclude rows where true_intent == "unknown")
     known_accuracy = None
@@ -286,21 +1291,69 @@ def main():
     known_accuracy_after = None
     known_disparity_after = None
     if "true_intent" in intents_df.columns:
-        known_subset = intents_df[intents_df["true_intent"].astype(str).str.lower() != "unknown"]
-        if len(known_subset) > 0:
-            print(f"\nKnown-intent subset size: {len(known_subset)} / {len(intents_df)}")
-            known_accuracy = compute_intent_accuracy(known_subset, correctness_col="intent_correct")
-            known_disparity = compute_disparity_index(known_subset, baseline_group=args.baseline, correctness_col="intent_correct")
-            if "intent_correct_after" in known_subset.columns:
-                known_accuracy_after = compute_intent_accuracy(known_subset, correctness_col="intent_correct_after")
+        known = cube["known"]
+        if known is not None:
+            known_size = int(known[("intent_correct", "count")].sum())
+            print(f"\nKnown-intent subset size: {known_size} / {len(intents_df)}")
+            known_accuracy = compute_intent_accuracy(
+                intents_df, correctness_col="intent_correct", counts=known["intent_correct"]
+            )
+            known_disparity = compute_disparity_index(
+                intents_df, baseline_group=args.baseline, correctness_col="intent_correct",
+                counts=known["intent_correct"],
+            )
+            if "intent_correct_after" in intents_df.columns:
+                known_accuracy_after = compute_intent_accuracy(
+                    intents_df, correctness_col="intent_correct_after", counts=known["intent_correct_after"]
+                )
                 known_disparity_after = compute_disparity_index(
-                    known_subset, baseline_group=args.baseline, correctness_col="intent_correct_after"
+                    intents_df, baseline_group=args.baseline, correctness_col="intent_correct_after",
+                    counts=known["intent_correct_after"],
                 )
         else:
             print("\nKnown-intent subset size: 0 (all true_intent are 'unknown')")
 
+    # Bootstrap confidence intervals
+    bootstrap_ci = None
+    known_bootstrap_ci = None
+    if args.bootstrap > 0:
+        bootstrap_ci = bootstrap_confidence_intervals(
+            intents_df, args.baseline, n_resamples=args.bootstrap, confidence=args.confidence,
+            seed=args.seed, workers=workers,
+        )
+        if known_accuracy is not None:
+            known_subset = intents_df[intents_df["true_intent"].astype(str).str.lower() != "unknown"]
+            known_bootstrap_ci = bootstrap_confidence_intervals(
+                known_subset, args.baseline, n_resamples=args.bootstrap, confidence=args.confidence,
+                seed=args.seed, workers=workers,
+            )
+
+    # Permutation significance tests
+    permutation_tests = None
+    if args.permutations > 0:
+        permutation_tests = permutation_test_disparity(
+            intents_df,
+            args.baseline,
+            n_permutations=args.permutations,
+            alpha=args.alpha,
+            seed=args.seed,
+            workers=workers,
+            early_stopping=not args.no_early_stopping,
+        )
+
+    # Intersectional slices (accent × speaker_type × intent × model)
+    slices_csv = args.slices_output or str(Path(args.output).parent / "slices.csv")
+    slice_cells = build_slice_cube(intents_df)
+    slices = export_slices(slice_cells, slices_csv, min_support=args.min_support)
+    intersectional_slices = {
+        "path": slices_csv,
+        "dimensions": list(slice_cells.index.names),
+        "min_support": args.min_support,
+        "worst_by_accuracy": worst_slices(slices),
+    }
+
     # Find examples
-    find_failure_examples(intents_df)
+    find_failure_examples(intents_df, output_json=examples_json, seed=args.seed)
 
     # Save metrics
     save_metrics_json(
@@ -314,6 +1367,12 @@ def main():
         known_disparity,
         known_accuracy_after,
         known_disparity_after,
+        error_breakdown,
+        bootstrap_ci,
+        known_bootstrap_ci,
+        permutation_tests,
+        intersectional_slices,
+        normalizer=recorded_normalizer(intents_df),
     )
 
     # Overall summary
@@ -323,6 +1382,7 @@ def main():
     print(f"Total samples: {len(intents_df)}")
     print(f"Accent groups: {len(intents_df['accent_group'].unique())}")
     print(f"Overall CER: {intents_df['cer'].mean():.1%}")
+    print(f"Overall WER: {intents_df['wer'].mean():.1%}")
     print(f"Overall intent accuracy (before): {intents_df['intent_correct'].mean()*100:.1f}%")
     if "intent_correct_after" in intents_df.columns:
         print(f"Overall intent accuracy (after):  {intents_df['intent_correct_after'].mean()*100:.1f}%")
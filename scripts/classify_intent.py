@@ -7,12 +7,188 @@ Usage:
 """
 
 import argparse
+import hashlib
+import json
+import pickle
+import time
+import numpy as np
 import pandas as pd
 from pathlib import Path
 try:
     from _python_version_check import ensure_python_3_12_12
+    from table_loading import ENGINES, read_table
+    from text_normalization import ensure_normalized
 except ModuleNotFoundError:
     from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.table_loading import ENGINES, read_table
+    from scripts.text_normalization import ensure_normalized
+
+
+DEFAULT_TAXONOMY = Path(__file__).resolve().parent.parent / "data" / "intent_taxonomy.json"
+DEFAULT_MATCHER_CACHE = Path(".cache") / "intent_matchers"
+# Bump when the compiled artifact layout changes so stale caches are ignored.
+MATCHER_FORMAT_VERSION = 1
+
+
+def _compile_taxonomy(taxonomy):
+    """
+    Compile an intent taxonomy into an Aho-Corasick automaton.
+
+    One pass over a transcript then finds every configured phrase that
+    occurs in it, however many intents and phrases the taxonomy has.
+    The result is plain lists/dicts so it pickles independently of
+    this module.
+
+    Args:
+        taxonomy (dict): Parsed taxonomy config
+
+    Returns:
+        dict: Compiled matcher artifact
+    """
+    intents = list(taxonomy["intents"])
+    phrases = []
+    phrase_ids = {}
+    phrase_intents = []
+    for intent_idx, intent in enumerate(intents):
+        for phrase in taxonomy["intents"][intent]:
+            phrase = str(phrase).lower()
+            if not phrase:
+                raise ValueError(f"Empty phrase in taxonomy for intent '{intent}'")
+            if phrase not in phrase_ids:
+                phrase_ids[phrase] = len(phrases)
+                phrases.append(phrase)
+                phrase_intents.append([])
+            # Repeats within an intent count once per listing, as before.
+            phrase_intents[phrase_ids[phrase]].append(intent_idx)
+
+    # Trie
+    goto = [{}]
+    out = [set()]
+    for pid, phrase in enumerate(phrases):
+        state = 0
+        for ch in phrase:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                out.append(set())
+            state = nxt
+        out[state].add(pid)
+
+    # Failure links (BFS), folding suffix outputs into each state
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f][ch] if state and ch in goto[f] else 0
+            out[nxt] |= out[fail[nxt]]
+
+    return {
+        "format_version": MATCHER_FORMAT_VERSION,
+        "intents": intents,
+        "fallback_intent": taxonomy.get("fallback_intent", "unknown"),
+        "phrases": phrases,
+        "phrase_intents": [tuple(ids) for ids in phrase_intents],
+        "goto": goto,
+        "fail": fail,
+        "out": [tuple(sorted(ids)) for ids in out],
+    }
+
+
+class IntentMatcher:
+    """
+    Keyword intent classifier backed by a compiled taxonomy.
+
+    Each intent scores one point per configured phrase found in the
+    lowercased transcript; the highest score wins, ties go to the intent
+    listed first, and no matches yields the fallback intent.
+    """
+
+    def __init__(self, artifact):
+        self.intents = artifact["intents"]
+        self.fallback_intent = artifact["fallback_intent"]
+        self.phrases = artifact["phrases"]
+        self._phrase_intents = artifact["phrase_intents"]
+        self._goto = artifact["goto"]
+        self._fail = artifact["fail"]
+        self._out = artifact["out"]
+
+    def matched_phrases(self, text):
+        """Return ids of every phrase occurring in ``text`` (already lowercased)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = set()
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def classify(self, transcript):
+        if not transcript or pd.isna(transcript):
+            return self.fallback_intent
+
+        found = self.matched_phrases(transcript.lower())
+        if not found:
+            return self.fallback_intent
+
+        scores = [0] * len(self.intents)
+        for pid in found:
+            for intent_idx in self._phrase_intents[pid]:
+                scores[intent_idx] += 1
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return self.intents[best]
+
+
+def load_matcher(taxonomy_json=None, cache_dir=DEFAULT_MATCHER_CACHE):
+    """
+    Load a compiled intent matcher, compiling and caching it on first use.
+
+    Artifacts are keyed by a hash of the taxonomy contents, so editing the
+    config triggers a recompile and unchanged configs load from cache.
+
+    Args:
+        taxonomy_json (str): Path to taxonomy config (default: data/intent_taxonomy.json)
+        cache_dir (str): Directory for compiled artifacts (None disables caching)
+
+    Returns:
+        IntentMatcher: Ready-to-use matcher
+    """
+    taxonomy_path = Path(taxonomy_json) if taxonomy_json else DEFAULT_TAXONOMY
+    with open(taxonomy_path) as f:
+        taxonomy = json.load(f)
+
+    canonical = json.dumps(taxonomy, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(f"{MATCHER_FORMAT_VERSION}:{canonical}".encode("utf-8")).hexdigest()[:16]
+
+    cache_path = Path(cache_dir) / f"{taxonomy_path.stem}-{digest}.pkl" if cache_dir else None
+    if cache_path and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                artifact = pickle.load(f)
+            if artifact.get("format_version") == MATCHER_FORMAT_VERSION:
+                return IntentMatcher(artifact)
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable matcher cache {cache_path}: {e}")
+
+    artifact = _compile_taxonomy(taxonomy)
+    if cache_path:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+    return IntentMatcher(artifact)
+
+
+_default_matcher = None
 
 
 def classify_intent_keyword(transcript):
@@ -20,47 +196,39 @@ def classify_intent_keyword(transcript):
     Simple, transparent, fast keyword matching.
     Good enough for demonstrating bias! No training needed.
 
+    Intents and keywords come from data/intent_taxonomy.json.
+
     Args:
         transcript (str): Text transcript to classify
 
     Returns:
         str: Predicted intent category
     """
-    if not transcript or pd.isna(transcript):
-        return "unknown"
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = load_matcher()
+    return _default_matcher.classify(transcript)
+
+
+# (misrecognized, corrected) substring rules applied by normalize_transcript.
+# mine_misrecognitions.py proposes new entries in this format.
+TRANSCRIPT_REPLACEMENTS = [
+    ("internets", "internet"),
+    ("inter net", "internet"),
+    ("pay bill", "pay bill"),
+    ("paybell", "pay bill"),
+    ("payable", "pay bill"),
+    ("pass word", "password"),
+    ("log-in", "login"),
+    ("log in", "login"),
+    ("sign in", "login"),
+    ("acct", "account"),
+    ("accnt", "account"),
+    ("out age", "outage"),
+    ("dis connected", "disconnected"),
+    ("not workin", "not working"),
+]
 
-    transcript = transcript.lower()
-
-    # Define intent patterns with keywords
-    intents = {
-        "pay_bill": [
-            "pay", "bill", "payment", "charge", "invoice",
-            "balance", "owe", "due", "amount", "cost"
-        ],
-        "reset_password": [
-            "reset", "password", "login", "access", "forgot",
-            "locked out", "unlock", "credential", "sign in", "log in"
-        ],
-        "report_outage": [
-            "outage", "down", "not working", "broken", "offline",
-            "internet", "service", "connection", "disconnected", "issue"
-        ],
-        "account_info": [
-            "account", "information", "details", "status",
-            "history", "profile", "data", "info", "check"
-        ]
-    }
-
-    # Score each intent based on keyword matches
-    scores = {}
-    for intent, keywords in intents.items():
-        scores[intent] = sum(1 for kw in keywords if kw in transcript)
-
-    # Return highest scoring intent
-    if max(scores.values()) > 0:
-        return max(scores, key=scores.get)
-    else:
-        return "unknown"
 
 def normalize_transcript(transcript):
     """
@@ -72,24 +240,7 @@ def normalize_transcript(transcript):
 
     text = str(transcript).lower()
 
-    replacements = [
-        ("internets", "internet"),
-        ("inter net", "internet"),
-        ("pay bill", "pay bill"),
-        ("paybell", "pay bill"),
-        ("payable", "pay bill"),
-        ("pass word", "password"),
-        ("log-in", "login"),
-        ("log in", "login"),
-        ("sign in", "login"),
-        ("acct", "account"),
-        ("accnt", "account"),
-        ("out age", "outage"),
-        ("dis connected", "disconnected"),
-        ("not workin", "not working"),
-    ]
-
-    for old, new in replacements:
+    for old, new in TRANSCRIPT_REPLACEMENTS:
         text = text.replace(old, new)
 
     # Collapse repeated spaces
@@ -97,92 +248,435 @@ def normalize_transcript(transcript):
     return text
 
 
-def classify_all(transcripts_csv, ground_truth_csv, output_csv="results/intents.csv"):
+def apply_unique(series, func):
     """
-    Classify all transcripts and compare to ground truth
+    Apply ``func`` once per distinct value of ``series`` and map results back.
+
+    Common Voice reuses sentences across speakers, so transcript columns
+    contain many repeats. Factorizing first means each unique string is
+    processed exactly once.
 
     Args:
-        transcripts_csv (str): Path to Whisper transcription results
-        ground_truth_csv (str): Path to ground truth labels
-        output_csv (str): Output path for intent classification results
+        series (pd.Series): Column of strings (may contain NaN)
+        func (callable): Function applied to each unique value
 
     Returns:
-        pd.DataFrame: DataFrame with intent predictions and correctness
+        tuple: (pd.Series of results aligned to ``series``, unique count)
     """
-    print(f"\n{'='*60}")
-    print(f"Intent Classification Pipeline")
-    print(f"{'='*60}")
-    print(f"Method: Keyword-based classification")
-    print(f"Transcripts: {transcripts_csv}")
-    print(f"Ground truth: {ground_truth_csv}")
-    print(f"Output: {output_csv}")
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    results = [func(value) for value in uniques]
+    # Missing values share sentinel code -1, which indexes the last slot.
+    results.append(func(np.nan))
+    mapped = np.asarray(results, dtype=object)[codes]
+    return pd.Series(mapped, index=series.index, name=series.name), len(uniques)
 
-    # Load data
-    print(f"\nLoading data...")
-    transcripts = pd.read_csv(transcripts_csv)
-    ground_truth = pd.read_csv(ground_truth_csv)
 
-    print(f"Loaded {len(transcripts)} transcripts")
-    print(f"Loaded {len(ground_truth)} ground truth labels")
+def _report_dedup(column, unique_count, total, label="unique"):
+    if total == 0:
+        return
+    ratio = unique_count / total
+    print(f"  {column:28s}: {unique_count} {label} / {total} rows "
+          f"(dedup ratio {ratio:.2f}, {(1 - ratio) * 100:.1f}% reused)")
 
-    # Merge datasets
-    print(f"\nMerging datasets on filename...")
-    merged = transcripts.merge(ground_truth, on="filename", how="inner")
-    print(f"Merged dataset: {len(merged)} samples")
 
-    if len(merged) == 0:
-        print(f"\n❌ No matching filenames found! Check your data.")
-        return None
+def annotate_predictions(merged, classifier=classify_intent_keyword):
+    """
+    Add prediction and correctness columns to a merged transcripts/ground-truth frame.
+
+    Classifies the shared normalized text (see text_normalization.py), which
+    is also written to the output so later stages can reuse it.
+
+    Args:
+        merged (pd.DataFrame): Transcripts merged with ground truth on filename
+        classifier (callable): Transcript → intent function
+
+    Returns:
+        dict: Number of unique strings classified per source column
+    """
+    unique_counts = {}
+    ensure_normalized(merged)
 
-    # Classify transcribed text (before benchmark)
-    print(f"\nClassifying transcripts...")
-    merged["predicted_intent"] = merged["transcribed_text"].apply(classify_intent_keyword)
+    # Classify transcribed text (before benchmark).
+    # Each unique transcript string is classified once and mapped back.
+    merged["predicted_intent"], unique_counts["transcribed_text"] = apply_unique(
+        merged["transcribed_text_norm"], classifier
+    )
 
     # Also classify true transcript for sanity check
-    merged["true_intent_check"] = merged["true_transcript"].apply(classify_intent_keyword)
+    merged["true_intent_check"], unique_counts["true_transcript"] = apply_unique(
+        merged["true_transcript_norm"], classifier
+    )
 
     # Mark correctness (before benchmark)
     merged["intent_correct"] = merged["predicted_intent"] == merged["true_intent"]
 
     # Simulated "after benchmark" improvements via normalization
-    merged["transcribed_text_normalized"] = merged["transcribed_text"].apply(normalize_transcript)
-    merged["predicted_intent_after"] = merged["transcribed_text_normalized"].apply(classify_intent_keyword)
+    merged["transcribed_text_normalized"], _ = apply_unique(merged["transcribed_text_norm"], normalize_transcript)
+    merged["predicted_intent_after"], unique_counts["transcribed_text_normalized"] = apply_unique(
+        merged["transcribed_text_normalized"], classifier
+    )
     merged["intent_correct_after"] = merged["predicted_intent_after"] == merged["true_intent"]
     merged["known_intent"] = merged["true_intent"].astype(str).str.lower() != "unknown"
 
-    # Calculate basic stats
-    accuracy = merged["intent_correct"].mean() * 100
-    accuracy_after = merged["intent_correct_after"].mean() * 100
+    return unique_counts
+
+
+def _new_stats():
+    return {
+        "total": 0,
+        "correct": 0,
+        "correct_after": 0,
+        "known": 0,
+        "known_correct": 0,
+        "known_correct_after": 0,
+        "unique": {},
+        "chunks": 0,
+        "by_group": {},
+        "confusion": None,
+    }
+
+
+def update_stats(stats, merged, unique_counts=None):
+    """
+    Fold one annotated frame (or chunk) into running counters.
+
+    Args:
+        stats (dict): Counters from ``_new_stats`` (updated in place)
+        merged (pd.DataFrame): Frame annotated by ``annotate_predictions``
+        unique_counts (dict): Unique strings classified per column in this frame;
+            summed across chunks, so strings repeated between chunks count again (optional)
+
+    Returns:
+        dict: The updated ``stats``
+    """
+    known = merged["known_intent"]
+    stats["total"] += len(merged)
+    stats["correct"] += int(merged["intent_correct"].sum())
+    stats["correct_after"] += int(merged["intent_correct_after"].sum())
+    stats["known"] += int(known.sum())
+    stats["known_correct"] += int(merged.loc[known, "intent_correct"].sum())
+    stats["known_correct_after"] += int(merged.loc[known, "intent_correct_after"].sum())
+
+    if unique_counts:
+        stats["chunks"] += 1
+    for column, count in (unique_counts or {}).items():
+        stats["unique"][column] = stats["unique"].get(column, 0) + count
+
+    if "accent_group" in merged.columns:
+        grouped = merged.groupby("accent_group")[["intent_correct", "intent_correct_after"]].agg(["sum", "count"])
+        for group, row in grouped.iterrows():
+            counts = stats["by_group"].setdefault(group, [0, 0, 0])
+            counts[0] += int(row[("intent_correct", "count")])
+            counts[1] += int(row[("intent_correct", "sum")])
+            counts[2] += int(row[("intent_correct_after", "sum")])
+
+        counts = confusion_counts(merged)
+        stats["confusion"] = counts if stats["confusion"] is None else stats["confusion"].add(counts, fill_value=0)
+
+    return stats
+
+
+def print_stats(stats):
+    """
+    Print classification results from running counters.
+
+    Args:
+        stats (dict): Counters accumulated by ``update_stats``
+    """
+    total = stats["total"]
+    if stats["unique"] and stats["chunks"] > 1:
+        # Each chunk is deduplicated on its own, so a string repeated across
+        # chunks is classified (and counted) once per chunk. These are the
+        # calls actually made, not the number of distinct strings.
+        print(f"\nClassifier calls (deduplicated within each of {stats['chunks']} chunks):")
+        for column, count in stats["unique"].items():
+            _report_dedup(column, count, total, label="calls")
+    elif stats["unique"]:
+        print(f"\nClassifier calls after deduplication:")
+        for column, count in stats["unique"].items():
+            _report_dedup(column, count, total)
+
+    accuracy = stats["correct"] / total * 100
+    accuracy_after = stats["correct_after"] / total * 100
     print(f"\n{'='*60}")
     print(f"Classification Results")
     print(f"{'='*60}")
     print(f"Overall Intent Accuracy (before): {accuracy:.2f}%")
     print(f"Overall Intent Accuracy (after):  {accuracy_after:.2f}%")
-    print(f"Correct: {merged['intent_correct'].sum()}")
-    print(f"Incorrect: {(~merged['intent_correct']).sum()}")
+    print(f"Correct: {stats['correct']}")
+    print(f"Incorrect: {total - stats['correct']}")
 
-    unknown_ratio = (~merged["known_intent"]).mean() * 100
+    unknown_ratio = (total - stats["known"]) / total * 100
     print(f"Unknown-label share: {unknown_ratio:.1f}%")
     if unknown_ratio > 50:
         print("⚠️  Warning: Most labels are 'unknown'.")
         print("   Overall accuracy may be inflated because unknown→unknown counts as correct.")
 
-    known_subset = merged[merged["known_intent"]]
-    if len(known_subset) > 0:
-        known_acc_before = known_subset["intent_correct"].mean() * 100
-        known_acc_after = known_subset["intent_correct_after"].mean() * 100
+    if stats["known"] > 0:
+        known_acc_before = stats["known_correct"] / stats["known"] * 100
+        known_acc_after = stats["known_correct_after"] / stats["known"] * 100
         print(f"Known-intent Accuracy (before): {known_acc_before:.2f}%")
         print(f"Known-intent Accuracy (after):  {known_acc_after:.2f}%")
     else:
         print("Known-intent Accuracy: N/A (no non-'unknown' labels)")
 
     # Accuracy by accent group
-    if "accent_group" in merged.columns:
+    if stats["by_group"]:
         print(f"\nAccuracy by Accent Group:")
-        by_group_before = merged.groupby("accent_group")["intent_correct"].mean() * 100
-        by_group_after = merged.groupby("accent_group")["intent_correct_after"].mean() * 100
-        for group in by_group_before.index:
-            print(f"  {group:15s}: {by_group_before[group]:6.2f}% → {by_group_after[group]:6.2f}%")
+        for group in sorted(stats["by_group"]):
+            count, correct, correct_after = stats["by_group"][group]
+            print(f"  {group:15s}: {correct / count * 100:6.2f}% → {correct_after / count * 100:6.2f}%")
+
+
+# Prediction columns compared against true_intent, keyed by stage name.
+CONFUSION_STAGES = {
+    "before": "predicted_intent",
+    "after": "predicted_intent_after",
+}
+
+
+def confusion_counts(merged):
+    """
+    Long-form confusion counts for every accent group and stage.
+
+    Stacks the before/after predictions and counts them with a single
+    groupby, so the result is additive across chunks.
+
+    Args:
+        merged (pd.DataFrame): Frame annotated by ``annotate_predictions``
+
+    Returns:
+        pd.Series: Counts indexed by (stage, accent_group, true_intent, predicted_intent)
+    """
+    stacked = pd.concat(
+        [
+            pd.DataFrame({
+                "stage": stage,
+                "accent_group": merged["accent_group"],
+                "true_intent": merged["true_intent"].astype(str),
+                "predicted_intent": merged[col].astype(str),
+            })
+            for stage, col in CONFUSION_STAGES.items()
+        ],
+        ignore_index=True,
+    )
+    return stacked.groupby(["stage", "accent_group", "true_intent", "predicted_intent"]).size()
+
+
+def confusion_cube(counts):
+    """
+    Densify long-form counts into a (stage, group, true, predicted) array.
+
+    Args:
+        counts (pd.Series): Output of ``confusion_counts`` (possibly summed over chunks)
+
+    Returns:
+        tuple: (cube ndarray, stages, groups, labels)
+    """
+    stages = list(CONFUSION_STAGES)
+    groups = sorted(counts.index.get_level_values("accent_group").unique())
+    labels = sorted(
+        set(counts.index.get_level_values("true_intent"))
+        | set(counts.index.get_level_values("predicted_intent"))
+    )
+
+    def codes(level, categories):
+        return pd.Categorical(counts.index.get_level_values(level), categories=categories).codes.astype(np.int64)
+
+    n_stage, n_group, n_label = len(stages), len(groups), len(labels)
+    flat = (
+        (codes("stage", stages) * n_group + codes("accent_group", groups)) * n_label
+        + codes("true_intent", labels)
+    ) * n_label + codes("predicted_intent", labels)
+    cube = np.bincount(flat, weights=counts.to_numpy(), minlength=n_stage * n_group * n_label * n_label)
+    return cube.astype(np.int64).reshape(n_stage, n_group, n_label, n_label), stages, groups, labels
+
+
+def load_cost_matrix(labels, cost_json=None):
+    """
+    Build a per-cell misrouting cost matrix aligned to ``labels``.
+
+    The default costs 1 for every misroute and 0 on the diagonal. A JSON
+    file may override it, e.g.::
+
+        {"default_cost": 1.0, "costs": {"reset_password": {"unknown": 3.0}}}
+
+    where ``costs[true][predicted]`` sets individual cells. Entries naming a
+    label that is not in ``labels`` are reported and skipped.
+
+    Args:
+        labels (list): Intent labels (row/column order)
+        cost_json (str): Optional path to a cost config
+
+    Returns:
+        np.ndarray: (len(labels), len(labels)) cost matrix
+    """
+    config = {}
+    if cost_json:
+        with open(cost_json) as f:
+            config = json.load(f)
+
+    n_label = len(labels)
+    cost = np.full((n_label, n_label), float(config.get("default_cost", 1.0)))
+    np.fill_diagonal(cost, 0.0)
+
+    index = {label: i for i, label in enumerate(labels)}
+    skipped = []
+    for true_label, row in config.get("costs", {}).items():
+        for pred_label, value in row.items():
+            if true_label in index and pred_label in index:
+                cost[index[true_label], index[pred_label]] = float(value)
+            else:
+                skipped.append(f"{true_label} → {pred_label}")
+    if skipped:
+        print(f"⚠️  Warning: {len(skipped)} cost entries in {cost_json} name labels not in the data; ignored:")
+        print(f"   {', '.join(skipped)}")
+        print(f"   Known labels: {', '.join(map(str, labels))} (check for typos)")
+    return cost
+
+
+def save_confusion_artifacts(counts, output_dir, cost_json=None, top_n=5):
+    """
+    Save per-group confusion matrices and misrouting costs.
+
+    Writes ``confusion.npz`` (the count cube, cost matrix and axis labels)
+    and ``confusion_summary.json`` (per stage and group: samples, misroutes,
+    total and per-call cost, most frequent confusions).
+
+    Args:
+        counts (pd.Series): Output of ``confusion_counts``
+        output_dir (str): Directory for the artifacts
+        cost_json (str): Optional cost config for ``load_cost_matrix``
+        top_n (int): Number of top off-diagonal confusions to list per group
+
+    Returns:
+        dict: The JSON summary
+    """
+    cube, stages, groups, labels = confusion_cube(counts)
+    cost = load_cost_matrix(labels, cost_json)
+    weighted = cube * cost
+
+    # Totals per (stage, group) straight from array reductions.
+    samples = cube.sum(axis=(2, 3))
+    correct = np.trace(cube, axis1=2, axis2=3)
+    total_cost = weighted.sum(axis=(2, 3))
+
+    off_diag = cube * (1 - np.eye(len(labels), dtype=np.int64))
+    summary = {"labels": labels, "groups": groups, "stages": {}}
+    for s, stage in enumerate(stages):
+        summary["stages"][stage] = {}
+        for g, group in enumerate(groups):
+            flat = off_diag[s, g].ravel()
+            top = [i for i in np.argsort(flat, kind="stable")[::-1][:top_n] if flat[i] > 0]
+            summary["stages"][stage][group] = {
+                "samples": int(samples[s, g]),
+                "misrouted": int(samples[s, g] - correct[s, g]),
+                "total_cost": round(float(total_cost[s, g]), 4),
+                "cost_per_call": round(float(total_cost[s, g] / samples[s, g]), 4) if samples[s, g] else 0.0,
+                "top_confusions": [
+                    {
+                        "true_intent": labels[i // len(labels)],
+                        "predicted_intent": labels[i % len(labels)],
+                        "count": int(flat[i]),
+                    }
+                    for i in top
+                ],
+            }
+
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    npz_path = out_dir / "confusion.npz"
+    json_path = out_dir / "confusion_summary.json"
+    np.savez_compressed(
+        npz_path,
+        confusion=cube,
+        cost_matrix=cost,
+        stages=np.array(stages),
+        groups=np.array(groups),
+        labels=np.array(labels),
+    )
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\nMisrouting cost by Accent Group (before → after):")
+    for g, group in enumerate(groups):
+        before = summary["stages"]["before"][group]["cost_per_call"]
+        after = summary["stages"]["after"][group]["cost_per_call"]
+        print(f"  {group:15s}: {before:6.3f} → {after:6.3f} per call")
+    print(f"Confusion matrices saved to: {npz_path}")
+    print(f"Confusion summary saved to: {json_path}")
+
+    return summary
+
+
+def classify_all(
+    transcripts_csv,
+    ground_truth_csv,
+    output_csv="results/intents.csv",
+    chunksize=None,
+    cost_matrix_json=None,
+    taxonomy_json=None,
+    engine="c",
+):
+    """
+    Classify all transcripts and compare to ground truth
+
+    Args:
+        transcripts_csv (str): Path to Whisper transcription results
+        ground_truth_csv (str): Path to ground truth labels
+        output_csv (str): Output path for intent classification results
+        chunksize (int): If set, stream transcripts in chunks of this many rows
+            and write results incrementally (see ``classify_streaming``)
+        cost_matrix_json (str): Optional misrouting cost config (see ``load_cost_matrix``)
+        taxonomy_json (str): Intent taxonomy config (default: data/intent_taxonomy.json)
+        engine (str): CSV parser engine for full loads (c, pyarrow or auto)
+
+    Returns:
+        pd.DataFrame: DataFrame with intent predictions and correctness
+            (in streaming mode, the summary counters dict instead)
+    """
+    print(f"\n{'='*60}")
+    print(f"Intent Classification Pipeline")
+    print(f"{'='*60}")
+    print(f"Method: Keyword-based classification")
+    print(f"Taxonomy: {taxonomy_json or DEFAULT_TAXONOMY}")
+    print(f"Transcripts: {transcripts_csv}")
+    print(f"Ground truth: {ground_truth_csv}")
+    print(f"Output: {output_csv}")
+
+    start_load = time.time()
+    matcher = load_matcher(taxonomy_json)
+    print(f"Matcher ready in {time.time() - start_load:.3f}s "
+          f"({len(matcher.intents)} intents, {len(matcher.phrases)} phrases)")
+
+    if chunksize:
+        return classify_streaming(
+            transcripts_csv, ground_truth_csv, output_csv, chunksize, cost_matrix_json, matcher.classify
+        )
+
+    # Load data
+    print(f"\nLoading data...")
+    transcripts = read_table(transcripts_csv, engine=engine)
+    ground_truth = read_table(ground_truth_csv, engine=engine)
+
+    print(f"Loaded {len(transcripts)} transcripts")
+    print(f"Loaded {len(ground_truth)} ground truth labels")
+
+    # Merge datasets
+    print(f"\nMerging datasets on filename...")
+    merged = transcripts.merge(ground_truth, on="filename", how="inner")
+    print(f"Merged dataset: {len(merged)} samples")
+
+    if len(merged) == 0:
+        print(f"\n❌ No matching filenames found! Check your data.")
+        return None
+
+    print(f"\nClassifying transcripts (deduplicated)...")
+    unique_counts = annotate_predictions(merged, matcher.classify)
+    stats = update_stats(_new_stats(), merged, unique_counts)
+    print_stats(stats)
+    if stats["confusion"] is not None:
+        save_confusion_artifacts(stats["confusion"], Path(output_csv).parent, cost_matrix_json)
 
     # Save results
     Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
@@ -192,6 +686,65 @@ def classify_all(transcripts_csv, ground_truth_csv, output_csv="results/intents.
     return merged
 
 
+def classify_streaming(
+    transcripts_csv,
+    ground_truth_csv,
+    output_csv,
+    chunksize,
+    cost_matrix_json=None,
+    classifier=classify_intent_keyword,
+):
+    """
+    Bounded-memory variant of ``classify_all``.
+
+    Ground truth is indexed by filename once; transcripts are read, classified
+    and appended to ``output_csv`` one chunk at a time, and the summary is
+    accumulated with running counters. Peak memory is one chunk plus the
+    ground-truth index, regardless of corpus size.
+
+    Args:
+        transcripts_csv (str): Path to Whisper transcription results
+        ground_truth_csv (str): Path to ground truth labels
+        output_csv (str): Output path for intent classification results
+        chunksize (int): Transcript rows per chunk
+        cost_matrix_json (str): Optional misrouting cost config
+        classifier (callable): Transcript → intent function
+
+    Returns:
+        dict: Summary counters (see ``update_stats``), or None if nothing matched
+    """
+    print(f"\nStreaming mode: {chunksize} rows per chunk")
+    ground_truth = read_table(ground_truth_csv).set_index("filename")
+    print(f"Indexed {len(ground_truth)} ground truth labels by filename")
+
+    Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+    stats = _new_stats()
+    rows_read = 0
+    wrote_header = False
+
+    for chunk in read_table(transcripts_csv, chunksize=chunksize):
+        rows_read += len(chunk)
+        merged = chunk.join(ground_truth, on="filename", how="inner")
+        if len(merged) == 0:
+            continue
+        unique_counts = annotate_predictions(merged, classifier)
+        update_stats(stats, merged, unique_counts)
+        merged.to_csv(output_csv, mode="a" if wrote_header else "w", header=not wrote_header, index=False)
+        wrote_header = True
+        print(f"  Processed {rows_read} transcripts ({stats['total']} matched)")
+
+    print(f"Merged dataset: {stats['total']} samples")
+    if stats["total"] == 0:
+        print(f"\n❌ No matching filenames found! Check your data.")
+        return None
+
+    print_stats(stats)
+    if stats["confusion"] is not None:
+        save_confusion_artifacts(stats["confusion"], Path(output_csv).parent, cost_matrix_json)
+    print(f"\nResults saved to: {output_csv}")
+    return stats
+
+
 def main():
     ensure_python_3_12_12()
     parser = argparse.ArgumentParser(
@@ -215,6 +768,31 @@ def main():
         default="results/intents.csv",
         help="Output CSV file for intent classification results"
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=0,
+        help="Stream transcripts in chunks of this many rows (default: 0 = load all in memory)"
+    )
+    parser.add_argument(
+        "--cost_matrix",
+        type=str,
+        default="",
+        help="Optional JSON of per-cell misrouting costs (default: 1 per misroute)"
+    )
+    parser.add_argument(
+        "--taxonomy",
+        type=str,
+        default="",
+        help="Intent taxonomy JSON (default: data/intent_taxonomy.json)"
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        default="c",
+        choices=ENGINES,
+        help="CSV parser when loading all rows; pyarrow/auto use pyarrow if installed (default: c)"
+    )
 
     args = parser.parse_args()
 
@@ -222,7 +800,11 @@ def main():
     classify_all(
         transcripts_csv=args.transcripts,
         ground_truth_csv=args.ground_truth,
-        output_csv=args.output
+        output_csv=args.output,
+        chunksize=args.chunksize or None,
+        cost_matrix_json=args.cost_matrix or None,
+        taxonomy_json=args.taxonomy or None,
+        engine=args.engine,
     )
 
 
@@ -0,0 +1,492 @@
+"""
+Mergeable metric accumulators for chunked and sharded metric runs
+
+Each shard (or chunk) of intents.csv folds into a MetricsAccumulator; any
+number of accumulators merge into one, and the merged result yields the
+same per-group tables calculate_metrics.py writes to metrics.json.
+Counts, means, variances, min and max (CER and WER) and edit-operation
+totals merge exactly; CER quantiles come
+from a log-bucket sketch with bounded relative error. ExampleMiner keeps
+per-group failure/success examples under the same chunk-and-merge model.
+
+Usage:
+    python scripts/calculate_metrics.py --input shard_0.csv --chunksize 100000 --save_accumulator acc_0.json
+    python scripts/calculate_metrics.py --merge_accumulators acc_*.json --output results/metrics.json
+"""
+
+import heapq
+import json
+import math
+import numpy as np
+import pandas as pd
+try:
+    from text_normalization import NORMALIZER_COLUMN
+except ModuleNotFoundError:
+    from scripts.text_normalization import NORMALIZER_COLUMN
+
+
+ACCUMULATOR_FORMAT_VERSION = 1
+CORRECTNESS_COLUMNS = ("intent_correct", "intent_correct_after")
+# Per-row edit-op counts from calculate_metrics.batch_alignment
+EDIT_OP_COLUMNS = [
+    "char_substitutions", "char_insertions", "char_deletions",
+    "word_substitutions", "word_insertions", "word_deletions",
+]
+EDIT_SUM_COLUMNS = ["ref_chars", "ref_words"] + EDIT_OP_COLUMNS
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch-style)
+
+    Values are counted in buckets whose bounds grow geometrically, so any
+    reported quantile is within ``relative_accuracy`` of a true sample value
+    at that rank. Merging adds bucket counts and is exact.
+    """
+
+    def __init__(self, relative_accuracy=0.01, zero_threshold=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.zero_threshold = zero_threshold
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero_count = 0
+        self.buckets = {}
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        small = values <= self.zero_threshold
+        self.zero_count += int(small.sum())
+        keys = np.ceil(np.log(values[~small]) / self._log_gamma).astype(np.int64)
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            self.buckets[int(key)] = self.buckets.get(int(key), 0) + int(count)
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        return self
+
+    def quantile(self, q):
+        total = self.count
+        if total == 0:
+            return float("nan")
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_threshold": self.zero_threshold,
+            "zero_count": self.zero_count,
+            # Parallel key/count lists serialize far smaller than a dict.
+            "keys": sorted(self.buckets),
+            "counts": [self.buckets[k] for k in sorted(self.buckets)],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["zero_threshold"])
+        sketch.zero_count = data["zero_count"]
+        sketch.buckets = dict(zip(data["keys"], data["counts"]))
+        return sketch
+
+
+def _merge_moments(moments, count, mean, m2):
+    """Chan et al. pairwise update of [count, mean, m2]; exact up to float rounding."""
+    if count == 0:
+        return
+    total = moments[0] + count
+    delta = mean - moments[1]
+    moments[2] += m2 + delta * delta * moments[0] * count / total
+    moments[1] += delta * count / total
+    moments[0] = total
+
+
+def _moments(values):
+    mean = values.mean()
+    return len(values), mean, float(((values - mean) ** 2).sum())
+
+
+class GroupAccumulator:
+    """
+    Counts, Welford CER/WER moments, CER min/max and sketch, and edit-op
+    totals for one accent group
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.rows = 0
+        self.cer_count = 0
+        self.cer_mean = 0.0
+        self.cer_m2 = 0.0
+        self.cer_min = math.inf
+        self.cer_max = -math.inf
+        self.cer_sketch = QuantileSketch(relative_accuracy)
+        # subset -> correctness column -> [correct, total]
+        self.correct = {"all": {}, "known": {}}
+        # WER [count, mean, m2] and reference lengths / edit ops (when aligned)
+        self.wer = [0, 0.0, 0.0]
+        self.edits = dict.fromkeys(EDIT_SUM_COLUMNS, 0)
+
+    def _merge_moments(self, count, mean, m2):
+        moments = [self.cer_count, self.cer_mean, self.cer_m2]
+        _merge_moments(moments, count, mean, m2)
+        self.cer_count, self.cer_mean, self.cer_m2 = moments
+
+    def add_cer(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self._merge_moments(*_moments(values))
+        self.cer_min = min(self.cer_min, float(values.min()))
+        self.cer_max = max(self.cer_max, float(values.max()))
+        self.cer_sketch.add(values)
+
+    def add_wer(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            _merge_moments(self.wer, *_moments(values))
+
+    def add_edits(self, sums):
+        for column in EDIT_SUM_COLUMNS:
+            self.edits[column] += int(sums[column])
+
+    def add_correct(self, subset, column, correct, total):
+        counts = self.correct[subset].setdefault(column, [0, 0])
+        counts[0] += int(correct)
+        counts[1] += int(total)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self._merge_moments(other.cer_count, other.cer_mean, other.cer_m2)
+        self.cer_min = min(self.cer_min, other.cer_min)
+        self.cer_max = max(self.cer_max, other.cer_max)
+        self.cer_sketch.merge(other.cer_sketch)
+        _merge_moments(self.wer, *other.wer)
+        self.add_edits(other.edits)
+        for subset, columns in other.correct.items():
+            for column, (correct, total) in columns.items():
+                self.add_correct(subset, column, correct, total)
+        return self
+
+    @property
+    def cer_std(self):
+        return math.sqrt(self.cer_m2 / (self.cer_count - 1)) if self.cer_count > 1 else float("nan")
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "cer": [self.cer_count, self.cer_mean, self.cer_m2,
+                    None if self.cer_count == 0 else self.cer_min,
+                    None if self.cer_count == 0 else self.cer_max],
+            "cer_sketch": self.cer_sketch.to_dict(),
+            "correct": self.correct,
+            "wer": self.wer,
+            "edits": self.edits,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = cls()
+        acc.rows = data["rows"]
+        count, mean, m2, lo, hi = data["cer"]
+        acc.cer_count, acc.cer_mean, acc.cer_m2 = count, mean, m2
+        acc.cer_min = math.inf if lo is None else lo
+        acc.cer_max = -math.inf if hi is None else hi
+        acc.cer_sketch = QuantileSketch.from_dict(data["cer_sketch"])
+        acc.correct = {subset: {col: list(v) for col, v in cols.items()} for subset, cols in data["correct"].items()}
+        # Absent from accumulators saved before WER was tracked
+        acc.wer = list(data.get("wer", acc.wer))
+        acc.edits.update(data.get("edits", {}))
+        return acc
+
+
+class MetricsAccumulator:
+    """
+    Per-accent-group accumulators for one shard, chunk or merged run
+
+    ``update`` takes a chunk of intents.csv rows that already has a ``cer``
+    column; per-group aggregates are computed with one groupby per chunk.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.groups = {}
+        # Text normalizers recorded in the rows (see text_normalization.py)
+        self.normalizers = set()
+
+    def _group(self, name):
+        if name not in self.groups:
+            self.groups[name] = GroupAccumulator(self.relative_accuracy)
+        return self.groups[name]
+
+    def update(self, chunk):
+        if len(chunk) == 0:
+            return self
+        if NORMALIZER_COLUMN in chunk.columns:
+            self.normalizers.update(chunk[NORMALIZER_COLUMN].dropna().astype(str).unique())
+        groups = chunk["accent_group"]
+        if "true_intent" in chunk.columns:
+            known = chunk["true_intent"].astype(str).str.lower() != "unknown"
+        else:
+            known = pd.Series(True, index=chunk.index)
+        columns = [col for col in CORRECTNESS_COLUMNS if col in chunk.columns]
+
+        sizes = groups.value_counts()
+        sums = chunk.groupby(groups)[columns].sum() if columns else None
+        known_sums = chunk[known].groupby(groups[known])[columns].agg(["sum", "count"]) if columns else None
+
+        for name, rows in sizes.items():
+            acc = self._group(name)
+            acc.rows += int(rows)
+            for col in columns:
+                acc.add_correct("all", col, sums.loc[name, col], rows)
+                if known_sums is not None and name in known_sums.index:
+                    acc.add_correct("known", col, known_sums.loc[name, (col, "sum")],
+                                    known_sums.loc[name, (col, "count")])
+
+        if "cer" in chunk.columns:
+            for name, values in chunk.groupby(groups)["cer"]:
+                self._group(name).add_cer(values.to_numpy())
+        if "wer" in chunk.columns and all(col in chunk.columns for col in EDIT_SUM_COLUMNS):
+            for name, values in chunk.groupby(groups)["wer"]:
+                self._group(name).add_wer(values.to_numpy())
+            for name, sums in chunk.groupby(groups)[EDIT_SUM_COLUMNS].sum().iterrows():
+                self._group(name).add_edits(sums)
+        return self
+
+    def merge(self, other):
+        for name, acc in other.groups.items():
+            self._group(name).merge(acc)
+        self.normalizers |= other.normalizers
+        return self
+
+    def counts(self, subset, column):
+        """Per-group sum/count table for compute_intent_accuracy(counts=...)."""
+        rows = {
+            name: acc.correct[subset][column]
+            for name, acc in self.groups.items()
+            if column in acc.correct[subset] and acc.correct[subset][column][1] > 0
+        }
+        if not rows:
+            return None
+        table = pd.DataFrame.from_dict(rows, orient="index", columns=["sum", "count"]).sort_index()
+        table.index.name = "accent_group"
+        return table
+
+    def cer_table(self, quantiles=(0.5, 0.9, 0.99)):
+        """CER statistics by group, in the layout of compute_cer_by_group plus sketch quantiles."""
+        rows = {}
+        for name in sorted(self.groups):
+            acc = self.groups[name]
+            row = {
+                "cer_mean": acc.cer_mean if acc.cer_count else float("nan"),
+                "cer_std": acc.cer_std,
+                "cer_min": acc.cer_min if acc.cer_count else float("nan"),
+                "cer_max": acc.cer_max if acc.cer_count else float("nan"),
+                "sample_count": acc.rows,
+            }
+            for q in quantiles:
+                row[f"cer_p{int(round(q * 100))}"] = acc.cer_sketch.quantile(q)
+            rows[name] = row
+        table = pd.DataFrame.from_dict(rows, orient="index").round(4)
+        table.index.name = "accent_group"
+        return table
+
+    def error_breakdown(self):
+        """WER and edit-op table in the layout of compute_error_breakdown_by_group, or None."""
+        rows = {}
+        for name, acc in self.groups.items():
+            count, mean, m2 = acc.wer
+            if count == 0:
+                continue
+            row = {"wer_mean": mean, "wer_std": math.sqrt(m2 / (count - 1)) if count > 1 else float("nan")}
+            row.update({column: acc.edits[column] for column in EDIT_OP_COLUMNS})
+            char_edits = sum(acc.edits[column] for column in EDIT_OP_COLUMNS[0:3])
+            word_edits = sum(acc.edits[column] for column in EDIT_OP_COLUMNS[3:6])
+            row["cer_pooled"] = char_edits / acc.edits["ref_chars"] if acc.edits["ref_chars"] > 0 else float("nan")
+            row["wer_pooled"] = word_edits / acc.edits["ref_words"] if acc.edits["ref_words"] > 0 else float("nan")
+            rows[name] = row
+        if not rows:
+            return None
+        table = pd.DataFrame.from_dict(rows, orient="index").sort_index().round(4)
+        table.index.name = "accent_group"
+        return table
+
+    def to_dict(self):
+        return {
+            "format_version": ACCUMULATOR_FORMAT_VERSION,
+            "relative_accuracy": self.relative_accuracy,
+            "groups": {name: acc.to_dict() for name, acc in sorted(self.groups.items())},
+            "normalizers": sorted(self.normalizers),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format_version") != ACCUMULATOR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported accumulator format: {data.get('format_version')}")
+        acc = cls(data["relative_accuracy"])
+        acc.groups = {name: GroupAccumulator.from_dict(g) for name, g in data["groups"].items()}
+        acc.normalizers = set(data.get("normalizers", []))
+        return acc
+
+    def save(self, path, miner=None):
+        """Write the accumulator JSON, with an ExampleMiner's state if given."""
+        data = self.to_dict()
+        if miner is not None:
+            data["examples"] = miner.state()
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+EXAMPLE_FIELDS = (
+    "filename", "accent_group", "speaker_type", "true_transcript", "transcribed_text",
+    "true_intent", "predicted_intent", "predicted_intent_after", "cer",
+)
+
+
+class ExampleMiner:
+    """
+    Streaming per-group example selection for demos and reports
+
+    Failures (wrong intent, CER above ``failure_cer``) are kept in a bounded
+    min-heap per group holding the ``k`` highest-CER rows. Successes (right
+    intent, CER below ``success_cer``) are a bottom-k reservoir per group:
+    each row's priority is a seeded hash of its filename, so the sample is
+    uniform, deterministic, and identical however the data is chunked or
+    sharded. Both merge exactly; ``state``/``from_state`` carry a miner
+    between shard and merge runs (stored next to the shard accumulator).
+    """
+
+    def __init__(self, k=5, failure_cer=0.2, success_cer=0.1, seed=42):
+        self.k = k
+        self.failure_cer = failure_cer
+        self.success_cer = success_cer
+        self.seed = seed
+        # group -> heap of (priority, filename, sequence, record); the
+        # sequence number keeps heapq from ever comparing two records
+        self.failures = {}
+        self.successes = {}
+        self._seq = 0
+
+    def _push(self, heaps, group, priority, record):
+        heap = heaps.setdefault(group, [])
+        item = (priority, record["filename"], self._seq, record)
+        self._seq += 1
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def _records(self, rows):
+        fields = [f for f in EXAMPLE_FIELDS if f in rows.columns]
+        return rows[fields].astype(object).where(rows[fields].notna(), None).to_dict("records")
+
+    def _top_k(self, rows, column):
+        # k largest values per group without sorting the whole frame; ties at
+        # the cut are kept so the heaps break them the same way for any chunking
+        values = rows[column].reset_index(drop=True)
+        top = values.groupby(rows["accent_group"].to_numpy()).nlargest(self.k, keep="all")
+        return rows.iloc[np.sort(top.index.get_level_values(-1).to_numpy())]
+
+    def update(self, chunk):
+        if len(chunk) == 0 or "cer" not in chunk.columns:
+            return self
+        correct = chunk["intent_correct"].astype(bool)
+
+        failures = chunk[~correct & (chunk["cer"] > self.failure_cer)]
+        # Pre-trim to k per group so heap work is bounded by groups × k.
+        failures = self._top_k(failures, "cer")
+        for record in self._records(failures):
+            self._push(self.failures, record["accent_group"], record["cer"], record)
+
+        successes = chunk[correct & (chunk["cer"] < self.success_cer)]
+        if len(successes):
+            hashes = pd.util.hash_pandas_object(
+                successes["filename"].astype(str), index=False, hash_key=f"{self.seed:016d}"[-16:]
+            ).to_numpy()
+            # Keep the k smallest hashes: push negated hashes into a min-heap of size k.
+            successes = successes.assign(_priority=-(hashes >> np.uint64(11)).astype(np.int64))
+            successes = self._top_k(successes, "_priority")
+            for priority, record in zip(successes["_priority"], self._records(successes)):
+                self._push(self.successes, record["accent_group"], int(priority), record)
+        return self
+
+    def merge(self, other):
+        for heaps, other_heaps in ((self.failures, other.failures), (self.successes, other.successes)):
+            for group, heap in other_heaps.items():
+                for priority, _, _, record in heap:
+                    self._push(heaps, group, priority, record)
+        return self
+
+    def failures_by_group(self):
+        """Worst failures per group, highest CER first."""
+        return {g: [item[-1] for item in sorted(h, key=lambda x: x[:2], reverse=True)]
+                for g, h in sorted(self.failures.items())}
+
+    def successes_by_group(self):
+        """Reservoir-sampled successes per group, in priority order."""
+        return {g: [item[-1] for item in sorted(h, key=lambda x: x[:2], reverse=True)]
+                for g, h in sorted(self.successes.items())}
+
+    def to_dict(self):
+        return {
+            "criteria": {
+                "failure": f"intent wrong and cer > {self.failure_cer}",
+                "success": f"intent correct and cer < {self.success_cer}",
+                "per_group": self.k,
+                "seed": self.seed,
+            },
+            "failures": self.failures_by_group(),
+            "successes": self.successes_by_group(),
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def state(self):
+        """Settings and heaps (with priorities), for merging in a later run."""
+        def heaps(groups):
+            return {g: [[item[0], item[-1]] for item in h] for g, h in sorted(groups.items())}
+        return {
+            "k": self.k, "failure_cer": self.failure_cer, "success_cer": self.success_cer, "seed": self.seed,
+            "failures": heaps(self.failures), "successes": heaps(self.successes),
+        }
+
+    @classmethod
+    def from_state(cls, data):
+        miner = cls(data["k"], data["failure_cer"], data["success_cer"], data["seed"])
+        for heaps, saved in ((miner.failures, data["failures"]), (miner.successes, data["successes"])):
+            for group, items in saved.items():
+                for priority, record in items:
+                    miner._push(heaps, group, priority, record)
+        return miner
+
+    @classmethod
+    def load(cls, path):
+        """Miner saved with a shard accumulator (MetricsAccumulator.save), or None."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls.from_state(data["examples"]) if "examples" in data else None
@@ -0,0 +1,415 @@
+"""
+Misrecognition Mining Script
+Finds which words Whisper gets wrong for each accent group
+
+Aligns true and transcribed text at word level, extracts
+(reference n-gram → hypothesis n-gram) substitution pairs, and counts them
+per accent group. Counts live in a mergeable SubstitutionCounter, so large
+results files can be processed in chunks or as separate shards. Outputs
+ranked tables and candidate rules in the format normalize_transcript uses.
+
+Usage:
+    python scripts/mine_misrecognitions.py --input results/intents.csv --output_dir results
+    python scripts/mine_misrecognitions.py --input shard_0.csv --chunksize 100000 --save_counts counts_0.json
+    python scripts/mine_misrecognitions.py --merge_counts counts_*.json --output_dir results
+"""
+
+import argparse
+import json
+from collections import Counter
+import pandas as pd
+import Levenshtein
+from pathlib import Path
+try:
+    from _python_version_check import ensure_python_3_12_12
+    from classify_intent import TRANSCRIPT_REPLACEMENTS
+    from table_loading import read_table
+    from text_normalization import NORMALIZED_COLUMNS, ensure_normalized
+except ModuleNotFoundError:
+    from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.classify_intent import TRANSCRIPT_REPLACEMENTS
+    from scripts.table_loading import read_table
+    from scripts.text_normalization import NORMALIZED_COLUMNS, ensure_normalized
+
+
+COUNTER_FORMAT_VERSION = 1
+ALL_GROUPS = "*"
+
+
+def tokenize(text):
+    """Split normalized text into words (missing text has none)."""
+    if not isinstance(text, str):
+        return []
+    return text.split()
+
+
+def extract_substitutions(reference, hypothesis, max_n=3):
+    """
+    Word-level (reference n-gram, hypothesis n-gram) error spans
+
+    Adjacent edit operations are merged into one span, so a split such as
+    "internet" → "inter net" comes out as a single pair rather than a
+    substitution plus an insertion. Pure insertions and deletions are
+    anchored with one neighbouring correct word so both sides are non-empty.
+    Spans longer than ``max_n`` words on either side are skipped as
+    unaligned garble.
+
+    Args:
+        reference (str): Normalized true transcript
+        hypothesis (str): Normalized ASR transcript
+        max_n (int): Maximum n-gram length on either side
+
+    Returns:
+        list: (reference n-gram, hypothesis n-gram) string tuples
+    """
+    ref_words = tokenize(reference)
+    hyp_words = tokenize(hypothesis)
+    if not ref_words or not hyp_words:
+        return []
+
+    spans = []
+    for op, i1, i2, j1, j2 in Levenshtein.opcodes(ref_words, hyp_words):
+        if op == "equal":
+            continue
+        if spans and spans[-1][1] == i1 and spans[-1][3] == j1:
+            spans[-1] = (spans[-1][0], i2, spans[-1][2], j2)
+        else:
+            spans.append((i1, i2, j1, j2))
+
+    pairs = []
+    for i1, i2, j1, j2 in spans:
+        if i1 == i2 or j1 == j2:
+            if i1 > 0 and j1 > 0:
+                i1, j1 = i1 - 1, j1 - 1
+            elif i2 < len(ref_words) and j2 < len(hyp_words):
+                i2, j2 = i2 + 1, j2 + 1
+            else:
+                continue
+        if i2 - i1 > max_n or j2 - j1 > max_n:
+            continue
+        pairs.append((" ".join(ref_words[i1:i2]), " ".join(hyp_words[j1:j2])))
+    return pairs
+
+
+class SubstitutionCounter:
+    """
+    Mergeable per-group counts of word-level substitution pairs
+
+    Also tracks rows and reference words seen per group so rates can be
+    reported per 1,000 reference words. Merging adds counts and is exact.
+    """
+
+    def __init__(self, max_n=3):
+        self.max_n = max_n
+        self.pairs = Counter()        # (group, reference, hypothesis) -> count
+        self.samples = Counter()      # group -> rows seen
+        self.ref_words = Counter()    # group -> reference words seen
+
+    def update(self, chunk):
+        """
+        Fold a chunk of intents.csv rows into the counter
+
+        Alignment runs on the shared normalized text, once per distinct
+        (reference, hypothesis) pair, since Common Voice sentences repeat
+        across speakers.
+        """
+        if len(chunk) == 0:
+            return self
+        chunk = chunk.dropna(subset=["accent_group"]).copy()
+        ensure_normalized(chunk)
+        chunk = chunk[["accent_group", "true_transcript_norm", "transcribed_text_norm"]]
+        pair_counts = chunk.groupby(
+            ["accent_group", "true_transcript_norm", "transcribed_text_norm"], dropna=False, observed=True
+        ).size()
+
+        spans = {}
+        for (group, ref, hyp), n in pair_counts.items():
+            key = (ref, hyp)
+            if key not in spans:
+                spans[key] = extract_substitutions(ref, hyp, self.max_n)
+            for ref_ngram, hyp_ngram in spans[key]:
+                self.pairs[group, ref_ngram, hyp_ngram] += int(n)
+
+        self.samples.update(chunk["accent_group"].value_counts().to_dict())
+        words = chunk["true_transcript_norm"].map(lambda text: len(tokenize(text)))
+        self.ref_words.update(words.groupby(chunk["accent_group"]).sum().astype(int).to_dict())
+        return self
+
+    def merge(self, other):
+        self.pairs.update(other.pairs)
+        self.samples.update(other.samples)
+        self.ref_words.update(other.ref_words)
+        return self
+
+    def table(self, top=None, min_count=1):
+        """
+        Ranked substitution table, per group plus an all-groups ("*") block
+
+        Args:
+            top (int): Keep the top N pairs per group (optional)
+            min_count (int): Minimum occurrences to report
+
+        Returns:
+            pd.DataFrame: accent_group, rank, reference, hypothesis, count,
+            per_1k_ref_words, share_of_group_errors
+        """
+        columns = ["accent_group", "reference", "hypothesis", "count"]
+        if not self.pairs:
+            return pd.DataFrame(columns=columns + ["rank", "per_1k_ref_words", "share_of_group_errors"])
+        df = pd.DataFrame([(*key, n) for key, n in self.pairs.items()], columns=columns)
+        overall = df.groupby(["reference", "hypothesis"], as_index=False)["count"].sum()
+        overall.insert(0, "accent_group", ALL_GROUPS)
+        df = pd.concat([df, overall], ignore_index=True)
+
+        ref_words = pd.Series(self.ref_words, dtype=float)
+        ref_words[ALL_GROUPS] = ref_words.sum()
+        group_totals = df.groupby("accent_group")["count"].transform("sum")
+        df["per_1k_ref_words"] = (1000 * df["count"] / df["accent_group"].map(ref_words)).round(3)
+        df["share_of_group_errors"] = (df["count"] / group_totals).round(4)
+
+        df = df[df["count"] >= min_count]
+        df = df.sort_values(["accent_group", "count", "reference", "hypothesis"], ascending=[True, False, True, True])
+        df["rank"] = df.groupby("accent_group").cumcount() + 1
+        if top:
+            df = df[df["rank"] <= top]
+        return df[["accent_group", "rank", "reference", "hypothesis", "count",
+                   "per_1k_ref_words", "share_of_group_errors"]].reset_index(drop=True)
+
+    def to_dict(self):
+        return {
+            "version": COUNTER_FORMAT_VERSION,
+            "max_n": self.max_n,
+            "pairs": [[g, r, h, n] for (g, r, h), n in sorted(self.pairs.items())],
+            "samples": dict(self.samples),
+            "ref_words": dict(self.ref_words),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != COUNTER_FORMAT_VERSION:
+            raise ValueError(f"Unsupported substitution counter version: {data.get('version')}")
+        counter = cls(max_n=data["max_n"])
+        counter.pairs = Counter({(g, r, h): n for g, r, h, n in data["pairs"]})
+        counter.samples = Counter(data["samples"])
+        counter.ref_words = Counter(data["ref_words"])
+        return counter
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def candidate_rules(counter, min_count=3, min_precision=0.8, min_chars=4):
+    """
+    Propose (misrecognized, corrected) rules for normalize_transcript
+
+    A hypothesis n-gram becomes a rule when it is mined at least
+    ``min_count`` times, maps to one reference in at least ``min_precision``
+    of its occurrences, and is at least ``min_chars`` characters long
+    (normalize_transcript replaces substrings, so very short patterns would
+    also fire inside other words). Rules already in TRANSCRIPT_REPLACEMENTS
+    are skipped. These are candidates for review, not automatic fixes.
+
+    Args:
+        counter (SubstitutionCounter): Mined counts
+        min_count (int): Minimum occurrences of the pair
+        min_precision (float): Minimum share of the hypothesis n-gram's
+            occurrences that map to the proposed reference
+        min_chars (int): Minimum length of the pattern
+
+    Returns:
+        pd.DataFrame: old, new, count, precision, groups (per-group counts)
+    """
+    columns = ["old", "new", "count", "precision", "groups"]
+    table = counter.table()
+    table = table[table["accent_group"] != ALL_GROUPS]
+    if table.empty:
+        return pd.DataFrame(columns=columns)
+
+    pair_totals = table.groupby(["hypothesis", "reference"])["count"].sum()
+    hyp_totals = pair_totals.groupby(level="hypothesis").transform("sum")
+    rules = pd.DataFrame({"count": pair_totals, "precision": (pair_totals / hyp_totals).round(3)}).reset_index()
+    rules = rules.rename(columns={"hypothesis": "old", "reference": "new"})
+
+    existing = set(TRANSCRIPT_REPLACEMENTS)
+    keep = (
+        (rules["count"] >= min_count)
+        & (rules["precision"] >= min_precision)
+        & (rules["old"].str.len() >= min_chars)
+        & ~pd.Series([(o, n) in existing for o, n in zip(rules["old"], rules["new"])], index=rules.index)
+    )
+    rules = rules[keep]
+
+    by_group = table.set_index(["hypothesis", "reference"]).sort_values("count", ascending=False)
+    rules["groups"] = [
+        ", ".join(f"{g} {n}" for g, n in zip(rows["accent_group"], rows["count"]))
+        for rows in (by_group.loc[[(o, n)]] for o, n in zip(rules["old"], rules["new"]))
+    ]
+    return rules.sort_values(["count", "old"], ascending=[False, True])[columns].reset_index(drop=True)
+
+
+def format_rules(rules):
+    """Render rules as TRANSCRIPT_REPLACEMENTS entries ready to paste."""
+    lines = ["# Candidate entries for TRANSCRIPT_REPLACEMENTS (review before adding)"]
+    for row in rules.itertuples(index=False):
+        lines.append(f"    ({json.dumps(row.old)}, {json.dumps(row.new)}),  # {row.count}× ({row.groups}), precision {row.precision:.0%}")
+    return "\n".join(lines) + "\n"
+
+
+def mine_misrecognitions(input_csv, chunksize=None, max_n=3):
+    """
+    Count substitution pairs in intents.csv, optionally chunk by chunk
+
+    Args:
+        input_csv (str): Intent classification results CSV
+        chunksize (int): Rows per chunk (optional; whole file if None)
+        max_n (int): Maximum n-gram length
+
+    Returns:
+        SubstitutionCounter: Mined counts
+    """
+    # Read cached normalized columns when present instead of recomputing.
+    wanted = {"accent_group", *NORMALIZED_COLUMNS, *NORMALIZED_COLUMNS.values()}
+    counter = SubstitutionCounter(max_n=max_n)
+    if not chunksize:
+        return counter.update(read_table(input_csv, columns=wanted))
+
+    print(f"\nStreaming {input_csv} in chunks of {chunksize} rows...")
+    rows = 0
+    for chunk in read_table(input_csv, columns=wanted, chunksize=chunksize):
+        counter.update(chunk)
+        rows += len(chunk)
+        print(f"  Mined {rows} rows")
+    return counter
+
+
+def save_outputs(counter, output_dir, top=20, min_count=2, rule_min_count=3, rule_min_precision=0.8):
+    """
+    Write ranked tables and candidate rules, and print a per-group summary
+
+    Args:
+        counter (SubstitutionCounter): Mined counts
+        output_dir (str): Directory for output files
+        top (int): Pairs per group in the ranked table
+        min_count (int): Minimum occurrences for the ranked table
+        rule_min_count (int): Minimum occurrences for a candidate rule
+        rule_min_precision (float): Minimum precision for a candidate rule
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    table = counter.table(top=top, min_count=min_count)
+    table_csv = output_dir / "misrecognitions.csv"
+    table.to_csv(table_csv, index=False)
+
+    rules = candidate_rules(counter, min_count=rule_min_count, min_precision=rule_min_precision)
+    rules_csv = output_dir / "candidate_rules.csv"
+    rules.to_csv(rules_csv, index=False)
+    rules_txt = output_dir / "candidate_rules.txt"
+    rules_txt.write_text(format_rules(rules))
+
+    print(f"\n{'='*70}")
+    print(f"TOP MISRECOGNITIONS BY ACCENT GROUP")
+    print(f"{'='*70}")
+    for group, rows in table.groupby("accent_group", sort=True):
+        print(f"\n{group} ({counter.samples.get(group, sum(counter.samples.values()))} samples):")
+        for row in rows.head(5).itertuples(index=False):
+            print(f"  {row.count:>5}×  '{row.reference}' → '{row.hypothesis}'  ({row.per_1k_ref_words:.1f} per 1k words)")
+
+    print(f"\n✅ Ranked table saved to: {table_csv}")
+    print(f"✅ {len(rules)} candidate rules saved to: {rules_csv} and {rules_txt}")
+
+
+def main():
+    ensure_python_3_12_12()
+    parser = argparse.ArgumentParser(
+        description="Mine word-level misrecognitions per accent group"
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        default="results/intents.csv",
+        help="Input CSV with true_transcript, transcribed_text and accent_group"
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default="results",
+        help="Directory for misrecognitions.csv and candidate_rules.*"
+    )
+    parser.add_argument(
+        "--max_n",
+        type=int,
+        default=3,
+        help="Maximum n-gram length on either side of a pair"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Pairs per accent group in the ranked table"
+    )
+    parser.add_argument(
+        "--min_count",
+        type=int,
+        default=2,
+        help="Minimum occurrences for the ranked table"
+    )
+    parser.add_argument(
+        "--rule_min_count",
+        type=int,
+        default=3,
+        help="Minimum occurrences for a candidate rule"
+    )
+    parser.add_argument(
+        "--rule_min_precision",
+        type=float,
+        default=0.8,
+        help="Minimum share of a pattern's occurrences that map to the proposed correction"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=0,
+        help="Stream --input in chunks of this many rows (0 = load at once)"
+    )
+    parser.add_argument(
+        "--save_counts",
+        type=str,
+        default="",
+        help="Also write the mergeable counts to this JSON path"
+    )
+    parser.add_argument(
+        "--merge_counts",
+        nargs="+",
+        default=None,
+        help="Merge shard count JSONs instead of reading --input"
+    )
+
+    args = parser.parse_args()
+
+    if args.merge_counts:
+        print(f"\nMerging {len(args.merge_counts)} count files...")
+        counter = SubstitutionCounter.load(args.merge_counts[0])
+        for path in args.merge_counts[1:]:
+            counter.merge(SubstitutionCounter.load(path))
+    else:
+        print(f"\nLoading {args.input}...")
+        counter = mine_misrecognitions(args.input, args.chunksize or None, args.max_n)
+
+    if args.save_counts:
+        Path(args.save_counts).parent.mkdir(parents=True, exist_ok=True)
+        counter.save(args.save_counts)
+        print(f"✅ Counts saved to: {args.save_counts}")
+
+    save_outputs(counter, args.output_dir, args.top, args.min_count,
+                 args.rule_min_count, args.rule_min_precision)
+
+
+if __name__ == "__main__":
+    main()
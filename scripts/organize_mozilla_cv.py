@@ -9,13 +9,27 @@ Usage:
 """
 
 import argparse
-import pandas as pd
+import errno
+import hashlib
+import os
+import re
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
 from pathlib import Path
 try:
     from _python_version_check import ensure_python_3_12_12
+    from audio_transcode import ffmpeg_available, transcode, wav_info
+    from sample_shards import pack_samples, remove_shards
+    from stratified_sampling import StratifiedReservoir
+    from table_loading import ENGINES, read_header, read_table, table_separator
 except ModuleNotFoundError:
     from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.audio_transcode import ffmpeg_available, transcode, wav_info
+    from scripts.sample_shards import pack_samples, remove_shards
+    from scripts.stratified_sampling import StratifiedReservoir
+    from scripts.table_loading import ENGINES, read_header, read_table, table_separator
 
 
 SYNONYMS = {
@@ -27,6 +41,18 @@ SYNONYMS = {
     "Canadian": ["canadian", "canada"],
 }
 ALLOWED_AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".m4a", ".ogg"}
+SAMPLING_METHODS = ["first", "reservoir"]
+NATIVE_GROUPS = ['US', 'England', 'Australian', 'Canadian']
+MATERIALIZE_METHODS = ["copy", "hardlink", "symlink", "reflink", "transcode"]
+_MATERIALIZE_VERBS = {
+    "copy": "Copied", "hardlink": "Linked", "symlink": "Symlinked", "reflink": "Cloned", "transcode": "Transcoded",
+}
+# Errors meaning "this filesystem can't do that", as opposed to a bad file.
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EPERM, errno.EACCES, errno.EOPNOTSUPP, errno.ENOTSUP,
+    errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EMLINK,
+}
+_FICLONE = 0x40049409  # Linux ioctl for copy-on-write clones (btrfs, XFS)
 
 
 def _normalize(s):
@@ -52,14 +78,296 @@ def _build_group_tokens(tokens):
     return groups
 
 
-def _choose_column(df, primary, fallback=None):
-    if primary in df.columns:
+def _speaker_type(group):
+    return 'native' if group in NATIVE_GROUPS else 'ESL'
+
+
+def _choose_column(columns, primary, fallback=None):
+    if primary in columns:
         return primary
-    if fallback and fallback in df.columns:
+    if fallback and fallback in columns:
         return fallback
     return None
 
 
+def _find_metadata_file(cv_path, metadata_csv=None):
+    if metadata_csv:
+        metadata_file = Path(metadata_csv).expanduser()
+        if metadata_file.exists():
+            print(f"Using metadata CSV: {metadata_file}")
+            return metadata_file
+        print(f"❌ Metadata CSV not found: {metadata_file}")
+        return None
+    for name in ['validated.tsv', 'test.tsv', 'dev.tsv', 'train.tsv']:
+        candidate = cv_path / name
+        if candidate.exists():
+            print(f"Found metadata file: {candidate}")
+            return candidate
+    return None
+
+
+def _match_groups(accent_values, group_tokens):
+    """
+    Canonical group for each accent label (None when no group matches)
+
+    A label matches a group when it contains any of the group's tokens;
+    the first matching group in ``group_tokens`` order wins. Each group's
+    tokens are combined into one regex, applied to the distinct labels.
+    """
+    codes, labels = pd.factorize(accent_values, use_na_sentinel=True)
+    # Missing values share sentinel code -1, which indexes the last slot
+    # (str(nan) == "nan", as in a row-by-row str() match).
+    labels = pd.Series([*labels, float("nan")], dtype=object).map(str).str.lower().str.strip()
+    matched = pd.Series(None, index=labels.index, dtype=object)
+    for group_name, tokens in group_tokens.items():
+        pattern = "|".join(re.escape(tok) for tok in sorted(tokens))
+        hit = matched.isna() & labels.str.contains(pattern, regex=True)
+        matched[hit] = group_name
+    return pd.Series(matched.to_numpy()[codes], index=accent_values.index)
+
+
+class _DirectoryIndex:
+    """
+    Entry names per directory, listed with one os.scandir call each
+
+    Replaces a stat() per candidate path with a set lookup. The standard
+    clip directories are indexed up front; any other directory (e.g. a
+    subdirectory named in a metadata path) is listed on first use.
+    """
+
+    def __init__(self, directories=()):
+        self._entries = {}
+        for directory in directories:
+            self._names(directory)
+
+    def _names(self, directory):
+        names = self._entries.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as entries:
+                    # is_file/is_dir follow symlinks, so broken links are
+                    # skipped just as Path.exists() would skip them.
+                    names = {e.name for e in entries if e.is_file() or e.is_dir()}
+            except OSError:
+                names = set()
+            self._entries[directory] = names
+        return names
+
+    def exists(self, path):
+        return path.name in self._names(path.parent)
+
+    @property
+    def file_count(self):
+        return sum(len(names) for names in self._entries.values())
+
+
+def _build_directory_index(cv_path, metadata_file=None):
+    directories = [cv_path, cv_path / 'clips', cv_path.parent, cv_path.parent / 'clips']
+    if metadata_file:
+        directories.append(metadata_file.parent)
+    index = _DirectoryIndex(dict.fromkeys(directories))
+    print(f"Indexed {index.file_count} entries in {len(index._entries)} directories")
+    return index
+
+
+def _reflink(src, dst):
+    import fcntl  # not available on Windows; caught as unsupported below
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+
+
+class _Materializer:
+    """
+    Put a selected clip in the output directory by copy, hardlink, symlink
+    or reflink, or transcode it to 16 kHz mono WAV, and return its manifest
+    record
+
+    If the filesystem rejects the chosen link method (cross-device link, no
+    reflink support, ...), switches to copy for this and all later files.
+    Copies are hashed while they are written; linked files are hashed by
+    reading the source. Transcoded files record the size, checksum and
+    duration of the WAV written; each runs in its own ffmpeg process, so a
+    thread pool transcodes in parallel. Safe to call from several threads.
+    """
+
+    def __init__(self, method="copy", hash_name="sha256"):
+        self.method = method
+        self.hash_name = None if hash_name == "none" else hash_name
+        self._lock = threading.Lock()
+
+    def _fall_back(self, method, error):
+        with self._lock:
+            if self.method == method:
+                print(f"⚠️  {method} not supported here ({error}); falling back to copy")
+                self.method = "copy"
+
+    def _copy(self, src, dst):
+        digest = hashlib.new(self.hash_name) if self.hash_name else None
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            while chunk := s.read(1 << 20):
+                d.write(chunk)
+                if digest:
+                    digest.update(chunk)
+        shutil.copymode(src, dst)
+        return digest.hexdigest() if digest else ""
+
+    def _hash(self, path):
+        if not self.hash_name:
+            return ""
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, self.hash_name).hexdigest()
+
+    def __call__(self, src, dst):
+        # Never write through an existing entry: it may be a link to a source clip.
+        if dst.is_symlink() or dst.exists():
+            dst.unlink()
+        method = self.method
+        if method == "transcode":
+            transcode(src, dst)
+            duration, digest = wav_info(dst, self.hash_name)
+            return {
+                "source": str(src),
+                "size": dst.stat().st_size,
+                self.hash_name or "hash": digest,
+                "method": method,
+                "duration": duration,
+            }
+        try:
+            if method == "hardlink":
+                os.link(src, dst)
+            elif method == "symlink":
+                os.symlink(src.resolve(), dst)
+            elif method == "reflink":
+                _reflink(src, dst)
+        except (OSError, ImportError) as e:
+            if isinstance(e, OSError) and e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            if dst.is_symlink() or dst.exists():
+                dst.unlink()
+            self._fall_back(method, e)
+            method = "copy"
+
+        digest = self._copy(src, dst) if method == "copy" else self._hash(src)
+        return {
+            "source": str(src),
+            "size": src.stat().st_size,
+            self.hash_name or "hash": digest,
+            "method": method,
+        }
+
+    def checksum(self, record):
+        """Checksum column for ground_truth.csv (transcoded clips only)."""
+        if record["method"] != "transcode" or not self.hash_name:
+            return {}
+        return {self.hash_name: record[self.hash_name]}
+
+
+def _sample_reservoir(
+    chunks,
+    group_tokens,
+    columns,
+    samples_per_accent,
+    seed,
+    max_per_speaker,
+    cv_path,
+    metadata_file,
+    index,
+):
+    """
+    Uniform random rows per accent group in one pass over the metadata
+
+    Only rows whose audio resolves to an allowed file are eligible, so
+    missing clips don't leave a group short.
+
+    Args:
+        chunks (iterable): Metadata DataFrames (one, or chunks of the file)
+        group_tokens (dict): Group name -> accent tokens
+        columns (dict): accent, path and (optional) speaker column names
+        samples_per_accent (int): Rows to sample per group
+        seed (int): Sampling seed
+        max_per_speaker (int): Cap on rows per speaker in a group (0 = none)
+        cv_path (Path): Common Voice directory
+        metadata_file (Path): Metadata file (for relative audio paths)
+        index (_DirectoryIndex): Directory listings for path resolution
+
+    Returns:
+        tuple: (sampled rows in file order, rows scanned, unresolved paths)
+    """
+    reservoir = StratifiedReservoir(samples_per_accent, seed, max_per_speaker)
+    unresolved = 0
+
+    def usable(row):
+        nonlocal unresolved
+        audio_filename = row.get(columns["path"], "")
+        if not audio_filename:
+            return False
+        src_audio = _resolve_audio_path(audio_filename, cv_path, metadata_file, index)
+        if not src_audio:
+            unresolved += 1
+            return False
+        return src_audio.suffix.lower() in ALLOWED_AUDIO_EXTENSIONS
+
+    scanned = 0
+    loaded = []
+    for chunk in chunks:
+        scanned += len(chunk)
+        loaded = list(chunk.columns)
+        chunk = chunk.assign(_group=_match_groups(chunk[columns["accent"]], group_tokens))
+        reservoir.offer_frame(chunk, "_group", columns["path"], columns["speaker"], accept=usable)
+
+    print(f"Reservoir sample (seed {seed}) from {scanned} metadata rows:")
+    for group in group_tokens:
+        sampled = len(reservoir.items(group))
+        print(f"  {group:15s}: {sampled:3d} of {reservoir.seen[group]:6d} rows "
+              f"({reservoir.speakers(group)} speakers)")
+    rows = [row for group in group_tokens for row in reservoir.items(group)]
+    return pd.DataFrame(rows, columns=loaded).sort_index(), scanned, unresolved
+
+
+def _write_manifest(records, output_path):
+    manifest_path = output_path / "manifest.csv"
+    pd.DataFrame(records).to_csv(manifest_path, index=False)
+    print(f"Manifest: {manifest_path}")
+
+
+def _pack_shards(output_path, ground_truth_rows, shard_size, records):
+    """Pack the clips into shards and record each clip's shard in its manifest record."""
+    shards = pack_samples(output_path, ground_truth_rows, shard_size)
+    for record in records:
+        record["shard"] = shards[record["filename"]]
+    print(f"Packed {len(ground_truth_rows)} clips into {len(set(shards.values()))} shard(s) of up to "
+          f"{shard_size}: {output_path / 'index.csv'}")
+
+
+def _resolve_audio_path(audio_filename, cv_path, metadata_file=None, index=None):
+    audio_rel = Path(str(audio_filename))
+    # Treat metadata paths as untrusted input:
+    # do not allow absolute paths or parent traversal.
+    if audio_rel.is_absolute() or ".." in audio_rel.parts:
+        audio_rel = Path(audio_rel.name)
+
+    # Try multiple possible locations
+    possible_paths = [
+        cv_path / audio_rel,
+        cv_path / 'clips' / audio_rel,
+        cv_path / 'clips' / audio_rel.name,
+        cv_path.parent / 'clips' / audio_rel.name,
+        cv_path.parent / audio_rel,
+    ]
+
+    if metadata_file:
+        metadata_dir = metadata_file.parent
+        possible_paths.extend([
+            metadata_dir / audio_rel,
+            metadata_dir / audio_rel.name,
+        ])
+
+    for path in possible_paths:
+        if index.exists(path) if index else path.exists():
+            return path
+    return None
+
+
 def organize_cv_data(
     cv_dir,
     output_dir,
@@ -73,6 +381,16 @@ def organize_cv_data(
     allow_no_metadata=True,
     metadata_csv=None,
     write_ground_truth=False,
+    materialize="copy",
+    workers=8,
+    manifest_hash="sha256",
+    chunksize=0,
+    engine="c",
+    sampling="first",
+    seed=42,
+    max_per_speaker=0,
+    speaker_column="client_id",
+    shard_size=0,
 ):
     """
     Organize Mozilla Common Voice data by selecting samples per accent
@@ -81,6 +399,22 @@ def organize_cv_data(
         cv_dir (str): Path to cv-valid-test directory
         output_dir (str): Output directory for organized audio files
         samples_per_accent (int): Number of samples to collect per accent
+        materialize (str): copy, hardlink, symlink or reflink (falls back to
+            copy), or transcode to 16 kHz mono WAV
+        workers (int): Threads for materializing files (one ffmpeg process
+            each when transcoding)
+        manifest_hash (str): Hash for manifest.csv (sha256, md5 or none)
+        chunksize (int): Scan metadata in chunks of this many rows and stop
+            once every group is full (0 = load all rows)
+        engine (str): CSV parser engine for a full load (c, pyarrow or auto)
+        sampling (str): "first" matching rows per group, or a seeded
+            uniform "reservoir" sample over the whole file
+        seed (int): Seed for reservoir sampling
+        max_per_speaker (int): Reservoir sampling: cap on clips per speaker
+            within a group (0 = no cap)
+        speaker_column (str): Column with speaker ids for the cap
+        shard_size (int): Pack the clips and their ground-truth rows into tar
+            shards of this many samples, with an index.csv (0 = loose files)
 
     Returns:
         dict: Counts of samples collected per accent
@@ -90,21 +424,11 @@ def organize_cv_data(
     output_path.mkdir(parents=True, exist_ok=True)
 
     # Find metadata file
-    metadata_file = None
-    if metadata_csv:
-        metadata_file = Path(metadata_csv).expanduser()
-        if metadata_file.exists():
-            print(f"Using metadata CSV: {metadata_file}")
-        else:
-            print(f"❌ Metadata CSV not found: {metadata_file}")
-            metadata_file = None
-    else:
-        for name in ['validated.tsv', 'test.tsv', 'dev.tsv', 'train.tsv']:
-            candidate = cv_path / name
-            if candidate.exists():
-                metadata_file = candidate
-                print(f"Found metadata file: {metadata_file}")
-                break
+    metadata_file = _find_metadata_file(cv_path, metadata_csv)
+    materializer = _Materializer(materialize, manifest_hash)
+    if materialize == "transcode" and not ffmpeg_available():
+        print("❌ --materialize transcode needs ffmpeg on PATH (see the install notes in README.md)")
+        return {}
 
     gt_path = Path('data/ground_truth.csv' if write_ground_truth else 'data/ground_truth_template.csv')
     if write_ground_truth and gt_path.exists():
@@ -128,21 +452,29 @@ def organize_cv_data(
         if not audio_files:
             print("❌ No audio files found to copy.")
             return {}
+        # Shards from an earlier run would be transcribed instead of this run's clips
+        remove_shards(output_path)
 
         selected = audio_files[:total_samples]
+        new_filenames = [
+            f"sample_{i:03d}{'.wav' if materialize == 'transcode' else src.suffix.lower() or '.wav'}"
+            for i, src in enumerate(selected)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            records = list(pool.map(
+                lambda job: materializer(job[0], output_path / job[1]), zip(selected, new_filenames)
+            ))
         ground_truth_rows = []
-        for i, src_audio in enumerate(selected):
-            ext = src_audio.suffix.lower() or ".wav"
-            new_filename = f"sample_{i:03d}{ext}"
-            dst_audio = output_path / new_filename
-            shutil.copy(src_audio, dst_audio)
+        for new_filename, record in zip(new_filenames, records):
+            record["filename"] = new_filename
             ground_truth_rows.append({
                 'filename': new_filename,
                 'accent_group': 'Unknown',
                 'speaker_type': 'unknown',
                 'true_transcript': '',
                 'true_intent': 'unknown',
-                'duration': 0
+                'duration': record.get('duration', 0),
+                **materializer.checksum(record),
             })
 
         gt_df = pd.DataFrame(ground_truth_rows)
@@ -155,45 +487,79 @@ def organize_cv_data(
                 template_path.unlink()
 
         print(f"\nCopied {len(selected)} files to {output_dir}")
+        if shard_size:
+            _pack_shards(output_path, ground_truth_rows, shard_size, records)
+        _write_manifest(records, output_path)
         label = "ground truth file" if write_ground_truth else "ground truth template"
         print(f"Created {label}: {gt_path}")
         print("NOTE: You must fill in accent_group and true_transcript manually.")
         return {"Unknown": len(selected)}
 
     print(f"\nReading metadata from: {metadata_file}")
-    sep = '\t' if metadata_file.suffix.lower() in ['.tsv'] else ','
-    df = pd.read_csv(metadata_file, sep=sep)
+    sep = table_separator(metadata_file)
+    columns = read_header(metadata_file, sep)
 
     # Check what columns are available
-    print(f"Available columns: {list(df.columns)}")
-    print(f"Total rows: {len(df)}")
+    print(f"Available columns: {columns}")
 
     # Determine columns to use
-    accent_col = _choose_column(df, accent_column, fallback=fallback_accent_column)
-    text_col = _choose_column(df, text_column, fallback="text")
-    path_col = _choose_column(df, path_column, fallback="filename")
+    accent_col = _choose_column(columns, accent_column, fallback=fallback_accent_column)
+    text_col = _choose_column(columns, text_column, fallback="text")
+    path_col = _choose_column(columns, path_column, fallback="filename")
+    speaker_col = None
+    if max_per_speaker and sampling == "reservoir":
+        speaker_col = _choose_column(columns, speaker_column)
+        if not speaker_col:
+            print(f"⚠️  No speaker column '{speaker_column}' found; ignoring --max_per_speaker")
+    elif max_per_speaker:
+        print("⚠️  --max_per_speaker applies to --sampling reservoir only; ignoring it")
 
     if not accent_col:
         print("\n⚠️  No accent column found in metadata")
         print("   Tried:", accent_column, "and", fallback_accent_column)
-        print("   Available columns:", list(df.columns))
+        print("   Available columns:", columns)
         print("   This dataset may not have accent annotations.")
         return {}
 
     if not path_col:
         print("\n❌ No audio path column found in metadata")
         print("   Tried:", path_column, "and", "filename")
-        print("   Available columns:", list(df.columns))
+        print("   Available columns:", columns)
         return {}
 
+    # Shards from an earlier run would be transcribed instead of this run's clips,
+    # but leave them alone until the run is known to go ahead
+    remove_shards(output_path)
+
+    # Parse only the columns used below; accent labels repeat, so store
+    # them as categoricals. A chunked scan never holds the whole file.
+    reader = read_table(
+        metadata_file,
+        columns=[col for col in (accent_col, text_col, path_col, speaker_col) if col],
+        categorical=[accent_col],
+        chunksize=chunksize,
+        engine=engine,
+        sep=sep,
+    )
+    chunks = reader
+    if not chunksize:
+        df = reader
+        chunks = [df]
+        print(f"Total rows: {len(df)}")
+
     print(f"Using accent column: {accent_col}")
     print(f"Using text column: {text_col if text_col else 'N/A'}")
     print(f"Using path column: {path_col}")
 
     # Show accent distribution
-    print(f"\nAccent distribution in dataset:")
-    accent_counts_raw = df[accent_col].value_counts()
-    print(accent_counts_raw.head(20))
+    if chunksize and sampling == "reservoir":
+        print(f"\nScanning metadata in chunks of {chunksize} rows")
+    elif chunksize:
+        print(f"\nScanning metadata in chunks of {chunksize} rows (stops once every group is full)")
+    else:
+        print(f"\nAccent distribution in dataset:")
+        accent_counts_raw = df[accent_col].value_counts()
+        print(accent_counts_raw.head(20))
 
     if accent_tokens is None:
         accent_tokens = ["us", "india", "african", "england"]
@@ -201,97 +567,122 @@ def organize_cv_data(
     group_tokens = _build_group_tokens(accent_tokens)
 
     accent_counts = {group: 0 for group in group_tokens.keys()}
-    ground_truth_rows = []
 
     print(f"\n{'='*60}")
     print(f"Collecting {samples_per_accent} samples per accent group...")
     print(f"{'='*60}\n")
 
-    for idx, row in df.iterrows():
-        accent_value = str(row.get(accent_col, '')).lower().strip()
-
-        # Match accent to our target groups
-        matched_group = None
-        for group_name, tokens in group_tokens.items():
-            if any(tok in accent_value for tok in tokens):
-                matched_group = group_name
-                break
+    # One directory listing per candidate dir instead of a stat per path
+    index = _build_directory_index(cv_path, metadata_file)
+    unresolved = 0
 
-        if matched_group:
-            count = accent_counts.get(matched_group, 0)
-            if count < samples_per_accent:
+    scanned = 0
+    if sampling == "reservoir":
+        # The copy stage below then runs over the sample alone (in file order)
+        sampled, scanned, unresolved = _sample_reservoir(
+            chunks, group_tokens, {"accent": accent_col, "path": path_col, "speaker": speaker_col},
+            samples_per_accent, seed, max_per_speaker, cv_path, metadata_file, index,
+        )
+        chunks = [sampled]
+
+    # Only the first rows still needed per group go to the copy stage. Rows
+    # that fail (no path, unresolved, bad extension, copy error) are topped
+    # up from that group's next rows, so the result equals a first-N scan.
+    # Files are materialized under temporary names in a thread pool, then
+    # renamed in row order so numbering skips rows whose copy failed.
+    # Chunks are scanned in file order; the scan stops once all groups are full.
+    selected_rows = []
+    manifest_rows = []
+    verb = _MATERIALIZE_VERBS[materialize]
+
+    def run(job):
+        try:
+            return materializer(job[2], job[3])
+        except Exception as e:
+            return e
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    for chunk in chunks:
+        if sampling == "first":
+            scanned += len(chunk)
+        # Match accent to our target groups for all rows of the chunk at once
+        groups = _match_groups(chunk[accent_col], group_tokens)
+        remaining = chunk[groups.notna()].assign(_group=groups)
+        while len(remaining):
+            need = {g: samples_per_accent - c for g, c in accent_counts.items() if c < samples_per_accent}
+            remaining = remaining[remaining["_group"].isin(need)]
+            rank = remaining.groupby("_group").cumcount()
+            batch = remaining[rank < remaining["_group"].map(need)]
+            remaining = remaining[rank >= remaining["_group"].map(need)]
+
+            jobs = []
+            for idx, row in batch.iterrows():
                 # Find audio file
                 audio_filename = row.get(path_col, "")
                 if not audio_filename:
                     continue
-                audio_rel = Path(str(audio_filename))
-                # Treat metadata paths as untrusted input:
-                # do not allow absolute paths or parent traversal.
-                if audio_rel.is_absolute() or ".." in audio_rel.parts:
-                    audio_rel = Path(audio_rel.name)
-
-                # Try multiple possible locations
-                possible_paths = [
-                    cv_path / audio_rel,
-                    cv_path / 'clips' / audio_rel,
-                    cv_path / 'clips' / audio_rel.name,
-                    cv_path.parent / 'clips' / audio_rel.name,
-                    cv_path.parent / audio_rel,
-                ]
-
-                if metadata_file:
-                    metadata_dir = metadata_file.parent
-                    possible_paths.extend([
-                        metadata_dir / audio_rel,
-                        metadata_dir / audio_rel.name,
-                    ])
-
-                src_audio = None
-                for path in possible_paths:
-                    if path.exists():
-                        src_audio = path
-                        break
-
+                src_audio = _resolve_audio_path(audio_filename, cv_path, metadata_file, index)
                 if not src_audio:
+                    unresolved += 1
                     continue
 
                 if src_audio.suffix.lower() not in ALLOWED_AUDIO_EXTENSIONS:
                     continue
 
-                # Keep original extension (mp3/wav)
-                ext = src_audio.suffix.lower() or ".wav"
+                # Keep original extension (mp3/wav) unless transcoding to WAV
+                ext = ".wav" if materialize == "transcode" else src_audio.suffix.lower() or ".wav"
+                jobs.append((idx, row, src_audio, output_path / f".{idx}.part{ext}"))
+
+            for (idx, row, src_audio, tmp_audio), result in zip(jobs, pool.map(run, jobs)):
+                matched_group = row["_group"]
+                count = accent_counts[matched_group]
+                audio_filename = row.get(path_col, "")
                 safe_group = matched_group.lower().replace(" ", "_")
-                new_filename = f"{safe_group}_{count:03d}{ext}"
+                new_filename = f"{safe_group}_{count:03d}{tmp_audio.suffix}"
                 dst_audio = output_path / new_filename
 
-                # Copy file
                 try:
-                    shutil.copy(src_audio, dst_audio)
+                    if isinstance(result, Exception):
+                        raise result
+                    os.replace(tmp_audio, dst_audio)
+                    manifest_rows.append((idx, {"filename": new_filename, **result}))
 
                     # Store ground truth
-                    ground_truth_rows.append({
+                    selected_rows.append((idx, {
                         'filename': new_filename,
                         'accent_group': matched_group,
-                        'speaker_type': 'native' if matched_group in ['US', 'England', 'Australian', 'Canadian'] else 'ESL',
+                        'speaker_type': _speaker_type(matched_group),
                         'true_transcript': row.get(text_col, '') if text_col else '',
                         'true_intent': 'unknown',  # Will need to manually assign
-                        'duration': 0  # Will need to calculate or estimate
-                    })
+                        'duration': result.get('duration', 0),  # Known when transcoded
+                        **materializer.checksum(result),
+                    }))
 
                     accent_counts[matched_group] = count + 1
-                    print(f"✓ Copied: {new_filename} (original accent: {row.get(accent_col, 'N/A')})")
+                    print(f"✓ {verb}: {new_filename} (original accent: {row.get(accent_col, 'N/A')})")
 
                 except Exception as e:
+                    if tmp_audio.is_symlink() or tmp_audio.exists():
+                        tmp_audio.unlink()
                     print(f"✗ Error copying {audio_filename}: {e}")
                     continue
-
-        # Stop if we have enough samples for all groups
         if all(count >= samples_per_accent for count in accent_counts.values()):
-            print(f"\n✓ Collected enough samples for all accent groups!")
             break
+    pool.shutdown()
+    if chunksize:
+        reader.close()
+        print(f"\nScanned {scanned} metadata rows")
+
+    # Stop if we have enough samples for all groups
+    if all(count >= samples_per_accent for count in accent_counts.values()):
+        print(f"\n✓ Collected enough samples for all accent groups!")
+
+    # Ground truth rows in metadata order, as a first-N scan writes them
+    ground_truth_rows = [record for _, record in sorted(selected_rows, key=lambda item: item[0])]
 
     # Save ground truth template
     if ground_truth_rows:
+        records = [record for _, record in sorted(manifest_rows, key=lambda item: item[0])]
         gt_df = pd.DataFrame(ground_truth_rows)
         gt_path.parent.mkdir(parents=True, exist_ok=True)
         gt_df.to_csv(gt_path, index=False)
@@ -300,6 +691,9 @@ def organize_cv_data(
             template_path = Path('data/ground_truth_template.csv')
             if template_path.exists():
                 template_path.unlink()
+        if shard_size:
+            _pack_shards(output_path, ground_truth_rows, shard_size, records)
+        _write_manifest(records, output_path)
 
         print(f"\n{'='*60}")
         print(f"Data organization complete!")
@@ -308,6 +702,7 @@ def organize_cv_data(
         for accent, count in sorted(accent_counts.items()):
             print(f"  {accent:15s}: {count:3d} samples")
         print(f"\nTotal: {sum(accent_counts.values())} samples")
+        print(f"Unresolved audio paths: {unresolved}")
         print(f"Output directory: {output_dir}")
         print(f"\n{'='*60}")
         print(f"NEXT STEP: Assign intents to transcripts")
@@ -322,7 +717,7 @@ def organize_cv_data(
         print(f"4. Save as: data/ground_truth.csv")
         print(f"\nThen run the benchmark pipeline!")
     else:
-        print(f"\n❌ No samples collected. Check if:")
+        print(f"\n❌ No samples collected ({unresolved} audio paths unresolved). Check if:")
         print(f"   - Audio files exist in {cv_path}/clips/")
         print(f"   - Accent column has expected values")
         print(f"   - Metadata file has 'path' column")
@@ -406,6 +801,74 @@ def main():
         action='store_true',
         help='If set, copy audio files even when no metadata TSV is present'
     )
+    parser.add_argument(
+        '--materialize',
+        type=str,
+        default='copy',
+        choices=MATERIALIZE_METHODS,
+        help='How to place selected clips: copy, hardlink, symlink or reflink (falls back to copy '
+             'if unsupported), or transcode to 16 kHz mono WAV with ffmpeg (default: copy)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Parallel copies, links or ffmpeg transcodes (default: 8)'
+    )
+    parser.add_argument(
+        '--manifest_hash',
+        type=str,
+        default='sha256',
+        choices=['sha256', 'md5', 'none'],
+        help='Hash recorded in manifest.csv; none skips reading linked files (default: sha256)'
+    )
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=0,
+        help='Scan metadata in chunks of this many rows, stopping once every group is full '
+             '(default: 0 = load all rows)'
+    )
+    parser.add_argument(
+        '--engine',
+        type=str,
+        default='c',
+        choices=ENGINES,
+        help='CSV parser for a full metadata load; pyarrow/auto use pyarrow if installed (default: c)'
+    )
+    parser.add_argument(
+        '--sampling',
+        type=str,
+        default='first',
+        choices=SAMPLING_METHODS,
+        help='first: first matching rows per group; reservoir: seeded uniform random rows '
+             'from the whole file (default: first)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=42,
+        help='Random seed for reservoir sampling (default: 42)'
+    )
+    parser.add_argument(
+        '--max_per_speaker',
+        type=int,
+        default=0,
+        help='With --sampling reservoir, cap clips per speaker within a group (default: 0 = no cap)'
+    )
+    parser.add_argument(
+        '--speaker_column',
+        type=str,
+        default='client_id',
+        help='Column name for speaker ids used by --max_per_speaker (default: client_id)'
+    )
+    parser.add_argument(
+        '--shard_size',
+        type=int,
+        default=0,
+        help='Pack clips and ground-truth rows into tar shards of this many samples, '
+             'with an index.csv (default: 0 = one file per clip)'
+    )
 
     args = parser.parse_args()
 
@@ -423,6 +886,16 @@ def main():
         allow_no_metadata=args.allow_no_metadata,
         metadata_csv=args.metadata_csv or None,
         write_ground_truth=args.write_ground_truth,
+        materialize=args.materialize,
+        workers=args.workers,
+        manifest_hash=args.manifest_hash,
+        chunksize=args.chunksize,
+        engine=args.engine,
+        sampling=args.sampling,
+        seed=args.seed,
+        max_per_speaker=args.max_per_speaker,
+        speaker_column=args.speaker_column,
+        shard_size=args.shard_size,
     )
 
 
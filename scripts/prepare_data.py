@@ -7,7 +7,12 @@ Usage:
 """
 
 import argparse
+import csv
+import json
 import os
+import pickle
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Fix for macOS torch_shm_manager permission error
 # Must be set before importing datasets/torch
@@ -29,14 +34,30 @@ if platform.system() == 'Darwin':  # macOS only
     torch.Tensor.share_memory_ = share_memory_noop
     torch.Storage.share_memory_ = lambda self, *args, **kwargs: self
 
-from datasets import load_dataset
+from datasets import Audio, load_dataset
 from datasets.data_files import EmptyDatasetError
 import soundfile as sf
 from tqdm import tqdm
 try:
     from _python_version_check import ensure_python_3_12_12
+    from audio_transcode import SAMPLE_RATE, wav_info
+    from sample_shards import pack_samples, remove_shards
+    from stratified_sampling import StratifiedReservoir, priorities
 except ModuleNotFoundError:
     from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.audio_transcode import SAMPLE_RATE, wav_info
+    from scripts.sample_shards import pack_samples, remove_shards
+    from scripts.stratified_sampling import StratifiedReservoir, priorities
+
+
+# Speaker id fields, in order of preference (Common Voice, GLOBE)
+SPEAKER_FIELDS = ("client_id", "speaker_id")
+
+# Curation checkpoints, kept in the output directory
+STATE_FILE = "curation_state.json"
+RESERVOIR_FILE = "curation_reservoir.pkl"
+STATE_VERSION = 1
+CHECKPOINT_EVERY = 500  # stream items between checkpoints
 
 
 def _normalize(s):
@@ -53,6 +74,127 @@ def _accent_match(accent_value, target_tokens):
     return False
 
 
+def _speaker_id(item):
+    for field in SPEAKER_FIELDS:
+        if item.get(field) is not None:
+            return item[field]
+    return None
+
+
+class _SampleWriter:
+    """
+    Decode matching items and write them as WAV in a thread pool
+
+    Items arrive with their audio still encoded; only the ones submitted
+    here are decoded. Each is written under a temporary name, then renamed
+    to {token}_{NNN}.wav in submission (stream) order, so numbering matches
+    a sequential run and skips items that failed to decode or write.
+    """
+
+    def __init__(self, output_dir, accent_counts, decoder, workers=8):
+        self.output_dir = output_dir
+        self.accent_counts = accent_counts
+        self.decoder = decoder
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.backlog = 4 * workers
+        self.pending = deque()
+        self.in_flight = Counter()
+        self.manifest_rows = []
+
+    def _write(self, tmp_path, item):
+        audio = self.decoder.decode_example(item["audio"])
+        sf.write(tmp_path, audio["array"], audio["sampling_rate"], subtype="PCM_16")
+        return wav_info(tmp_path)
+
+    def committed(self, token):
+        """Samples written or being written for a token."""
+        return self.accent_counts[token] + self.in_flight[token]
+
+    def submit(self, idx, item, token, accent_value):
+        tmp_path = os.path.join(self.output_dir, f".{idx}.part.wav")
+        self.in_flight[token] += 1
+        self.pending.append((token, accent_value, tmp_path, self.pool.submit(self._write, tmp_path, item)))
+        self.drain()
+
+    def _commit(self, token, accent_value, tmp_path, future):
+        self.in_flight[token] -= 1
+        filename = f"{token}_{self.accent_counts[token]:03d}.wav"
+        filepath = os.path.join(self.output_dir, filename)
+        try:
+            duration, digest = future.result()
+            os.replace(tmp_path, filepath)
+            self.manifest_rows.append({
+                "filename": filename, "accent": accent_value, "duration": duration, "sha256": digest,
+            })
+
+            self.accent_counts[token] += 1
+            print(f"  Saved: {filename} (accent: {accent_value})")
+
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"  Error saving {filename}: {e}")
+
+    def drain(self, wait=False):
+        """Commit finished writes in order; all of them if ``wait``."""
+        while self.pending and (wait or self.pending[0][3].done() or len(self.pending) > self.backlog):
+            self._commit(*self.pending.popleft())
+
+    def close(self):
+        self.drain(wait=True)
+        self.pool.shutdown()
+
+
+def _load_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("version") != STATE_VERSION:
+        raise SystemExit(f"❌ Unsupported curation state version in {path}: {state.get('version')}")
+    return state
+
+
+def _save_state(output_dir, state, reservoir=None):
+    """Write the state file (and reservoir) atomically."""
+    if reservoir is not None:
+        tmp = os.path.join(output_dir, RESERVOIR_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(reservoir, f)
+        os.replace(tmp, os.path.join(output_dir, RESERVOIR_FILE))
+    tmp = os.path.join(output_dir, STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, os.path.join(output_dir, STATE_FILE))
+
+
+def _resume_counts(output_dir, recorded):
+    """
+    Per-token sample counts to continue from, checked against the files on disk
+
+    A token's count is its recorded count, cut short at the first missing
+    {token}_{NNN}.wav. Files written after the last checkpoint are beyond
+    the recorded count and are overwritten as the stream is re-read.
+
+    Args:
+        output_dir (str): Curation output directory
+        recorded (dict): Token -> count saved in the state file
+
+    Returns:
+        dict: Token -> count
+    """
+    counts = {}
+    for token, count in recorded.items():
+        n = 0
+        while n < count and os.path.exists(os.path.join(output_dir, f"{token}_{n:03d}.wav")):
+            n += 1
+        if n < count:
+            print(f"⚠️  {token}: {count - n} recorded file(s) missing from {n:03d} on; refilling from the stream")
+        counts[token] = n
+    return counts
+
+
 def curate_samples(
     target_per_group=20,
     output_dir="data/audio",
@@ -61,6 +203,15 @@ def curate_samples(
     config_name=None,
     split="train",
     hf_token=None,
+    sampling="first",
+    seed=42,
+    max_per_speaker=0,
+    transcode=False,
+    workers=8,
+    max_scan=10000,
+    resume=False,
+    shard_size=0,
+    overwrite=False,
 ):
     """
     Curate audio samples from Mozilla Common Voice using streaming API
@@ -70,6 +221,22 @@ def curate_samples(
         target_per_group (int): Number of samples per accent group
         output_dir (str): Directory to save audio files
         target_accents (list): List of target accents to collect
+        sampling (str): "first" matching items per group, or a seeded
+            uniform "reservoir" sample over the scanned items
+        seed (int): Seed for reservoir sampling
+        max_per_speaker (int): Reservoir sampling: cap on clips per speaker
+            within a group (0 = no cap)
+        transcode (bool): Resample to 16 kHz mono 16-bit WAV as items are
+            decoded, so Whisper can load the files without ffmpeg
+        workers (int): Threads decoding and writing matching items
+        max_scan (int): Stop after this many stream items, counted across
+            resumed runs (0 = no limit)
+        resume (bool): Continue from the checkpoint in ``output_dir``
+        shard_size (int): Once curation is complete, pack the samples and
+            their manifest rows into tar shards of this many samples, with an
+            index.csv (0 = loose files)
+        overwrite (bool): Start over in an ``output_dir`` that holds an
+            earlier run's checkpoint (otherwise that is an error)
 
     Returns:
         dict: Counts of samples collected per accent
@@ -87,6 +254,28 @@ def curate_samples(
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
 
+    # A resumed run must read the same stream and select the same way.
+    run = {
+        "dataset": dataset_name, "config": config_name, "split": split, "accents": list(target_accents),
+        "sampling": sampling, "seed": seed, "max_per_speaker": max_per_speaker, "transcode": transcode,
+    }
+
+    # Refuse before deleting anything: after packing, the shards are the only copy of the samples.
+    state = _load_state(output_dir)
+    if state and not resume and not overwrite:
+        raise SystemExit(
+            f"❌ {output_dir} holds an earlier curation run ({STATE_FILE}). "
+            "Use --resume to continue it or --overwrite to start over."
+        )
+    if resume and state:
+        if state.get("shards"):
+            raise SystemExit(f"❌ Cannot resume: {output_dir} has already been packed into shards")
+        changed = sorted(key for key in run if state["run"].get(key) != run[key])
+        if changed:
+            raise SystemExit(f"❌ Cannot resume: settings changed since the saved run ({', '.join(changed)})")
+    # Shards from an earlier run would be transcribed instead of this run's samples
+    remove_shards(output_dir)
+
     # Load dataset in streaming mode
     print("\nLoading dataset (streaming mode)...")
     try:
@@ -114,44 +303,107 @@ def curate_samples(
         print("   If you see auth or rate-limit errors, set HF_TOKEN in your environment.")
         raise e
 
+    # Filter on metadata alone: audio stays encoded until an item is kept.
+    ds = ds.cast_column("audio", Audio(decode=False))
+    if transcode:
+        # The datasets library resamples (and downmixes) while decoding
+        decoder = Audio(sampling_rate=SAMPLE_RATE)
+        print(f"Transcoding to {SAMPLE_RATE} Hz mono 16-bit WAV")
+    else:
+        decoder = Audio()
+
     target_tokens = [_normalize(a) for a in target_accents]
     accent_counts = {accent: 0 for accent in target_accents}
     total_processed = 0
+    writer = _SampleWriter(output_dir, accent_counts, decoder, workers)
+
+    # Reservoir sampling keeps a seeded uniform sample of every matching
+    # item scanned, so it reads up to the scan limit instead of stopping early.
+    reservoir = None
+    if sampling == "reservoir":
+        reservoir = StratifiedReservoir(target_per_group, seed, max_per_speaker)
+        print(f"Reservoir sampling (seed {seed}); scanning up to the item limit")
+    elif max_per_speaker:
+        print("⚠️  --max_per_speaker applies to --sampling reservoir only; ignoring it")
+
+    if resume and state:
+        total_processed = state["position"]
+        if reservoir is not None:
+            # Reservoir samples are only written at the end, so all of them are rewritten
+            with open(os.path.join(output_dir, RESERVOIR_FILE), "rb") as f:
+                reservoir = pickle.load(f)
+        else:
+            accent_counts.update(_resume_counts(output_dir, state["counts"]))
+            names = {f"{token}_{n:03d}.wav" for token, count in accent_counts.items() for n in range(count)}
+            writer.manifest_rows = [row for row in state["files"] if row["filename"] in names]
+        ds = ds.skip(total_processed)
+        print(f"Resuming at stream item {total_processed} with {sum(accent_counts.values())} samples")
+    elif resume:
+        print(f"⚠️  No {STATE_FILE} in {output_dir}; starting from the beginning")
+    elif state:
+        print(f"⚠️  Overwriting the earlier curation run in {output_dir}")
+
+    def checkpoint(complete=False, shards=0):
+        # Only committed files are recorded, so finish in-flight writes first.
+        writer.drain(wait=True)
+        _save_state(output_dir, {
+            "version": STATE_VERSION,
+            "run": run,
+            "position": total_processed,
+            "counts": accent_counts,
+            "files": writer.manifest_rows,
+            "complete": complete,
+            "shards": shards,
+        }, reservoir)
 
     print(f"\nProcessing samples...")
-    for idx, item in tqdm(enumerate(ds), desc="Curating"):
+    for idx, item in tqdm(enumerate(ds, start=total_processed), desc="Curating"):
         accent_value = item.get("accent", "other")
         if _accent_match(accent_value, target_tokens):
             # bucket by first matching token to keep counts consistent
             matched_token = next(t for t in target_tokens if t in _normalize(accent_value))
-            count = accent_counts[matched_token]
-            if count < target_per_group:
-                # Save audio file
-                filename = f"{matched_token}_{count:03d}.wav"
-                filepath = os.path.join(output_dir, filename)
-
-                try:
-                    audio_array = item["audio"]["array"]
-                    sampling_rate = item["audio"]["sampling_rate"]
-                    sf.write(filepath, audio_array, sampling_rate)
-
-                    accent_counts[matched_token] += 1
-                    print(f"  Saved: {filename} (accent: {accent_value})")
-
-                except Exception as e:
-                    print(f"  Error saving {filename}: {e}")
+            if reservoir is not None:
+                reservoir.offer(matched_token, priorities([idx], seed)[0], (idx, item), _speaker_id(item))
+            else:
+                if writer.committed(matched_token) >= target_per_group and writer.in_flight[matched_token]:
+                    # Settle pending writes first: a failed one frees a slot for this item
+                    writer.drain(wait=True)
+                if writer.committed(matched_token) < target_per_group:
+                    writer.submit(idx, item, matched_token, accent_value)
 
         total_processed += 1
+        if total_processed % CHECKPOINT_EVERY == 0:
+            checkpoint()
 
-        # Stop if we've collected enough samples
-        if all(count >= target_per_group for count in accent_counts.values()):
-            break
+        # Stop if we've collected enough samples (a failed write reopens a slot)
+        if reservoir is None and all(writer.committed(token) >= target_per_group for token in accent_counts):
+            writer.drain(wait=True)
+            if all(count >= target_per_group for count in accent_counts.values()):
+                break
 
-        # Safety limit to avoid infinite loop
-        if total_processed > 10000:
+        # Scan budget (also guards against an endless stream)
+        if max_scan and total_processed > max_scan:
             print(f"\nProcessed {total_processed} items. Stopping.")
             break
 
+    if reservoir is not None:
+        # Write the sample in stream order, as a first-N scan would
+        sampled = sorted(
+            (entry for token in target_tokens for entry in reservoir.items(token)), key=lambda entry: entry[0]
+        )
+        for idx, item in sampled:
+            accent_value = item.get("accent", "other")
+            writer.submit(idx, item, next(t for t in target_tokens if t in _normalize(accent_value)), accent_value)
+    writer.close()
+    manifest_rows = writer.manifest_rows
+    shards = 0
+    if shard_size and manifest_rows:
+        shard_of = pack_samples(output_dir, manifest_rows, shard_size)
+        for row in manifest_rows:
+            row["shard"] = shard_of[row["filename"]]
+        shards = len(set(shard_of.values()))
+    checkpoint(complete=True, shards=shards)
+
     print(f"\n{'='*60}")
     print(f"Data curation complete!")
     print(f"{'='*60}")
@@ -161,6 +413,17 @@ def curate_samples(
     print(f"\nTotal: {sum(accent_counts.values())} samples")
     print(f"Output directory: {output_dir}")
 
+    if manifest_rows:
+        manifest_path = os.path.join(output_dir, "manifest.csv")
+        with open(manifest_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(manifest_rows[0]))
+            writer.writeheader()
+            writer.writerows(manifest_rows)
+        print(f"Manifest (durations, checksums): {manifest_path}")
+    if shards:
+        print(f"Packed into {shards} shard(s) of up to {shard_size} samples: "
+              f"{os.path.join(output_dir, 'index.csv')}")
+
     return accent_counts
 
 
@@ -211,6 +474,60 @@ def main():
         default=os.environ.get("HF_TOKEN", ""),
         help="Hugging Face token (optional). You can also set HF_TOKEN env var."
     )
+    parser.add_argument(
+        "--sampling",
+        type=str,
+        default="first",
+        choices=["first", "reservoir"],
+        help="first: first matching items per group; reservoir: seeded uniform random items "
+             "from everything scanned (default: first)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed for reservoir sampling (default: 42)"
+    )
+    parser.add_argument(
+        "--max_per_speaker",
+        type=int,
+        default=0,
+        help="With --sampling reservoir, cap clips per speaker within a group (default: 0 = no cap)"
+    )
+    parser.add_argument(
+        "--transcode",
+        action="store_true",
+        help="Write 16 kHz mono 16-bit WAV (Whisper's input format) instead of the dataset's sample rate"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Threads decoding and writing matching items (default: 8)"
+    )
+    parser.add_argument(
+        "--max_scan",
+        type=int,
+        default=10000,
+        help="Stop after scanning this many stream items, across resumed runs (default: 10000, 0 = no limit)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Continue an interrupted run from {STATE_FILE} in the output directory"
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help=f"Start over even if the output directory holds an earlier run's {STATE_FILE}"
+    )
+    parser.add_argument(
+        "--shard_size",
+        type=int,
+        default=0,
+        help="Pack samples and their manifest rows into tar shards of this many samples, "
+             "with an index.csv (default: 0 = one file per sample)"
+    )
 
     args = parser.parse_args()
 
@@ -223,6 +540,15 @@ def main():
         config_name=args.config or None,
         split=args.split,
         hf_token=args.hf_token or None,
+        sampling=args.sampling,
+        seed=args.seed,
+        max_per_speaker=args.max_per_speaker,
+        transcode=args.transcode,
+        workers=args.workers,
+        max_scan=args.max_scan,
+        resume=args.resume,
+        shard_size=args.shard_size,
+        overwrite=args.overwrite,
     )
 
 
@@ -7,6 +7,8 @@ Usage:
 """
 
 import argparse
+import io
+import tempfile
 import time
 from pathlib import Path
 import pandas as pd
@@ -14,18 +16,104 @@ import whisper
 from tqdm import tqdm
 try:
     from _python_version_check import ensure_python_3_12_12
+    from audio_transcode import load_wav
+    from sample_shards import INDEX_FILE, find_shards, iter_samples
 except ModuleNotFoundError:
     from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.audio_transcode import load_wav
+    from scripts.sample_shards import INDEX_FILE, find_shards, iter_samples
 
 
-def transcribe_all(audio_dir, model_size="tiny", output_csv="results/transcripts.csv"):
+def transcribe_file(model, audio_file, model_size, data=None):
+    """
+    Transcribe one audio file into a transcripts.csv row
+
+    16 kHz mono WAVs (e.g. from ``organize_mozilla_cv.py --materialize
+    transcode``) are read directly; anything else is decoded by Whisper
+    through ffmpeg.
+
+    Args:
+        model: Loaded Whisper model
+        audio_file (Path): Audio file to transcribe (for shard samples, the
+            member name)
+        model_size (str): Whisper model size, recorded in the ``model`` column
+        data (bytes): Audio bytes read from a shard instead of ``audio_file``
+
+    Returns:
+        dict: Row with filename, model, transcribed_text, language, transcription_time
+    """
+    start = time.time()
+
+    try:
+        # Transcribe
+        audio = load_wav(audio_file if data is None else io.BytesIO(data))
+        if audio is not None:
+            result = model.transcribe(audio)
+        elif data is None:
+            result = model.transcribe(str(audio_file))
+        else:
+            # Whisper's ffmpeg decoder reads from a file
+            with tempfile.NamedTemporaryFile(suffix=audio_file.suffix) as tmp:
+                tmp.write(data)
+                tmp.flush()
+                result = model.transcribe(tmp.name)
+
+        transcription_time = time.time() - start
+
+        row = {
+            "filename": audio_file.name,
+            "model": f"whisper-{model_size}",
+            "transcribed_text": result["text"].strip(),
+            "language": result.get("language", "en"),
+            "transcription_time": round(transcription_time, 2)
+        }
+
+        print(f"  ✓ {audio_file.name}: {transcription_time:.2f}s")
+
+    except Exception as e:
+        print(f"  ❌ Error transcribing {audio_file.name}: {e}")
+        row = {
+            "filename": audio_file.name,
+            "model": f"whisper-{model_size}",
+            "transcribed_text": "",
+            "language": "",
+            "transcription_time": 0
+        }
+
+    return row
+
+
+def _shard_samples(shards):
+    """(Path(name), bytes) per sample, streamed from the shards in order."""
+    for filename, data, _ in iter_samples(shards):
+        yield Path(filename), data
+
+
+def _count_samples(audio_path, shards):
+    """Samples in the given shards according to index.csv, or None."""
+    index_path = audio_path / INDEX_FILE
+    if not index_path.exists():
+        return None
+    names = {shard.name for shard in shards}
+    return int(pd.read_csv(index_path, usecols=["shard"])["shard"].isin(names).sum())
+
+
+def transcribe_all(audio_dir, model_size="tiny", output_csv="results/transcripts.csv",
+                   worker_index=0, num_workers=1):
     """
     Transcribe all audio files in a directory using Whisper
 
+    If the directory holds tar shards (``--shard_size`` in prepare_data.py or
+    organize_mozilla_cv.py), samples are streamed from the shards in order
+    instead. Shards can be split across workers, each taking every
+    ``num_workers``-th shard starting at ``worker_index``.
+
     Args:
-        audio_dir (str): Directory containing audio files
+        audio_dir (str): Directory containing audio files or shards
         model_size (str): Whisper model size ('tiny', 'base', 'small', 'medium', 'large')
         output_csv (str): Output CSV file path
+        worker_index (int): This worker's share of the shards
+        num_workers (int): Number of workers the shards are split across
 
     Returns:
         pd.DataFrame: DataFrame with transcription results
@@ -43,49 +131,39 @@ def transcribe_all(audio_dir, model_size="tiny", output_csv="results/transcripts
     model = whisper.load_model(model_size)
     print(f"Model loaded in {time.time() - start_load:.2f}s")
 
-    # Get all audio files
+    # Get all audio files, or the shards holding them
     audio_path = Path(audio_dir)
-    audio_files = list(audio_path.glob("*.wav")) + \
-                  list(audio_path.glob("*.mp3")) + \
-                  list(audio_path.glob("*.flac"))
-
-    if not audio_files:
+    shards = find_shards(audio_path)
+    loose = [path for pattern in ("*.wav", "*.mp3", "*.flac") for path in audio_path.glob(pattern)]
+    if shards and loose:
+        print(f"\n❌ {audio_dir} has both shards ({len(shards)}) and loose audio files ({len(loose)}); "
+              f"one of them is left over from an earlier run. Remove it and rerun.")
+        return None
+    if shards:
+        shards = shards[worker_index::num_workers]
+        total = _count_samples(audio_path, shards) if shards else 0
+        samples = _shard_samples(shards)
+        print(f"\nStreaming {total if total is not None else 'all'} samples from {len(shards)} shard(s)"
+              + (f" (worker {worker_index} of {num_workers})" if num_workers > 1 else ""))
+    else:
+        audio_files = loose
+        total = len(audio_files)
+        samples = ((audio_file, None) for audio_file in audio_files)
+        if audio_files:
+            print(f"\nFound {len(audio_files)} audio files to transcribe")
+
+    if total == 0:
         print(f"\n❌ No audio files found in {audio_dir}")
         return None
 
-    print(f"\nFound {len(audio_files)} audio files to transcribe")
-
     # Transcribe each file
     results = []
     total_time = 0
 
-    for audio_file in tqdm(audio_files, desc="Transcribing"):
-        start = time.time()
-
-        try:
-            # Transcribe
-            result = model.transcribe(str(audio_file))
-
-            transcription_time = time.time() - start
-            total_time += transcription_time
-
-            results.append({
-                "filename": audio_file.name,
-                "transcribed_text": result["text"].strip(),
-                "language": result.get("language", "en"),
-                "transcription_time": round(transcription_time, 2)
-            })
-
-            print(f"  ✓ {audio_file.name}: {transcription_time:.2f}s")
-
-        except Exception as e:
-            print(f"  ❌ Error transcribing {audio_file.name}: {e}")
-            results.append({
-                "filename": audio_file.name,
-                "transcribed_text": "",
-                "language": "",
-                "transcription_time": 0
-            })
+    for audio_file, data in tqdm(samples, total=total, desc="Transcribing"):
+        row = transcribe_file(model, audio_file, model_size, data)
+        total_time += row["transcription_time"]
+        results.append(row)
 
     # Create DataFrame and save
     df = pd.DataFrame(results)
@@ -131,6 +209,18 @@ def main():
         default="results/transcripts.csv",
         help="Output CSV file (default: results/transcripts.csv)"
     )
+    parser.add_argument(
+        "--worker_index",
+        type=int,
+        default=0,
+        help="With shards in --input, transcribe every --num_workers-th shard starting here (default: 0)"
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="Number of workers the shards are split across; give each its own --output (default: 1)"
+    )
 
     args = parser.parse_args()
 
@@ -138,7 +228,9 @@ def main():
     transcribe_all(
         audio_dir=args.input,
         model_size=args.model,
-        output_csv=args.output
+        output_csv=args.output,
+        worker_index=args.worker_index,
+        num_workers=args.num_workers,
     )
 
 
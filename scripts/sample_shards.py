@@ -0,0 +1,188 @@
+"""
+Tar shards of audio samples (WebDataset layout)
+
+Thousands of small clips strain filesystem metadata and make globbing and
+copying slow. A shard packs consecutive samples into one tar file: each
+sample is its audio member ("us_000.wav") followed by its ground-truth row
+("us_000.json"), grouped by the shared file stem as in WebDataset. Shards
+are read front to back, so they stream well from disks, object stores or
+pipes, and whole shards can be handed to different workers.
+
+index.csv next to the shards lists every sample with its shard and the
+byte offset and size of the audio member, for random access.
+
+The curation scripts write loose files first (so failed samples can be
+topped up and interrupted runs resumed) and pack them with pack_samples
+once the selection is final.
+"""
+
+import csv
+import io
+import json
+import tarfile
+from pathlib import Path
+
+
+SHARD_PATTERN = "shard-{:06d}.tar"
+INDEX_FILE = "index.csv"
+
+
+class ShardWriter:
+    """
+    Write samples into sequential tar shards of ``shard_size`` samples
+
+    Shards left in ``output_dir`` by an earlier run are removed first.
+    Samples are keyed by file stem, so two samples may not share one
+    (e.g. "us_000.mp3" and "us_000.wav").
+
+    Args:
+        output_dir (str or Path): Directory for shard-NNNNNN.tar and index.csv
+        shard_size (int): Samples per shard
+    """
+
+    def __init__(self, output_dir, shard_size=1000):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        remove_shards(self.output_dir)
+        self.shard_size = shard_size
+        self.index_rows = []
+        self._stems = set()
+        self._tar = None
+        self._shard = -1
+        self._in_shard = 0
+
+    def _add_member(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        self._tar.addfile(info, io.BytesIO(data))
+        # Data ends the archive so far, padded to whole tar blocks
+        blocks = -(-info.size // tarfile.BLOCKSIZE)
+        info.offset_data = self._tar.offset - blocks * tarfile.BLOCKSIZE
+        return info
+
+    def add(self, filename, audio, row=None):
+        """
+        Append one sample
+
+        Args:
+            filename (str): Sample file name (member name of the audio)
+            audio (bytes or Path): Audio bytes, or a file to read them from
+            row (dict): Ground-truth row stored as <stem>.json
+
+        Returns:
+            str: Name of the shard the sample went into
+        """
+        stem = Path(filename).stem
+        if stem in self._stems:
+            raise ValueError(f"Duplicate sample key '{stem}' ({filename}); shard samples need unique file stems")
+        self._stems.add(stem)
+        if self._tar is None or self._in_shard >= self.shard_size:
+            self._next_shard()
+        data = audio if isinstance(audio, bytes) else Path(audio).read_bytes()
+        info = self._add_member(filename, data)
+        self._add_member(f"{stem}.json", json.dumps(row or {"filename": filename}, default=str).encode())
+        self._in_shard += 1
+        shard_name = SHARD_PATTERN.format(self._shard)
+        self.index_rows.append({
+            "shard": shard_name, "filename": filename, "offset": info.offset_data, "size": info.size,
+        })
+        return shard_name
+
+    def _next_shard(self):
+        if self._tar is not None:
+            self._tar.close()
+        self._shard += 1
+        self._in_shard = 0
+        self._tar = tarfile.open(self.output_dir / SHARD_PATTERN.format(self._shard), "w")
+
+    def close(self):
+        """Finish the last shard and write index.csv."""
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        with open(self.output_dir / INDEX_FILE, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["shard", "filename", "offset", "size"])
+            writer.writeheader()
+            writer.writerows(self.index_rows)
+        return self._shard + 1
+
+
+def pack_samples(directory, rows, shard_size=1000):
+    """
+    Move loose sample files into shards, in the order of ``rows``
+
+    The loose files are deleted only after every shard has been written.
+    Raises ValueError before writing anything if two files share a stem.
+
+    Args:
+        directory (str or Path): Directory with the files; shards go here too
+        rows (list): Ground-truth rows, each with the sample's "filename"
+        shard_size (int): Samples per shard
+
+    Returns:
+        dict: Sample filename -> name of the shard it went into
+    """
+    directory = Path(directory)
+    stems = {}
+    for row in rows:
+        other = stems.setdefault(Path(row["filename"]).stem, row["filename"])
+        if other != row["filename"]:
+            raise ValueError(f"Samples {other} and {row['filename']} share a file stem; shards key samples by stem")
+    writer = ShardWriter(directory, shard_size)
+    shards = {row["filename"]: writer.add(row["filename"], directory / row["filename"], row) for row in rows}
+    writer.close()
+    for row in rows:
+        (directory / row["filename"]).unlink()
+    return shards
+
+
+def remove_shards(directory):
+    """Delete shards and index.csv left in a directory by an earlier run."""
+    directory = Path(directory)
+    for old in find_shards(directory):
+        old.unlink()
+    (directory / INDEX_FILE).unlink(missing_ok=True)
+
+
+def find_shards(path):
+    """Sorted shard files in a directory (or a single shard path)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    if path.is_file():
+        return [path]
+    return sorted(path.glob("shard-*.tar"))
+
+
+def iter_samples(shard_paths):
+    """
+    Stream samples from shards in order, reading each tar front to back
+
+    Args:
+        shard_paths (list): Shard files
+
+    Yields:
+        tuple: (filename, audio bytes, ground-truth row dict)
+    """
+    for shard_path in shard_paths:
+        key, sample = None, {}
+        with tarfile.open(shard_path, "r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                stem, _, ext = member.name.rpartition(".")
+                if stem != key and sample:
+                    yield _finish(sample)
+                    sample = {}
+                key = stem
+                data = tar.extractfile(member).read()
+                if ext == "json":
+                    sample["row"] = json.loads(data)
+                else:
+                    sample["filename"], sample["audio"] = member.name, data
+        if sample:
+            yield _finish(sample)
+
+
+def _finish(sample):
+    return sample.get("filename"), sample.get("audio"), sample.get("row", {})
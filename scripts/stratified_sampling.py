@@ -0,0 +1,169 @@
+"""
+Seeded stratified reservoir sampling
+
+Taking the first N matching rows per group favours whatever sits at the
+start of the metadata (often a handful of prolific speakers).
+StratifiedReservoir instead keeps, per group, the N rows with the smallest
+seeded hash priority: a uniform random sample without replacement, built
+in one pass with O(N) memory per group.
+
+An optional per-speaker cap keeps any single speaker from dominating a
+group. The sample is then the first N rows in priority order that don't
+exceed the cap, as if the whole file had been shuffled and scanned.
+
+Priorities hash a stable row id (e.g. the clip path), so the sample depends
+only on the seed and the set of rows, not on row order or chunk size.
+"""
+
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+
+def priorities(ids, seed=42):
+    """
+    Seeded uint64 priority per row id (vectorized)
+
+    Args:
+        ids (iterable): Stable row ids (paths, stream positions, ...)
+        seed (int): Sampling seed
+
+    Returns:
+        np.ndarray: uint64 priorities aligned to ``ids``
+    """
+    values = pd.Series(np.asarray(ids, dtype=object)).astype(str)
+    return pd.util.hash_pandas_object(values, index=False, hash_key=f"{seed:016d}"[-16:]).to_numpy()
+
+
+class StratifiedReservoir:
+    """
+    Uniform random sample of up to ``k`` items per group, one pass
+
+    Items are offered with a priority (see ``priorities``); each group keeps
+    the ``k`` lowest-priority items, at most ``max_per_speaker`` from any one
+    speaker. Groups are compacted lazily, so an offer is amortized O(log k).
+    """
+
+    def __init__(self, k, seed=42, max_per_speaker=None):
+        self.k = k
+        self.seed = seed
+        self.max_per_speaker = max_per_speaker or None
+        self.seen = Counter()
+        self._rows = {}
+        self._threshold = {}
+        self._seq = 0
+
+    def _compact(self, group):
+        rows = sorted(self._rows[group], key=lambda row: (row[0], row[1]))
+        kept = []
+        per_speaker = Counter()
+        for row in rows:
+            if len(kept) == self.k:
+                break
+            if self.max_per_speaker:
+                if per_speaker[row[2]] >= self.max_per_speaker:
+                    continue
+                per_speaker[row[2]] += 1
+            kept.append(row)
+        self._rows[group] = kept
+        # Once a group is full, nothing above its k-th priority can get in.
+        if len(kept) == self.k:
+            self._threshold[group] = kept[-1][0]
+
+    def offer(self, group, priority, item, speaker=None):
+        """
+        Offer one item to a group's reservoir
+
+        Args:
+            group (str): Stratum (accent group)
+            priority (int): Seeded priority of the item
+            item: Payload returned by ``items``
+            speaker (str): Speaker id for the per-speaker cap
+
+        Returns:
+            bool: False if the item was rejected outright
+        """
+        self.seen[group] += 1
+        return self._add(group, priority, item, speaker)
+
+    def _add(self, group, priority, item, speaker):
+        if self.k <= 0 or priority > self._threshold.get(group, priority):
+            return False
+        rows = self._rows.setdefault(group, [])
+        rows.append((int(priority), self._seq, speaker, item))
+        self._seq += 1
+        if len(rows) > max(2 * self.k, 64):
+            self._compact(group)
+        return True
+
+    def offer_frame(self, frame, group_col, id_col, speaker_col=None, accept=None):
+        """
+        Offer the rows of a DataFrame chunk (rows with no group are skipped)
+
+        Rows are visited in priority order and, per group, only until the
+        chunk could no longer contribute, so ``accept`` (e.g. "does the audio
+        file exist") runs on a few rows per group rather than every row.
+        Items are the row Series.
+
+        Args:
+            frame (pd.DataFrame): Metadata chunk
+            group_col (str): Column with the group (NaN = not sampled)
+            id_col (str): Column with a stable row id for the priority
+            speaker_col (str): Column with the speaker id (optional)
+            accept (callable): Row -> bool; rejected rows are never offered
+
+        Returns:
+            int: Rows offered
+        """
+        frame = frame[frame[group_col].notna()]
+        keys = priorities(frame[id_col], self.seed)
+        groups = frame[group_col].to_numpy()
+        self.seen.update(groups)
+        speakers = frame[speaker_col].to_numpy() if speaker_col else np.full(len(frame), None)
+        open_groups = set(groups)
+        taken = Counter()
+        per_speaker = Counter()
+        offered = 0
+        for pos in np.argsort(keys, kind="stable"):
+            if not open_groups:
+                break
+            group, speaker, key = groups[pos], speakers[pos], int(keys[pos])
+            if group not in open_groups:
+                continue
+            if taken[group] >= self.k or key > self._threshold.get(group, key):
+                open_groups.discard(group)
+                continue
+            if self.max_per_speaker and per_speaker[group, speaker] >= self.max_per_speaker:
+                continue
+            row = frame.iloc[pos]
+            if accept is not None and not accept(row):
+                continue
+            self._add(group, key, row, speaker)
+            taken[group] += 1
+            per_speaker[group, speaker] += 1
+            offered += 1
+        return offered
+
+    def items(self, group=None):
+        """
+        Sampled items in priority order
+
+        Args:
+            group (str): One group, or None for all groups
+
+        Returns:
+            list: Items of ``group``, or dict of group -> items
+        """
+        if group is not None:
+            if group not in self._rows:
+                return []
+            self._compact(group)
+            return [row[3] for row in self._rows[group]]
+        return {name: self.items(name) for name in self._rows}
+
+    def speakers(self, group):
+        """Number of distinct speakers in a group's sample."""
+        if group not in self._rows:
+            return 0
+        self._compact(group)
+        return len({row[2] for row in self._rows[group]})
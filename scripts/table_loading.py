@@ -0,0 +1,109 @@
+"""
+Column-pruned, typed CSV/TSV loading
+
+Common Voice's validated.tsv has around a dozen columns and can run to
+millions of rows, while organizing a benchmark needs only the accent,
+sentence and path columns. read_table parses just the requested columns,
+stores repetitive labels (accents, groups) as categoricals, and can either
+hand the file to pyarrow's multithreaded parser or stream fixed-size chunks
+so callers can stop reading once they have what they need.
+
+The same loader reads the pipeline's own results CSVs (transcripts,
+ground truth, intents) in classify_intent.py and calculate_metrics.py.
+"""
+
+from pathlib import Path
+import pandas as pd
+
+
+ENGINES = ["c", "pyarrow", "auto"]
+
+
+def table_separator(path):
+    """Tab for .tsv files, comma otherwise."""
+    return '\t' if Path(path).suffix.lower() in ['.tsv'] else ','
+
+
+def read_header(path, sep=None):
+    """
+    Column names of a CSV/TSV without reading any rows
+
+    Args:
+        path (str or Path): CSV/TSV file
+        sep (str): Field separator (default: from the file extension)
+
+    Returns:
+        list: Column names in file order
+    """
+    return list(pd.read_csv(path, sep=sep or table_separator(path), nrows=0).columns)
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_engine(engine="c", chunksize=None):
+    """
+    Parser engine pandas should use for a read
+
+    pyarrow cannot stream chunks, so chunked reads always use the C parser.
+    "auto" picks pyarrow when it is installed; an explicit "pyarrow" falls
+    back to the C parser (with a note) when it is not.
+
+    Args:
+        engine (str): One of ENGINES
+        chunksize (int): Rows per chunk, or None for a single read
+
+    Returns:
+        str: "c" or "pyarrow"
+    """
+    if chunksize or engine == "c":
+        return "c"
+    if _pyarrow_available():
+        return "pyarrow"
+    if engine == "pyarrow":
+        print("⚠️  pyarrow not installed; using the C parser")
+    return "c"
+
+
+def read_table(path, columns=None, categorical=(), chunksize=None, engine="c", sep=None):
+    """
+    Read selected columns of a CSV/TSV, whole or in chunks
+
+    Requested columns missing from the file are skipped, so callers can ask
+    for optional columns. Columns come back in file order.
+
+    Args:
+        path (str or Path): CSV/TSV file
+        columns (list): Columns to parse (default: all)
+        categorical (list): Columns to parse as pandas categoricals
+        chunksize (int): Rows per chunk; returns an iterator of DataFrames
+        engine (str): Parser engine, one of ENGINES
+        sep (str): Field separator (default: from the file extension)
+
+    Returns:
+        pd.DataFrame or pandas TextFileReader: The table, or its chunks
+    """
+    sep = sep or table_separator(path)
+    usecols = None
+    dtype = None
+    if columns is not None or categorical:
+        present = read_header(path, sep)
+        if columns is not None:
+            wanted = set(columns)
+            usecols = [col for col in present if col in wanted]
+        parsed = usecols if usecols is not None else present
+        dtype = {col: "category" for col in categorical if col in parsed} or None
+
+    return pd.read_csv(
+        path,
+        sep=sep,
+        usecols=usecols,
+        dtype=dtype,
+        chunksize=chunksize or None,
+        engine=resolve_engine(engine, chunksize),
+    )
@@ -0,0 +1,205 @@
+"""
+Shared transcript normalization for scoring and classification
+
+Whisper output has casing, punctuation and contractions; Common Voice
+references are plain lowercase. Scoring raw strings counts every comma and
+apostrophe as an error, so every stage compares normalized text instead.
+
+Uses Whisper's own EnglishTextNormalizer when the whisper package is
+installed. Otherwise falls back to a vectorized port of its rules (bracket
+and hesitation removal, contraction and title expansion, symbol and
+diacritic stripping, whitespace collapse); the fallback does not convert
+spelled-out numbers or British spellings.
+
+classify_intent.py adds the normalized columns to intents.csv once, and
+later stages reuse them instead of recomputing. The engine that produced
+them is recorded in a "normalizer" column and carried into metrics.json,
+since the two engines score the same data differently.
+"""
+
+import unicodedata
+import numpy as np
+import pandas as pd
+
+
+# Source column -> cached normalized column in intents.csv.
+NORMALIZED_COLUMNS = {
+    "true_transcript": "true_transcript_norm",
+    "transcribed_text": "transcribed_text_norm",
+}
+# Column recording which engine (normalizer_name) produced the cached columns.
+NORMALIZER_COLUMN = "normalizer"
+
+# Rule order follows whisper.normalizers.EnglishTextNormalizer.
+_BRACKETS = [
+    (r"[<\[][^>\]]*[>\]]", ""),
+    (r"\(([^)]+?)\)", ""),
+    (r"\b(hmm|mm|mhm|mmm|uh|um)\b", ""),
+    (r"\s+'", "'"),
+]
+
+_REPLACERS = [
+    # common contractions
+    (r"\bwon't\b", "will not"),
+    (r"\bcan't\b", "can not"),
+    (r"\blet's\b", "let us"),
+    (r"\bain't\b", "aint"),
+    (r"\by'all\b", "you all"),
+    (r"\bwanna\b", "want to"),
+    (r"\bgotta\b", "got to"),
+    (r"\bgonna\b", "going to"),
+    (r"\bi'ma\b", "i am going to"),
+    (r"\bimma\b", "i am going to"),
+    (r"\bwoulda\b", "would have"),
+    (r"\bcoulda\b", "could have"),
+    (r"\bshoulda\b", "should have"),
+    (r"\bma'am\b", "madam"),
+    # titles before names
+    (r"\bmr\b", "mister "),
+    (r"\bmrs\b", "missus "),
+    (r"\bst\b", "saint "),
+    (r"\bdr\b", "doctor "),
+    (r"\bprof\b", "professor "),
+    (r"\bcapt\b", "captain "),
+    (r"\bgov\b", "governor "),
+    (r"\bald\b", "alderman "),
+    (r"\bgen\b", "general "),
+    (r"\bsen\b", "senator "),
+    (r"\brep\b", "representative "),
+    (r"\bpres\b", "president "),
+    (r"\brev\b", "reverend "),
+    (r"\bhon\b", "honorable "),
+    (r"\basst\b", "assistant "),
+    (r"\bassoc\b", "associate "),
+    (r"\blt\b", "lieutenant "),
+    (r"\bcol\b", "colonel "),
+    (r"\bjr\b", "junior "),
+    (r"\bsr\b", "senior "),
+    (r"\besq\b", "esquire "),
+    # perfect tenses
+    (r"'d been\b", " had been"),
+    (r"'s been\b", " has been"),
+    (r"'d gone\b", " had gone"),
+    (r"'s gone\b", " has gone"),
+    (r"'d done\b", " had done"),
+    (r"'s got\b", " has got"),
+    # general contractions
+    (r"n't\b", " not"),
+    (r"'re\b", " are"),
+    (r"'d\b", " would"),
+    (r"'ll\b", " will"),
+    (r"'t\b", " not"),
+    (r"'ve\b", " have"),
+    (r"'m\b", " am"),
+]
+
+_SYMBOLS = [
+    (r"(\d),(\d)", r"\1\2"),
+    (r"\.(?!\d)", " "),
+    ("[\u0300-\u036f]", ""),
+    (r"[^\w\s.%$¢€£]|_", " "),
+    (r"[.$¢€£]([^0-9])", r" \1"),
+    (r"([^0-9])%", r"\1 "),
+    (r"\s+", " "),
+]
+
+_whisper_normalizer = None
+
+
+def _load_whisper_normalizer():
+    global _whisper_normalizer
+    if _whisper_normalizer is None:
+        try:
+            from whisper.normalizers import EnglishTextNormalizer
+            _whisper_normalizer = EnglishTextNormalizer()
+        except ImportError:
+            print("⚠️  whisper not installed; using the basic English normalizer, which skips number and "
+                  "British-spelling rules (CER/WER and intents differ from whisper-english runs)")
+            _whisper_normalizer = False
+    return _whisper_normalizer or None
+
+
+def normalizer_name():
+    """Name of the engine normalize_series will use."""
+    return "whisper-english" if _load_whisper_normalizer() else "basic-english"
+
+
+def _basic_normalize(values):
+    """Vectorized fallback over a Series of strings."""
+    text = values.str.lower()
+    for pattern, repl in _BRACKETS + _REPLACERS:
+        text = text.str.replace(pattern, repl, regex=True)
+    # Decompose so diacritics become combining marks, then strip them.
+    text = text.map(lambda s: unicodedata.normalize("NFKD", s))
+    for pattern, repl in _SYMBOLS:
+        text = text.str.replace(pattern, repl, regex=True)
+    return text.str.strip()
+
+
+def normalize_series(series):
+    """
+    Normalize a column of transcripts
+
+    Work runs once per distinct string, since Common Voice repeats
+    sentences across speakers. Missing values stay missing.
+
+    Args:
+        series (pd.Series): Raw transcripts
+
+    Returns:
+        pd.Series: Normalized transcripts aligned to ``series``
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    normalizer = _load_whisper_normalizer()
+    if normalizer:
+        normalized = uniques.map(normalizer)
+    else:
+        normalized = _basic_normalize(uniques)
+    # Missing values share sentinel code -1, which indexes the last slot.
+    mapped = np.append(normalized.to_numpy(dtype=object), np.nan)[codes]
+    return pd.Series(mapped, index=series.index, name=series.name)
+
+
+def normalize_text(text):
+    """Normalize a single transcript (convenience wrapper)."""
+    return normalize_series(pd.Series([text])).iloc[0]
+
+
+def ensure_normalized(df, columns=NORMALIZED_COLUMNS):
+    """
+    Add normalized transcript columns that are not already present
+
+    Columns cached in an earlier stage's output are reused as-is.
+
+    Args:
+        df (pd.DataFrame): Frame with raw transcript columns (updated in place)
+        columns (dict): Source column -> normalized column
+
+    Returns:
+        list: Normalized columns that were computed here
+    """
+    computed = []
+    for source, target in columns.items():
+        if target not in df.columns and source in df.columns:
+            df[target] = normalize_series(df[source])
+            computed.append(target)
+    if computed and NORMALIZER_COLUMN not in df.columns:
+        df[NORMALIZER_COLUMN] = normalizer_name()
+    return computed
+
+
+def recorded_normalizer(df):
+    """
+    Normalizer behind a frame's cached normalized columns
+
+    Args:
+        df (pd.DataFrame): Frame after ``ensure_normalized``
+
+    Returns:
+        str: Engine name(s) from the normalizer column, comma-separated if
+            mixed, or "unknown" for files written before it was recorded
+    """
+    if NORMALIZER_COLUMN not in df.columns:
+        return "unknown"
+    return ",".join(sorted(df[NORMALIZER_COLUMN].dropna().astype(str).unique())) or "unknown"
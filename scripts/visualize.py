@@ -4,11 +4,21 @@ Creates publication-quality charts for ASR equity benchmark results
 
 Usage:
     python scripts/visualize.py --input results/intents.csv --output visualizations/
+
+Charts render in parallel worker processes (matplotlib state is per
+process). A chart whose input data, parameters and drawing code are
+unchanged since its last render (see render_manifest.json in the output
+directory) is skipped. Drawing code includes the helpers a chart calls and
+the style settings below. --only renders a subset, --force re-renders.
 """
 
 import argparse
+import hashlib
+import inspect
+import json
 import os
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 
@@ -26,25 +36,22 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
 import seaborn as sns
 import numpy as np
-import Levenshtein
 try:
     from _python_version_check import ensure_python_3_12_12
+    from calculate_metrics import batch_cer
+    from text_normalization import ensure_normalized
 except ModuleNotFoundError:
     from scripts._python_version_check import ensure_python_3_12_12
+    from scripts.calculate_metrics import batch_cer
+    from scripts.text_normalization import ensure_normalized
 
 # Set style
 sns.set_style("whitegrid")
 sns.set_palette("Set2")
 plt.rcParams['figure.dpi'] = 300
 
-
-def calculate_cer(reference, hypothesis):
-    if pd.isna(reference) or pd.isna(hypothesis):
-        return 1.0
-    if len(reference) == 0:
-        return 1.0 if len(hypothesis) > 0 else 0.0
-    distance = Levenshtein.distance(str(reference).lower(), str(hypothesis).lower())
-    return distance / len(reference)
+CHARTS = ["cer", "intent_errors", "disparity", "summary", "uml", "intersection"]
+RENDER_MANIFEST = "render_manifest.json"
 
 
 def coerce_bool(series):
@@ -69,6 +76,15 @@ def coerce_bool(series):
     return mapped.astype(bool)
 
 
+def _numeric_slices(slices_df):
+    """Convert metric columns of a slices CSV (read as str) back to numbers."""
+    dims = {"accent_group", "speaker_type", "true_intent", "model"}
+    for col in slices_df.columns:
+        if col not in dims:
+            slices_df[col] = pd.to_numeric(slices_df[col])
+    return slices_df
+
+
 def create_cer_chart(intents_df, output_dir="visualizations", baseline_group="US"):
     """
     Bar chart: Character Error Rate by Accent Group
@@ -313,6 +329,58 @@ def create_combined_summary(intents_df, output_dir="visualizations", intent_df=N
     plt.close()
 
 
+def create_intersection_heatmap(slices_df, output_dir="visualizations", col_dim="true_intent", metric="accuracy"):
+    """
+    Heatmap of a metric across accent_group × another slice dimension
+
+    Args:
+        slices_df (pd.DataFrame): Slices exported by calculate_metrics.py (slices.csv)
+        output_dir (str): Output directory for chart
+        col_dim (str): Second slice dimension (e.g. true_intent, speaker_type, model)
+        metric (str): Slice metric to plot (e.g. accuracy, cer_mean)
+    """
+    print(f"\nCreating intersectional heatmap (accent_group × {col_dim}, {metric})...")
+
+    if col_dim not in slices_df.columns or metric not in slices_df.columns:
+        print(f"  ⚠️  Skipped: slices have no '{col_dim}' or '{metric}' column")
+        return
+
+    # Two-way slices: accent_group and col_dim set, everything else rolled up.
+    other_dims = [c for c in ("accent_group", "speaker_type", "true_intent", "model")
+                  if c in slices_df.columns and c not in ("accent_group", col_dim)]
+    pairs = slices_df[
+        (slices_df["accent_group"] != "*")
+        & (slices_df[col_dim] != "*")
+        & (slices_df[other_dims] == "*").all(axis=1)
+    ]
+    if pairs.empty:
+        print("  ⚠️  Skipped: no slices meet minimum support")
+        return
+
+    values = pairs.pivot(index="accent_group", columns=col_dim, values=metric)
+    support = pairs.pivot(index="accent_group", columns=col_dim, values="n")
+    labels = values.round(1).astype(str).where(values.notna(), "") + "\n(n=" + \
+        support.fillna(0).astype(int).astype(str) + ")"
+    labels = labels.where(values.notna(), "")
+
+    fig, ax = plt.subplots(figsize=(max(8, 1.6 * values.shape[1] + 3), max(5, 0.8 * values.shape[0] + 2)))
+    sns.heatmap(values, annot=labels, fmt="", cmap="RdYlGn" if "accuracy" in metric else "RdYlGn_r",
+                linewidths=2, linecolor="white", cbar_kws={"label": metric}, ax=ax,
+                annot_kws={"fontsize": 10})
+    ax.set_title(f"{metric} by Accent Group × {col_dim}\n(blank = suppressed, below minimum support)",
+                 fontsize=14, fontweight="bold", pad=16)
+    ax.set_xlabel(col_dim, fontsize=12)
+    ax.set_ylabel("Accent Group", fontsize=12)
+    plt.xticks(rotation=20, ha="right")
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+
+    output_path = os.path.join(output_dir, f"intersection_{col_dim}_{metric}.png")
+    plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    print(f"  ✅ Saved: {output_path}")
+    plt.close()
+
+
 def create_uml_diagram(output_dir="visualizations"):
     """
     Simple UML-style diagram of the benchmark pipeline.
@@ -359,6 +427,116 @@ def create_uml_diagram(output_dir="visualizations"):
     plt.close()
 
 
+def _source_closure(func, seen=None):
+    """Source of ``func`` and of every function in this package it calls, in call order."""
+    seen = set() if seen is None else seen
+    if func in seen:
+        return []
+    seen.add(func)
+    try:
+        sources = [inspect.getsource(func)]
+    except OSError:  # no source available (e.g. frozen builds)
+        return [func.__qualname__]
+    codes = [func.__code__]
+    for code in codes:
+        codes.extend(const for const in code.co_consts if inspect.iscode(const))
+        for name in code.co_names:
+            helper = func.__globals__.get(name)
+            if inspect.isfunction(helper) and _is_local(helper):
+                sources.extend(_source_closure(helper, seen))
+    return sources
+
+
+def _is_local(func):
+    try:
+        return Path(inspect.getsourcefile(func)).resolve().parent == Path(__file__).resolve().parent
+    except TypeError:
+        return False
+
+
+def _render_key(func, data, params):
+    """
+    Hash of a chart's drawing code, style, input frames and parameters
+
+    The code part covers the chart function and the helpers it calls from
+    these scripts; the style part is matplotlib's rcParams (set by the
+    style setup above) and the matplotlib/seaborn versions.
+    """
+    digest = hashlib.sha256()
+    for source in _source_closure(func):
+        digest.update(source.encode())
+    style = {key: str(value) for key, value in plt.rcParams.items()}
+    style["versions"] = [matplotlib.__version__, sns.__version__]
+    digest.update(json.dumps(style, sort_keys=True).encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    for name in sorted(data):
+        frame = data[name]
+        digest.update(f"{name}:{list(frame.columns)}".encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def render_charts(jobs, output_dir="visualizations", workers=0, force=False):
+    """
+    Render charts in a process pool, skipping those that are up to date
+
+    A chart is up to date if its PNG exists and its render key (drawing
+    code and the helpers it calls, style settings, input data and
+    parameters) matches the one recorded in render_manifest.json when it
+    was last rendered. Other changes (fonts installed on the system, data
+    files a chart reads itself) need --force.
+
+    Args:
+        jobs (dict): Chart name -> (function, data kwargs, parameter kwargs, PNG name)
+        output_dir (str): Output directory for charts and the manifest
+        workers (int): Worker processes (0 = one per chart, up to the CPU count;
+            1 = render in this process)
+        force (bool): Re-render even if up to date
+
+    Returns:
+        dict: Chart name -> "rendered", "skipped" or "failed"
+    """
+    manifest_path = Path(output_dir) / RENDER_MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    status = {}
+    stale = {}
+    for name, (func, data, params, filename) in jobs.items():
+        key = _render_key(func, data, params)
+        if not force and manifest.get(filename) == key and (Path(output_dir) / filename).exists():
+            print(f"\n⏭️  {filename} is up to date; skipped")
+            status[name] = "skipped"
+        else:
+            stale[name] = key
+
+    # Rendering in this process avoids pool start-up for a single chart
+    workers = workers or min(len(stale), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(stale) > 1 else None
+    futures = {}
+    for name in stale:
+        func, data, params, _ = jobs[name]
+        if pool is not None:
+            futures[name] = pool.submit(func, output_dir=output_dir, **data, **params)
+
+    for name, key in stale.items():
+        func, data, params, filename = jobs[name]
+        try:
+            if pool is not None:
+                futures[name].result()
+            else:
+                func(output_dir=output_dir, **data, **params)
+            manifest[filename] = key
+            status[name] = "rendered"
+        except Exception as e:
+            print(f"  ❌ {filename} failed: {e}")
+            status[name] = "failed"
+    if pool is not None:
+        pool.shutdown()
+
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return status
+
+
 def main():
     ensure_python_3_12_12()
     parser = argparse.ArgumentParser(
@@ -382,6 +560,36 @@ def main():
         default="US",
         help="Baseline accent group for disparity calculation"
     )
+    parser.add_argument(
+        "--slices",
+        type=str,
+        default="",
+        help="Slices CSV from calculate_metrics.py (default: slices.csv next to --input, if present)"
+    )
+    parser.add_argument(
+        "--slice_dim",
+        type=str,
+        default="true_intent",
+        help="Dimension crossed with accent_group in the intersectional heatmap (default: true_intent)"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        default=None,
+        choices=CHARTS,
+        help="Render only these charts (default: all)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Processes rendering charts in parallel (default: 0 = one per chart, up to the CPU count)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"Re-render charts even if unchanged since the last run (see {RENDER_MANIFEST})"
+    )
 
     args = parser.parse_args()
 
@@ -419,10 +627,8 @@ def main():
     if "cer" not in intents_df.columns:
         if "true_transcript" in intents_df.columns and "transcribed_text" in intents_df.columns:
             print("\nCER column missing; computing CER from transcripts...")
-            intents_df["cer"] = intents_df.apply(
-                lambda row: calculate_cer(row["true_transcript"], row["transcribed_text"]),
-                axis=1
-            )
+            ensure_normalized(intents_df)
+            intents_df["cer"] = batch_cer(intents_df["true_transcript_norm"], intents_df["transcribed_text_norm"])
         else:
             raise SystemExit("❌ Missing 'cer' and transcript columns; run calculate_metrics.py first.")
 
@@ -435,22 +641,45 @@ def main():
             suffixes=("", "_from_full"),
         )
 
+    # Chart name -> (function, input data, parameters, output file)
+    jobs = {
+        "cer": (create_cer_chart, {"intents_df": intents_df},
+                {"baseline_group": args.baseline}, "cer_by_accent.png"),
+        "intent_errors": (create_intent_error_chart, {"intents_df": intent_eval_df}, {}, "intent_errors.png"),
+        "disparity": (create_disparity_heatmap, {"intents_df": intent_eval_df},
+                      {"baseline_group": args.baseline}, "disparity_heatmap.png"),
+        "summary": (create_combined_summary, {"intents_df": intents_df, "intent_df": intent_eval_df},
+                    {}, "summary_dashboard.png"),
+        "uml": (create_uml_diagram, {}, {}, "uml_diagram.png"),
+    }
+
+    slices_path = Path(args.slices) if args.slices else Path(args.input).parent / "slices.csv"
+    if slices_path.exists():
+        jobs["intersection"] = (
+            create_intersection_heatmap, {"slices_df": pd.read_csv(slices_path, dtype=str).pipe(_numeric_slices)},
+            {"col_dim": args.slice_dim, "metric": "accuracy"}, f"intersection_{args.slice_dim}_accuracy.png",
+        )
+    elif args.only and "intersection" in args.only:
+        print(f"\n⚠️  No slices file at {slices_path}; skipping the intersection chart")
+
+    if args.only:
+        jobs = {name: job for name, job in jobs.items() if name in args.only}
+
     # Create visualizations
-    create_cer_chart(intents_df, args.output, args.baseline)
-    create_intent_error_chart(intent_eval_df, args.output)
-    create_disparity_heatmap(intent_eval_df, args.baseline, args.output)
-    create_combined_summary(intents_df, args.output, intent_eval_df)
-    create_uml_diagram(args.output)
+    status = render_charts(jobs, args.output, workers=args.workers, force=args.force)
 
+    failed = [name for name, result in status.items() if result == "failed"]
     print(f"\n{'='*70}")
-    print(f"✅ All visualizations created successfully!")
+    if failed:
+        print(f"❌ {len(failed)} chart(s) failed: {', '.join(failed)}")
+    else:
+        print(f"✅ All visualizations created successfully!")
     print(f"{'='*70}")
     print(f"Output directory: {args.output}")
-    print(f"  - cer_by_accent.png")
-    print(f"  - intent_errors.png")
-    print(f"  - disparity_heatmap.png")
-    print(f"  - summary_dashboard.png")
-    print(f"  - uml_diagram.png")
+    for name, (_, _, _, filename) in jobs.items():
+        print(f"  - {filename} ({status[name]})")
+    if failed:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":